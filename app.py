@@ -3,18 +3,29 @@ Backend Flask para panel de administración de FARMAVET Web
 Permite editar contenido sin tocar código HTML
 """
 
-from flask import Flask, render_template, request, redirect, url_for, flash, session, send_from_directory, send_file, jsonify, abort
+from flask import Flask, render_template, request, redirect, url_for, flash, session, send_from_directory, send_file, jsonify, abort, g, has_app_context, has_request_context, get_flashed_messages
 from flask_babel import Babel, gettext as _, get_locale, lazy_gettext as _l
 from werkzeug.security import generate_password_hash, check_password_hash
 from werkzeug.utils import secure_filename
+from werkzeug.http import is_resource_modified
+from markupsafe import Markup, escape
 from urllib.parse import unquote
 import sqlite3
 import os
 import json
 import time
 import secrets
-from datetime import datetime, timedelta
-from functools import wraps
+import hashlib
+import gzip
+import threading
+import heapq
+import click
+from datetime import datetime, timedelta, timezone
+from functools import wraps, lru_cache
+from types import MappingProxyType
+from collections import OrderedDict
+from bisect import bisect_left
+from itertools import islice
 import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
@@ -72,14 +83,82 @@ def _slugify(text):
     text = re.sub(r'-+', '-', text).strip('-')
     return text[:120] if text else ''
 
+# Los filtros de contenido guardan sus resultados más recientes (LRU, por worker) usando el
+# texto como clave: el mismo artículo, las mismas etiquetas o el mismo JSON de redes
+# sociales se procesan una sola vez. Los templates solo leen lo que devuelven.
+app.config['FILTER_CACHE_SIZE'] = int(os.environ.get('FILTER_CACHE_SIZE', '1024'))
+
 # Filtro para convertir saltos de línea en <br> (contenido de noticias)
 @app.template_filter('nl2br')
 def nl2br_filter(value):
     """Convierte \\n en <br> preservando el escape HTML para seguridad"""
     if not value:
         return ''
-    from markupsafe import Markup, escape
-    return Markup(escape(str(value)).replace('\n', '<br>\n'))
+    return _nl2br(str(value))
+
+@lru_cache(maxsize=app.config['FILTER_CACHE_SIZE'])
+def _nl2br(texto):
+    return Markup(escape(texto).replace('\n', '<br>\n'))
+
+# Versión de la política de sanitización (etiquetas, atributos y CSS permitidos).
+# Incrementarla al cambiar la política y ejecutar flask noticias-recalcular para volver a
+# sanitizar el HTML guardado de las noticias (hasta entonces se sanitiza al mostrarlas).
+SANITIZER_VERSION = 1
+
+_RICH_CONTENT_TAGS = ['p', 'br', 'strong', 'b', 'em', 'i', 'u', 'a', 'img', 'ul', 'ol', 'li', 'h2', 'h3', 'h4', 'blockquote', 'span', 'div']
+_ALIGN_CLASSES = frozenset({
+    'text-justify', 'text-left', 'text-center', 'text-right', 'text-start', 'text-end',
+    'float-left', 'float-right', 'float-none', 'pull-left', 'pull-right'  # para imágenes
+})
+# Permitir text-align, float (para imágenes con texto alrededor), márgenes, etc.
+_RICH_CONTENT_CSS = [
+    'text-align', 'text-indent', 'margin', 'margin-top', 'margin-bottom', 'margin-left', 'margin-right',
+    'padding', 'padding-top', 'padding-bottom', 'padding-left', 'padding-right',
+    'float', 'clear', 'width', 'height', 'max-width'
+]
+
+def _allow_style_or_align_class(tag, name, value):
+    if name == 'style':
+        return True  # css_sanitizer lo filtra
+    if name == 'class':
+        classes = [c.strip() for c in (value or '').split() if c.strip()]
+        return all(c in _ALIGN_CLASSES for c in classes)
+    return False
+
+def _allow_img_attrs(tag, name, value):
+    if name in ('src', 'alt', 'title', 'width', 'height', 'style'):
+        return True
+    if name == 'class':
+        classes = [c.strip() for c in (value or '').split() if c.strip()]
+        return all(c in _ALIGN_CLASSES for c in classes)
+    return False
+
+_RICH_CONTENT_ATTRS = {
+    'a': ['href', 'title', 'target', 'rel'],
+    'img': _allow_img_attrs,
+    'p': _allow_style_or_align_class,
+    'span': _allow_style_or_align_class,
+    'div': _allow_style_or_align_class
+}
+
+try:
+    import bleach
+    from bleach.css_sanitizer import CSSSanitizer
+    _rich_content_css_sanitizer = CSSSanitizer(allowed_css_properties=_RICH_CONTENT_CSS)
+except ImportError:
+    bleach = None  # Sin bleach el contenido con HTML se muestra escapado (nl2br)
+
+# bleach.Cleaner no es thread-safe (el parser guarda estado): uno por hilo, construido una sola vez
+_rich_content_local = threading.local()
+
+def _rich_content_cleaner():
+    cleaner = getattr(_rich_content_local, 'cleaner', None)
+    if cleaner is None and bleach is not None:
+        cleaner = _rich_content_local.cleaner = bleach.Cleaner(
+            tags=_RICH_CONTENT_TAGS, attributes=_RICH_CONTENT_ATTRS,
+            css_sanitizer=_rich_content_css_sanitizer, strip=False
+        )
+    return cleaner
 
 # Filtro para contenido rico (HTML sanitizado o texto plano con nl2br)
 @app.template_filter('rich_content')
@@ -90,62 +169,48 @@ def rich_content_filter(value):
     s = str(value).strip()
     if not s:
         return ''
+    return _rich_content(s)
+
+@lru_cache(maxsize=app.config['FILTER_CACHE_SIZE'])
+def _rich_content(s):
     # Si contiene etiquetas HTML, sanitizar
     if '<' in s and '>' in s:
         try:
-            import bleach
-            from bleach.css_sanitizer import CSSSanitizer
-            from markupsafe import Markup
-            allowed_tags = ['p', 'br', 'strong', 'b', 'em', 'i', 'u', 'a', 'img', 'ul', 'ol', 'li', 'h2', 'h3', 'h4', 'blockquote', 'span', 'div']
-            _ALIGN_CLASSES = frozenset({
-                'text-justify', 'text-left', 'text-center', 'text-right', 'text-start', 'text-end',
-                'float-left', 'float-right', 'float-none', 'pull-left', 'pull-right'  # para imágenes
-            })
-
-            def _allow_style_or_align_class(tag, name, value):
-                if name == 'style':
-                    return True  # css_sanitizer lo filtra
-                if name == 'class':
-                    classes = [c.strip() for c in (value or '').split() if c.strip()]
-                    return all(c in _ALIGN_CLASSES for c in classes)
-                return False
-
-            def _allow_img_attrs(tag, name, value):
-                if name in ('src', 'alt', 'title', 'width', 'height', 'style'):
-                    return True
-                if name == 'class':
-                    classes = [c.strip() for c in (value or '').split() if c.strip()]
-                    return all(c in _ALIGN_CLASSES for c in classes)
-                return False
-
-            allowed_attrs = {
-                'a': ['href', 'title', 'target', 'rel'],
-                'img': _allow_img_attrs,
-                'p': _allow_style_or_align_class,
-                'span': _allow_style_or_align_class,
-                'div': _allow_style_or_align_class
-            }
-            # Permitir text-align, float (para imágenes con texto alrededor), márgenes, etc.
-            css_sanitizer = CSSSanitizer(allowed_css_properties=[
-                'text-align', 'text-indent', 'margin', 'margin-top', 'margin-bottom', 'margin-left', 'margin-right',
-                'padding', 'padding-top', 'padding-bottom', 'padding-left', 'padding-right',
-                'float', 'clear', 'width', 'height', 'max-width'
-            ])
-            return Markup(bleach.clean(s, tags=allowed_tags, attributes=allowed_attrs, css_sanitizer=css_sanitizer, strip=False))
+            return Markup(_rich_content_cleaner().clean(s))
         except Exception:
-            return nl2br_filter(s)
-    return nl2br_filter(s)
+            return _nl2br(s)
+    return _nl2br(s)
 
 # Filtro personalizado para Jinja2: parsear JSON
 @app.template_filter('from_json')
 def from_json_filter(value):
     """Convierte un string JSON a lista/dict"""
-    if not value or value == '[]' or value == '{}':
+    if not value or value == '[]' or value == '{}' or not isinstance(value, (str, bytes)):
         return []
+    return _from_json(value)
+
+@lru_cache(maxsize=app.config['FILTER_CACHE_SIZE'])
+def _from_json(value):
+    # El mismo resultado se comparte entre peticiones: se devuelve de solo lectura
     try:
-        return json.loads(value)
-    except:
-        return []
+        return _solo_lectura(json.loads(value))
+    except ValueError:
+        return ()
+
+def _solo_lectura(valor):
+    """Listas como tuplas y dicts como MappingProxyType, recursivamente"""
+    if isinstance(valor, dict):
+        return MappingProxyType({clave: _solo_lectura(v) for clave, v in valor.items()})
+    if isinstance(valor, list):
+        return tuple(_solo_lectura(v) for v in valor)
+    return valor
+
+def filter_cache_stats():
+    """Aciertos y fallos de las cachés de los filtros de contenido en este worker"""
+    return {
+        nombre: funcion.cache_info()._asdict()
+        for nombre, funcion in (('rich_content', _rich_content), ('nl2br', _nl2br), ('from_json', _from_json))
+    }
 
 # Función helper para traducir contenido dinámico de BD
 def get_translated_field(record, field_name, default=None):
@@ -196,6 +261,45 @@ def get_translated_field(record, field_name, default=None):
     
     return default
 
+class Registro:
+    """
+    Registro de la BD ya resuelto para un idioma (se construye una vez y se cachea).
+    Los atributos devuelven el valor a mostrar: registro.titulo es titulo_en si el idioma
+    es inglés y tiene texto, si no titulo (lo mismo que get_translated_field).
+    El acceso por clave (registro['titulo']), keys() y get() devuelven lo guardado en la BD.
+    """
+    __slots__ = ('_fila',)
+
+    def __getitem__(self, key):
+        return self._fila[key]
+
+    def keys(self):
+        return self._fila.keys()
+
+    def get(self, key, default=None):
+        return self._fila.get(key, default)
+
+@lru_cache(maxsize=None)
+def _clase_registro(columnas):
+    """Subclase con __slots__ para un conjunto de columnas (una por forma de consulta)"""
+    return type('Registro', (Registro,), {'__slots__': columnas})
+
+def proyectar(fila, lang):
+    """Convierte un sqlite3.Row o dict en un Registro con los campos traducidos a lang"""
+    datos = {columna: fila[columna] for columna in fila.keys()}
+    # Solo los nombres válidos como atributo (p. ej. no "COUNT(*)") se exponen como atributos
+    atributos = tuple(columna for columna in datos if columna.isidentifier())
+    registro = _clase_registro(atributos)()
+    registro._fila = datos
+    for columna in atributos:
+        valor = datos[columna]
+        if lang == 'en':
+            traducido = datos.get(f'{columna}_en')
+            if traducido and str(traducido).strip():
+                valor = traducido
+        setattr(registro, columna, valor)
+    return registro
+
 # Hacer la función disponible en templates
 @app.context_processor
 def inject_helpers():
@@ -204,7 +308,8 @@ def inject_helpers():
     return dict(
         get_translated_field=get_translated_field, 
         _=_, 
-        csrf_token=generate_csrf_token(),
+        csrf_token=_TokenCSRF(),
+        alternate_urls=alternate_urls,
         recaptcha_site_key=recaptcha_site_key
     )
 
@@ -225,17 +330,540 @@ os.makedirs('static/uploads/proyectos', exist_ok=True)
 # En producción, usar instance/ para que Flask lo maneje correctamente
 DATABASE = os.path.join('instance', 'database.db')
 
+# Tamaño máximo del pool de conexiones por proceso (cada worker de gunicorn tiene el suyo)
+app.config['DB_POOL_SIZE'] = int(os.environ.get('DB_POOL_SIZE', '4'))
+# PRAGMAs aplicados a cada conexión nueva. Con WAL los lectores públicos no esperan
+# a las escrituras del panel de administración hechas desde otro worker.
+app.config['SQLITE_PRAGMAS'] = {
+    'journal_mode': os.environ.get('SQLITE_JOURNAL_MODE', 'WAL'),
+    'synchronous': os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL'),
+    'cache_size': int(os.environ.get('SQLITE_CACHE_SIZE', '-16000')),  # Negativo = KiB (~16 MB)
+    'mmap_size': int(os.environ.get('SQLITE_MMAP_SIZE', str(64 * 1024 * 1024))),
+    'temp_store': os.environ.get('SQLITE_TEMP_STORE', 'MEMORY'),
+    'busy_timeout': int(os.environ.get('SQLITE_BUSY_TIMEOUT', '5000')),  # Milisegundos
+}
+
+# Detecta la tabla afectada por un INSERT/UPDATE/DELETE (para invalidar cachés al hacer commit)
+_ESCRITURA_RE = re.compile(
+    r'^\s*(?:INSERT(?:\s+OR\s+\w+)?\s+INTO|REPLACE\s+INTO|UPDATE(?:\s+OR\s+\w+)?|DELETE\s+FROM)\s+["`\[]?(\w+)',
+    re.IGNORECASE
+)
+# Tablas leídas por un SELECT (FROM / JOIN)
+_LECTURA_RE = re.compile(r'\b(?:FROM|JOIN)\s+["`\[]?(\w+)', re.IGNORECASE)
+
+@lru_cache(maxsize=1024)
+def _tabla_escrita(sql):
+    """Nombre de la tabla que modifica una sentencia, o None si no es una escritura"""
+    m = _ESCRITURA_RE.match(sql)
+    return m.group(1).lower() if m else None
+
+@lru_cache(maxsize=1024)
+def _tablas_leidas(sql):
+    """Tablas de las que lee un SELECT"""
+    return frozenset(t.lower() for t in _LECTURA_RE.findall(sql))
+
+class PooledConnection(sqlite3.Connection):
+    """
+    Conexión SQLite reutilizable.
+    Mientras pertenece a una petición, close() no la cierra: se devuelve al pool
+    automáticamente en el teardown del contexto de la aplicación.
+    También registra las tablas modificadas para invalidar la caché de páginas en commit().
+    """
+    en_pool = False
+
+    def execute(self, sql, *args, **kwargs):
+        self._registrar_escritura(sql)
+        return super().execute(sql, *args, **kwargs)
+
+    def executemany(self, sql, *args, **kwargs):
+        self._registrar_escritura(sql)
+        return super().executemany(sql, *args, **kwargs)
+
+    def _registrar_escritura(self, sql):
+        tabla = _tabla_escrita(sql)
+        if tabla:
+            if '_tablas_modificadas' not in self.__dict__:
+                self._tablas_modificadas = set()
+            self._tablas_modificadas.add(tabla)
+
+    def commit(self):
+        super().commit()
+        tablas = self.__dict__.pop('_tablas_modificadas', None)
+        if tablas:
+            # data_version no cambia con los commits propios: forzar la relectura de content_version
+            self.__dict__.pop('_data_version', None)
+            invalidate_tables(tablas)
+
+    def rollback(self):
+        super().rollback()
+        self.__dict__.pop('_tablas_modificadas', None)
+
+    def close(self):
+        if self.en_pool:
+            return  # La libera close_db() al terminar la petición
+        super().close()
+
+    def cerrar(self):
+        """Cierra realmente la conexión (al descartarla del pool)"""
+        self.en_pool = False
+        super().close()
+
+class ConnectionPool:
+    """Pool pequeño de conexiones ya configuradas, uno por proceso"""
+
+    def __init__(self, database, size, pragmas=None):
+        self.database = database
+        self.size = size
+        self.pragmas = pragmas or {}
+        self.trace_callback = None  # Permite registrar las consultas ejecutadas (check-query-plans)
+        self._libres = []
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+        self._directorio_creado = False
+
+    def connect(self):
+        """Abre una conexión nueva (fuera del pool) con la configuración estándar"""
+        if not self._directorio_creado:
+            os.makedirs(os.path.dirname(self.database) or '.', exist_ok=True)
+            self._directorio_creado = True
+        conn = sqlite3.connect(self.database, factory=PooledConnection, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        for nombre, valor in self.pragmas.items():
+            conn.execute(f'PRAGMA {nombre} = {valor}')
+        return conn
+
+    def acquire(self):
+        """Entrega una conexión libre del pool o abre una nueva"""
+        conn = None
+        with self._lock:
+            if self._pid != os.getpid():
+                # Proceso hijo (gunicorn con preload_app): no reutilizar conexiones del padre
+                self._libres = []
+                self._pid = os.getpid()
+            if self._libres:
+                conn = self._libres.pop()
+        if conn is None:
+            conn = self.connect()
+        conn.en_pool = True
+        conn.set_trace_callback(self.trace_callback)
+        return conn
+
+    def release(self, conn):
+        """Devuelve una conexión al pool (o la cierra si el pool está lleno)"""
+        try:
+            if conn.in_transaction:
+                conn.rollback()  # Descartar escrituras sin commit (p. ej. rutas que fallaron a mitad)
+        except sqlite3.Error:
+            conn.cerrar()
+            return
+        with self._lock:
+            if self._pid == os.getpid() and len(self._libres) < self.size:
+                self._libres.append(conn)
+                return
+        conn.cerrar()
+
+_db_pool = ConnectionPool(DATABASE, app.config['DB_POOL_SIZE'], app.config['SQLITE_PRAGMAS'])
+
 def get_db():
-    """Obtiene conexión a la base de datos"""
-    # Asegurar que la carpeta instance existe
-    os.makedirs('instance', exist_ok=True)
-    conn = sqlite3.connect(DATABASE)
-    conn.row_factory = sqlite3.Row
-    return conn
+    """
+    Obtiene conexión a la base de datos.
+    Dentro de una petición devuelve siempre la misma conexión (tomada del pool y
+    liberada en el teardown); fuera de contexto (scripts, init_db) abre una conexión propia.
+    """
+    if has_app_context():
+        if 'db' not in g:
+            g.db = _db_pool.acquire()
+        return g.db
+    return _db_pool.connect()
+
+@app.teardown_appcontext
+def close_db(exception=None):
+    """Devuelve al pool la conexión de la petición, incluso si la ruta lanzó una excepción"""
+    conn = g.pop('db', None)
+    if conn is not None:
+        _db_pool.release(conn)
 
-def init_db():
-    """Inicializa la base de datos con las tablas necesarias"""
+# ============================================
+# CACHÉ DE DATOS DE PÁGINAS PÚBLICAS (por worker)
+# ============================================
+# Los listados públicos cambian solo cuando se edita contenido en el panel, así que
+# se guardan en memoria indexados por tabla; cualquier commit que escriba en una
+# tabla (rutas /admin/*) invalida las entradas que dependen de ella. Los cambios hechos
+# por otros workers llegan a través de la tabla content_version (ver migración 004).
+
+app.config['PAGE_DATA_CACHE'] = os.environ.get('PAGE_DATA_CACHE', '1') != '0'
+
+class PageDataCache:
+    """
+    Caché en memoria de resultados de consultas, con invalidación por tabla. Al llegar al tope
+    se descarta la entrada usada hace más tiempo (LRU). Las claves que eligen los clientes
+    (slugs, cursores, filtros de la API) van en una zona aparte con su propio tope, para que
+    un bot recorriendo valores no desaloje los datos de las páginas.
+    """
+
+    def __init__(self, max_entries=5000, max_param_entries=1000):
+        self._datos = OrderedDict()       # clave -> valor, de la usada hace más tiempo a la más reciente
+        self._parametros = OrderedDict()  # Lo mismo para las claves con parámetros del cliente
+        self._tablas = {}      # clave -> tablas de las que depende
+        self._por_tabla = {}   # tabla -> claves que dependen de ella
+        self._generacion = 0   # Cambia en cada invalidación (evita guardar datos obsoletos)
+        self._versiones = {}   # tabla -> (versión, updated_at) de content_version vista por este worker
+        self.max_entries = max_entries
+        self.max_param_entries = max_param_entries
+        self._lock = threading.Lock()
+
+    @property
+    def generation(self):
+        return self._generacion
+
+    def __len__(self):
+        return len(self._datos) + len(self._parametros)
+
+    def param_entries(self):
+        return len(self._parametros)
+
+    def _zona(self, key):
+        """Diccionario que guarda la clave (marcándola como recién usada) o None"""
+        for zona in (self._datos, self._parametros):
+            if key in zona:
+                zona.move_to_end(key)
+                return zona
+        return None
+
+    def _quitar(self, key):
+        for tabla in self._tablas.pop(key, ()):
+            claves = self._por_tabla.get(tabla)
+            if claves is not None:
+                claves.discard(key)
+
+    def get(self, key, default=None):
+        with self._lock:
+            zona = self._zona(key)
+            return zona[key] if zona is not None else default
+
+    def put(self, key, tables, value, generacion, parametros=False):
+        """Guarda un valor calculado en la generación indicada (se descarta si hubo una invalidación)"""
+        with self._lock:
+            if generacion != self._generacion:
+                return False
+            zona, tope = (self._parametros, self.max_param_entries) if parametros else (self._datos, self.max_entries)
+            if key not in zona:
+                while zona and len(zona) >= tope:
+                    antigua, _valor = zona.popitem(last=False)
+                    self._quitar(antigua)
+            zona[key] = value
+            zona.move_to_end(key)
+            self._tablas[key] = tuple(tables)
+            for tabla in tables:
+                self._por_tabla.setdefault(tabla, set()).add(key)
+            return True
+
+    def get_or_load(self, key, tables, loader, parametros=False):
+        """Devuelve el valor cacheado o lo calcula con loader() y lo guarda"""
+        with self._lock:
+            zona = self._zona(key)
+            if zona is not None:
+                return zona[key]
+            generacion = self._generacion
+        valor = loader()
+        self.put(key, tables, valor, generacion, parametros)
+        return valor
+
+    def invalidate(self, tables):
+        """Descarta las entradas que dependen de alguna de las tablas"""
+        with self._lock:
+            self._generacion += 1
+            for tabla in tables:
+                for key in self._por_tabla.pop(tabla, ()):
+                    self._datos.pop(key, None)
+                    self._parametros.pop(key, None)
+                    self._tablas.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._generacion += 1
+            self._datos.clear()
+            self._parametros.clear()
+            self._tablas.clear()
+            self._por_tabla.clear()
+            self._versiones.clear()
+
+    def sync_versions(self, versiones):
+        """Invalida las tablas cuya versión en content_version cambió desde la última lectura"""
+        with self._lock:
+            cambiadas = [tabla for tabla, version in versiones.items() if self._versiones.get(tabla) != version]
+            self._versiones = dict(versiones)
+        if cambiadas:
+            self.invalidate(cambiadas)
+        return cambiadas
+
+    def versions(self):
+        """Copia de las versiones conocidas: tabla -> (versión, updated_at)"""
+        with self._lock:
+            return dict(self._versiones)
+
+app.config['PAGE_CACHE_MAX_ENTRIES'] = int(os.environ.get('PAGE_CACHE_MAX_ENTRIES', '5000'))
+# Entradas con parámetros elegidos por el cliente (slugs, cursores, filtros de la API)
+app.config['PAGE_CACHE_MAX_PARAM_ENTRIES'] = int(os.environ.get('PAGE_CACHE_MAX_PARAM_ENTRIES', '1000'))
+page_cache = PageDataCache(app.config['PAGE_CACHE_MAX_ENTRIES'], app.config['PAGE_CACHE_MAX_PARAM_ENTRIES'])
+
+def invalidate_tables(tables):
+    """Invalida los datos cacheados que dependen de las tablas modificadas (llamado en commit())"""
+    page_cache.invalidate(tables)
+
+def sync_content_versions():
+    """
+    Aplica en este worker las invalidaciones hechas por otros procesos (otro worker,
+    otro nodo con el mismo archivo o un script). Se ejecuta una vez por petición:
+    PRAGMA data_version solo cambia si otra conexión hizo commit, y en ese caso
+    se lee content_version (una fila por tabla).
+    """
+    if not has_app_context() or g.get('_versiones_sincronizadas'):
+        return
+    g._versiones_sincronizadas = True
     conn = get_db()
+    data_version = conn.execute('PRAGMA data_version').fetchone()[0]
+    if conn.__dict__.get('_data_version') == data_version:
+        return
+    schema_catalog.check(conn)
+    try:
+        filas = conn.execute('SELECT tabla, version, updated_at FROM content_version').fetchall()
+    except sqlite3.OperationalError:
+        return  # Esquema sin migrar: solo queda la invalidación local en commit()
+    conn._data_version = data_version
+    page_cache.sync_versions({fila[0]: (fila[1], fila[2]) for fila in filas})
+
+# ============================================
+# VALIDADORES HTTP (ETag / Last-Modified)
+# ============================================
+# El ETag de una respuesta pública se calcula con las versiones de las tablas de las que
+# depende (content_version), el idioma y la fecha del despliegue, sin renderizar nada.
+
+def _fecha_despliegue():
+    """Última modificación de app.py, plantillas y traducciones (cambia con cada despliegue)"""
+    rutas = [os.path.abspath(__file__)]
+    for carpeta in (app.template_folder, 'translations'):
+        for raiz, _carpetas, archivos in os.walk(os.path.join(app.root_path, carpeta)):
+            rutas.extend(os.path.join(raiz, archivo) for archivo in archivos)
+    return datetime.fromtimestamp(int(max(os.path.getmtime(ruta) for ruta in rutas)), timezone.utc)
+
+DEPLOY_TIME = _fecha_despliegue()
+
+def content_validators(tables, *extra, versiones=None):
+    """
+    Devuelve (etag, last_modified) para una respuesta que depende de esas tablas,
+    o None si aún no se conocen las versiones (esquema sin migrar).
+    """
+    if versiones is None:
+        versiones = page_cache.versions()
+    if not versiones:
+        return None
+    dependencias = sorted((tabla, versiones[tabla]) for tabla in tables if tabla in versiones)
+    firma = json.dumps([DEPLOY_TIME.isoformat(), extra, dependencias])
+    etag = hashlib.sha1(firma.encode('utf-8')).hexdigest()[:24]
+    last_modified = DEPLOY_TIME
+    for _tabla, (_version, actualizado) in dependencias:
+        if actualizado:
+            fecha = datetime.strptime(actualizado, '%Y-%m-%d %H:%M:%S').replace(tzinfo=timezone.utc)
+            last_modified = max(last_modified, fecha)
+    return etag, last_modified
+
+def not_modified(validadores):
+    """True si la petición condicional (If-None-Match / If-Modified-Since) sigue vigente"""
+    etag, last_modified = validadores
+    return not is_resource_modified(request.environ, etag=etag, last_modified=last_modified)
+
+def with_validators(response, validadores):
+    """Agrega ETag y Last-Modified; el navegador revalida en cada visita (304 si no cambió)"""
+    if validadores:
+        etag, last_modified = validadores
+        response.set_etag(etag)
+        response.last_modified = last_modified
+    response.cache_control.no_cache = True
+    return response
+
+def not_modified_response(validadores):
+    """Respuesta 304 sin cuerpo"""
+    return with_validators(app.response_class(status=304), validadores)
+
+def cached_value(key, tables, loader, parametros=False):
+    """
+    Valor derivado de la base de datos (estructura ya procesada), cacheado por worker
+    e invalidado igual que cached_query() cuando cambia alguna de las tablas.
+    parametros=True si la clave depende de valores elegidos por el cliente (slug, cursor,
+    filtros): se guarda en la zona con tope propio de PageDataCache.
+    """
+    if has_app_context() and '_tablas_pagina' in g:
+        g._tablas_pagina |= set(tables)  # Dependencias de la página HTML en construcción (ver cached_page)
+    if not app.config['PAGE_DATA_CACHE']:
+        return loader()
+    sync_content_versions()
+    return page_cache.get_or_load(key, tables, loader, parametros)
+
+def cached_records(sql, params=(), one=False, parametros=False):
+    """
+    Como cached_query(), pero devuelve objetos Registro con los campos ya traducidos al
+    idioma actual (se cachea una proyección por idioma).
+    """
+    lang = get_language()
+    def cargar():
+        cursor = get_db().execute(sql, params)
+        if one:
+            fila = cursor.fetchone()
+            return proyectar(fila, lang) if fila else None
+        return [proyectar(fila, lang) for fila in cursor.fetchall()]
+    
+    resultado = cached_value(('registros', lang, sql, tuple(params), one), _tablas_leidas(sql), cargar, parametros)
+    return list(resultado) if isinstance(resultado, list) else resultado
+
+def cached_query(sql, params=(), one=False, parametros=False):
+    """
+    Ejecuta un SELECT de contenido público usando la caché por worker.
+    El resultado se invalida automáticamente cuando se escribe en alguna de las tablas del FROM/JOIN.
+    """
+    def cargar():
+        cursor = get_db().execute(sql, params)
+        return cursor.fetchone() if one else cursor.fetchall()
+    
+    resultado = cached_value((sql, tuple(params), one), _tablas_leidas(sql), cargar, parametros)
+    # Copia de la lista para que la ruta pueda modificarla sin alterar la caché
+    return list(resultado) if isinstance(resultado, list) else resultado
+
+# HTML completo de las páginas públicas, por ruta e idioma. Depende de las mismas
+# tablas que las consultas hechas con cached_query() durante el renderizado.
+app.config['PAGE_HTML_CACHE'] = os.environ.get('PAGE_HTML_CACHE', '1') != '0'
+app.config['PAGE_HTML_CACHE_TTL'] = int(os.environ.get('PAGE_HTML_CACHE_TTL', '300'))  # Segundos
+
+# (ruta, idioma) -> tablas leídas al renderizar la página; permite responder 304 sin renderizar
+_dependencias_paginas = {}
+
+def _pagina_cacheable():
+    """Solo visitantes anónimos, GET sin parámetros y sin mensajes flash pendientes"""
+    return (request.method == 'GET'
+            and not request.query_string
+            and 'admin_id' not in session
+            and '_flashes' not in session)
+
+def cached_page(f):
+    """Decorador: responde 304 o sirve el HTML renderizado desde la caché del worker"""
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        if not _pagina_cacheable():
+            return f(*args, **kwargs)
+        sync_content_versions()
+        versiones = page_cache.versions()
+        key = (request.script_root + request.path, get_language())
+        if key in _dependencias_paginas:
+            validadores = content_validators(_dependencias_paginas[key], *key, versiones=versiones)
+            if validadores and not_modified(validadores):
+                return not_modified_response(validadores)
+        if app.config['PAGE_HTML_CACHE']:
+            entrada = page_cache.get(('html',) + key)
+            if entrada and entrada[0] > time.time():
+                return with_validators(app.response_class(entrada[1], mimetype='text/html'), entrada[2])
+        
+        generacion = page_cache.generation
+        g._tablas_pagina = set()
+        response = app.make_response(f(*args, **kwargs))
+        tablas = g.pop('_tablas_pagina')
+        if (response.status_code == 200
+                and response.mimetype == 'text/html'
+                and not response.direct_passthrough
+                and '_flashes' not in session
+                and not get_flashed_messages()):
+            # Las páginas con formularios llevan el token CSRF de la sesión: no se comparten
+            if not g.get('_csrf_en_pagina'):
+                _dependencias_paginas[key] = frozenset(tablas)
+                # Versiones leídas antes de renderizar: si el contenido cambió mientras tanto,
+                # el ETag queda atrasado y el cliente simplemente vuelve a descargar la página
+                validadores = content_validators(tablas, *key, versiones=versiones)
+                if app.config['PAGE_HTML_CACHE']:
+                    expira = time.time() + app.config['PAGE_HTML_CACHE_TTL']
+                    page_cache.put(('html',) + key, tablas, (expira, response.get_data(), validadores), generacion)
+                with_validators(response, validadores)
+        return response
+    return decorated_function
+
+def check_db_settings():
+    """Verifica al iniciar que los PRAGMAs configurados quedaron activos y los reporta"""
+    conn = _db_pool.connect()
+    try:
+        activos = {nombre: conn.execute(f'PRAGMA {nombre}').fetchone()[0] for nombre in app.config['SQLITE_PRAGMAS']}
+    finally:
+        conn.close()
+    print("✅ SQLite: " + ", ".join(f"{nombre}={valor}" for nombre, valor in activos.items()))
+    esperado = str(app.config['SQLITE_PRAGMAS'].get('journal_mode', '')).lower()
+    if esperado and str(activos.get('journal_mode', '')).lower() != esperado:
+        print(f"⚠️  ADVERTENCIA: journal_mode={activos.get('journal_mode')} (se esperaba {esperado}).")
+        print("   Las lecturas públicas pueden bloquearse durante las escrituras del panel.")
+    return activos
+
+# ============================================
+# MIGRACIONES DE ESQUEMA
+# ============================================
+# La versión del esquema se guarda en PRAGMA user_version. Cada migración se aplica
+# una sola vez y en orden, así que al iniciar un worker basta con comparar ese entero.
+
+def _table_columns(conn, table):
+    """Devuelve el conjunto de columnas de una tabla (vacío si la tabla no existe)"""
+    return {col[1] for col in conn.execute(f'PRAGMA table_info({table})').fetchall()}
+
+def _add_columns(conn, table, columns):
+    """Agrega a una tabla las columnas que le falten (para bases de datos existentes)"""
+    existentes = _table_columns(conn, table)
+    for nombre, definicion in columns:
+        if nombre not in existentes:
+            conn.execute(f'ALTER TABLE {table} ADD COLUMN {nombre} {definicion}')
+
+class SchemaCatalog:
+    """
+    Columnas de cada tabla, leídas una sola vez por worker (en lugar de PRAGMA table_info
+    en cada petición). Se recarga al aplicar migraciones y cuando PRAGMA schema_version
+    indica que otro proceso cambió el esquema.
+    """
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._tablas = None
+        self._schema_version = None
+    
+    def _cargar(self):
+        conn = _db_pool.connect()
+        try:
+            version = conn.execute('PRAGMA schema_version').fetchone()[0]
+            nombres = conn.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%'"
+            ).fetchall()
+            tablas = {fila[0]: frozenset(_table_columns(conn, fila[0])) for fila in nombres}
+        finally:
+            conn.close()
+        with self._lock:
+            self._tablas, self._schema_version = tablas, version
+        return tablas
+    
+    def columns(self, table):
+        """Conjunto de columnas de la tabla (vacío si no existe)"""
+        tablas = self._tablas
+        if tablas is None:
+            tablas = self._cargar()
+        return tablas.get(table, frozenset())
+    
+    def has_column(self, table, column):
+        return column in self.columns(table)
+    
+    def check(self, conn):
+        """Descarta el catálogo si el esquema cambió desde que se cargó"""
+        if self._tablas is not None and conn.execute('PRAGMA schema_version').fetchone()[0] != self._schema_version:
+            self.invalidate()
+    
+    def invalidate(self):
+        with self._lock:
+            self._tablas = self._schema_version = None
+
+schema_catalog = SchemaCatalog()
+
+def _migracion_001_esquema_inicial(conn):
+    """Tablas base del sitio y columnas agregadas antes de existir las migraciones"""
     
     # Tabla de administradores
     conn.execute('''
@@ -307,47 +935,19 @@ def init_db():
     ''')
     
     # Agregar columnas de imagen si no existen (para bases de datos existentes)
-    try:
-        conn.execute('ALTER TABLE noticias ADD COLUMN imagen_zoom REAL DEFAULT 1.0')
-    except:
-        pass  # La columna ya existe
-    try:
-        conn.execute('ALTER TABLE noticias ADD COLUMN imagen_x REAL DEFAULT 0.0')
-    except:
-        pass  # La columna ya existe
-    try:
-        conn.execute('ALTER TABLE noticias ADD COLUMN imagen_y REAL DEFAULT 0.0')
-    except:
-        pass  # La columna ya existe
-    # Campos de traducción para noticias
-    try:
-        conn.execute('ALTER TABLE noticias ADD COLUMN titulo_en TEXT')
-    except:
-        pass
-    try:
-        conn.execute('ALTER TABLE noticias ADD COLUMN resumen_en TEXT')
-    except:
-        pass
-    try:
-        conn.execute('ALTER TABLE noticias ADD COLUMN contenido_en TEXT')
-    except:
-        pass
-    try:
-        conn.execute('ALTER TABLE noticias ADD COLUMN categoria_en TEXT')
-    except:
-        pass
-    try:
-        conn.execute('ALTER TABLE noticias ADD COLUMN slug TEXT')
-    except:
-        pass
-    try:
-        conn.execute('ALTER TABLE noticias ADD COLUMN autor TEXT')
-    except:
-        pass
-    try:
-        conn.execute('ALTER TABLE noticias ADD COLUMN autor_en TEXT')
-    except:
-        pass
+    _add_columns(conn, 'noticias', [
+        ('imagen_zoom', 'REAL DEFAULT 1.0'),
+        ('imagen_x', 'REAL DEFAULT 0.0'),
+        ('imagen_y', 'REAL DEFAULT 0.0'),
+        # Campos de traducción, slug y autor
+        ('titulo_en', 'TEXT'),
+        ('resumen_en', 'TEXT'),
+        ('contenido_en', 'TEXT'),
+        ('categoria_en', 'TEXT'),
+        ('slug', 'TEXT'),
+        ('autor', 'TEXT'),
+        ('autor_en', 'TEXT'),
+    ])
     # Generar slugs para noticias existentes que no tienen
     try:
         sin_slug = conn.execute('SELECT id, titulo FROM noticias WHERE slug IS NULL OR slug = ""').fetchall()
@@ -359,145 +959,26 @@ def init_db():
             slug = base if base not in slugs_usados else f'{base}-{row["id"]}'
             slugs_usados.add(slug)
             conn.execute('UPDATE noticias SET slug = ? WHERE id = ?', (slug, row['id']))
-        conn.commit()
-    except Exception:
+    except sqlite3.Error:
         pass
     
     # Campos de traducción para testimonios
-    try:
-        conn.execute('ALTER TABLE testimonios ADD COLUMN titulo_en TEXT')
-    except:
-        pass
-    try:
-        conn.execute('ALTER TABLE testimonios ADD COLUMN contenido_en TEXT')
-    except:
-        pass
+    _add_columns(conn, 'testimonios', [
+        ('titulo_en', 'TEXT'),
+        ('contenido_en', 'TEXT'),
+    ])
     
     # Campos de traducción para programas
-    try:
-        conn.execute('ALTER TABLE programas ADD COLUMN titulo_en TEXT')
-    except:
-        pass
-    try:
-        conn.execute('ALTER TABLE programas ADD COLUMN descripcion_en TEXT')
-    except:
-        pass
-    try:
-        conn.execute('ALTER TABLE programas ADD COLUMN tipo_en TEXT')
-    except:
-        pass
-    try:
-        conn.execute('ALTER TABLE programas ADD COLUMN modalidad_en TEXT')
-    except:
-        pass
-    try:
-        conn.execute('ALTER TABLE programas ADD COLUMN horario_en TEXT')
-    except:
-        pass
-    try:
-        conn.execute('ALTER TABLE programas ADD COLUMN texto_boton_en TEXT')
-    except:
-        pass
-    try:
-        conn.execute('ALTER TABLE programas ADD COLUMN patrocinio_en TEXT')
-    except:
-        pass
-    try:
-        conn.execute('ALTER TABLE programas ADD COLUMN auspicio_en TEXT')
-    except:
-        pass
-    
-    # Campos de traducción para proyectos
-    try:
-        conn.execute('ALTER TABLE proyectos ADD COLUMN titulo_en TEXT')
-    except:
-        pass
-    try:
-        conn.execute('ALTER TABLE proyectos ADD COLUMN descripcion_en TEXT')
-    except:
-        pass
-    try:
-        conn.execute('ALTER TABLE proyectos ADD COLUMN tipo_en TEXT')
-    except:
-        pass
-    
-    # Campos adicionales para proyectos FONDECYT/FONDEF
-    try:
-        conn.execute('ALTER TABLE proyectos ADD COLUMN codigo_proyecto TEXT')
-    except:
-        pass
-    try:
-        conn.execute('ALTER TABLE proyectos ADD COLUMN año_inicio INTEGER')
-    except:
-        pass
-    try:
-        conn.execute('ALTER TABLE proyectos ADD COLUMN año_fin INTEGER')
-    except:
-        pass
-    try:
-        conn.execute('ALTER TABLE proyectos ADD COLUMN investigadores TEXT')
-    except:
-        pass
-    try:
-        conn.execute('ALTER TABLE proyectos ADD COLUMN presupuesto TEXT')
-    except:
-        pass
-    try:
-        conn.execute('ALTER TABLE proyectos ADD COLUMN resultados TEXT')
-    except:
-        pass
-    try:
-        conn.execute('ALTER TABLE proyectos ADD COLUMN estado TEXT DEFAULT "en_curso"')
-    except:
-        pass
-    try:
-        conn.execute('ALTER TABLE proyectos ADD COLUMN financiador TEXT')
-    except:
-        pass
-    
-    # Campos de traducción para publicaciones
-    try:
-        conn.execute('ALTER TABLE publicaciones ADD COLUMN titulo_en TEXT')
-    except:
-        pass
-    try:
-        conn.execute('ALTER TABLE publicaciones ADD COLUMN descripcion_en TEXT')
-    except:
-        pass
-    
-    # Campos adicionales para publicaciones científicas
-    try:
-        conn.execute('ALTER TABLE publicaciones ADD COLUMN doi TEXT')
-    except:
-        pass
-    try:
-        conn.execute('ALTER TABLE publicaciones ADD COLUMN autores TEXT')
-    except:
-        pass
-    try:
-        conn.execute('ALTER TABLE publicaciones ADD COLUMN volumen TEXT')
-    except:
-        pass
-    try:
-        conn.execute('ALTER TABLE publicaciones ADD COLUMN numero TEXT')
-    except:
-        pass
-    try:
-        conn.execute('ALTER TABLE publicaciones ADD COLUMN paginas TEXT')
-    except:
-        pass
-    try:
-        conn.execute('ALTER TABLE publicaciones ADD COLUMN tipo_publicacion TEXT')
-    except:
-        pass
-    try:
-        conn.execute('ALTER TABLE publicaciones ADD COLUMN factor_impacto TEXT')
-    except:
-        pass
-    try:
-        conn.execute('ALTER TABLE publicaciones ADD COLUMN base_datos TEXT')
-    except:
-        pass
+    _add_columns(conn, 'programas', [
+        ('titulo_en', 'TEXT'),
+        ('descripcion_en', 'TEXT'),
+        ('tipo_en', 'TEXT'),
+        ('modalidad_en', 'TEXT'),
+        ('horario_en', 'TEXT'),
+        ('texto_boton_en', 'TEXT'),
+        ('patrocinio_en', 'TEXT'),
+        ('auspicio_en', 'TEXT'),
+    ])
     
     # Tabla de organigrama (cargos/posiciones)
     conn.execute('''
@@ -516,20 +997,6 @@ def init_db():
             updated_at TEXT DEFAULT CURRENT_TIMESTAMP
         )
     ''')
-    # Migración: agregar campos de traducción si no existen (para bases de datos existentes)
-    try:
-        conn.execute('ALTER TABLE organigrama ADD COLUMN subseccion_en TEXT')
-    except:
-        pass  # La columna ya existe
-    try:
-        conn.execute('ALTER TABLE organigrama ADD COLUMN cargo_en TEXT')
-    except:
-        pass  # La columna ya existe
-    try:
-        conn.execute('ALTER TABLE organigrama ADD COLUMN descripcion_en TEXT')
-    except:
-        pass  # La columna ya existe
-    
     # Tabla de miembros del equipo (ahora referencian cargos del organigrama)
     conn.execute('''
         CREATE TABLE IF NOT EXISTS equipo (
@@ -553,12 +1020,6 @@ def init_db():
             FOREIGN KEY (cargo_id) REFERENCES organigrama(id)
         )
     ''')
-    # Migración: agregar campos de traducción si no existen (para bases de datos existentes)
-    try:
-        conn.execute('ALTER TABLE equipo ADD COLUMN biografia_en TEXT')
-    except:
-        pass  # La columna ya existe
-    
     # Tabla de configuración de redes sociales (gratuito)
     conn.execute('''
         CREATE TABLE IF NOT EXISTS configuracion_redes (
@@ -573,38 +1034,14 @@ def init_db():
     ''')
     
     # Agregar columnas si no existen (para bases de datos existentes)
-    try:
-        conn.execute('ALTER TABLE equipo ADD COLUMN cargo_id INTEGER')
-    except:
-        pass  # La columna ya existe
-    try:
-        conn.execute('ALTER TABLE equipo ADD COLUMN tags TEXT')
-    except:
-        pass  # La columna ya existe
-    try:
-        conn.execute('ALTER TABLE equipo ADD COLUMN redes_sociales TEXT')
-    except:
-        pass  # La columna ya existe
-    try:
-        conn.execute('ALTER TABLE equipo ADD COLUMN imagen_zoom REAL DEFAULT 1.0')
-    except:
-        pass  # La columna ya existe
-    try:
-        conn.execute('ALTER TABLE equipo ADD COLUMN imagen_x REAL DEFAULT 0.0')
-    except:
-        pass  # La columna ya existe
-    try:
-        conn.execute('ALTER TABLE equipo ADD COLUMN imagen_y REAL DEFAULT 0.0')
-    except:
-        pass  # La columna ya existe
-    try:
-        conn.execute('ALTER TABLE clientes ADD COLUMN mostrar_en_index INTEGER DEFAULT 0')
-    except:
-        pass  # La columna ya existe
-    try:
-        conn.execute('ALTER TABLE clientes ADD COLUMN mostrar_en_casa_omsa INTEGER DEFAULT 0')
-    except:
-        pass  # La columna ya existe
+    _add_columns(conn, 'equipo', [
+        ('cargo_id', 'INTEGER'),
+        ('tags', 'TEXT'),
+        ('redes_sociales', 'TEXT'),
+        ('imagen_zoom', 'REAL DEFAULT 1.0'),
+        ('imagen_x', 'REAL DEFAULT 0.0'),
+        ('imagen_y', 'REAL DEFAULT 0.0'),
+    ])
     
     # Tabla de convenios/alianzas
     conn.execute('''
@@ -641,21 +1078,12 @@ def init_db():
         )
     ''')
     
-    # Agregar columna de ajustes si no existe
-    try:
-        conn.execute('ALTER TABLE hero_media ADD COLUMN imagenes_ajustes TEXT')
-    except:
-        pass
-    
-    # Agregar campo para referenciar imágenes de la galería
-    try:
-        conn.execute('ALTER TABLE hero_media ADD COLUMN usar_galeria INTEGER DEFAULT 0')
-    except:
-        pass
-    try:
-        conn.execute('ALTER TABLE hero_media ADD COLUMN categoria_galeria TEXT')
-    except:
-        pass
+    # Columna de ajustes y campos para referenciar imágenes de la galería
+    _add_columns(conn, 'hero_media', [
+        ('imagenes_ajustes', 'TEXT'),
+        ('usar_galeria', 'INTEGER DEFAULT 0'),
+        ('categoria_galeria', 'TEXT'),
+    ])
     
     # Tabla de tarjetas destacadas (tarjetas blancas con título, contenido y enlace opcional)
     conn.execute('''
@@ -693,11 +1121,13 @@ def init_db():
         )
     ''')
     
-    # Campos de traducción para clientes/aliados
-    try:
-        conn.execute('ALTER TABLE clientes ADD COLUMN nombre_en TEXT')
-    except:
-        pass
+    # Columnas agregadas después de crear la tabla (para bases de datos existentes)
+    _add_columns(conn, 'clientes', [
+        ('mostrar_en_index', 'INTEGER DEFAULT 0'),
+        ('mostrar_en_casa_omsa', 'INTEGER DEFAULT 0'),
+        # Campos de traducción para clientes/aliados
+        ('nombre_en', 'TEXT'),
+    ])
     
     # Tabla de estadísticas/números destacados
     conn.execute('''
@@ -714,10 +1144,9 @@ def init_db():
         )
     ''')
     # Migración: agregar campo etiqueta_en si no existe (para bases de datos existentes)
-    try:
-        conn.execute('ALTER TABLE estadisticas ADD COLUMN etiqueta_en TEXT')
-    except:
-        pass  # La columna ya existe
+    _add_columns(conn, 'estadisticas', [
+        ('etiqueta_en', 'TEXT'),
+    ])
     
     # Tabla de eventos
     conn.execute('''
@@ -740,27 +1169,9 @@ def init_db():
             updated_at TEXT DEFAULT CURRENT_TIMESTAMP
         )
     ''')
-    # Migración: agregar campos de traducción si no existen (para bases de datos existentes)
-    try:
-        conn.execute('ALTER TABLE eventos ADD COLUMN titulo_en TEXT')
-    except:
-        pass  # La columna ya existe
-    try:
-        conn.execute('ALTER TABLE eventos ADD COLUMN descripcion_en TEXT')
-    except:
-        pass  # La columna ya existe
-    try:
-        conn.execute('ALTER TABLE eventos ADD COLUMN meta_en TEXT')
-    except:
-        pass  # La columna ya existe
-    try:
-        conn.execute('ALTER TABLE eventos ADD COLUMN texto_boton_en TEXT')
-    except sqlite3.OperationalError:
-        pass  # La columna ya existe
-    try:
-        conn.execute('ALTER TABLE eventos ADD COLUMN destacada INTEGER DEFAULT 0')
-    except sqlite3.OperationalError:
-        pass  # La columna ya existe
+    _add_columns(conn, 'eventos', [
+        ('destacada', 'INTEGER DEFAULT 0'),
+    ])
     
     # Tabla de contenido editable (textos generales)
     conn.execute('''
@@ -805,11 +1216,23 @@ def init_db():
         )
     ''')
     
-    # Agregar campo imagen a proyectos si no existe
-    try:
-        conn.execute('ALTER TABLE proyectos ADD COLUMN imagen TEXT')
-    except:
-        pass
+    # Columnas agregadas después de crear la tabla (para bases de datos existentes)
+    _add_columns(conn, 'proyectos', [
+        ('imagen', 'TEXT'),
+        # Campos de traducción
+        ('titulo_en', 'TEXT'),
+        ('descripcion_en', 'TEXT'),
+        ('tipo_en', 'TEXT'),
+        # Campos adicionales para proyectos FONDECYT/FONDEF
+        ('codigo_proyecto', 'TEXT'),
+        ('año_inicio', 'INTEGER'),
+        ('año_fin', 'INTEGER'),
+        ('investigadores', 'TEXT'),
+        ('presupuesto', 'TEXT'),
+        ('resultados', 'TEXT'),
+        ('estado', 'TEXT DEFAULT "en_curso"'),
+        ('financiador', 'TEXT'),
+    ])
     
     # Tabla de publicaciones científicas
     conn.execute('''
@@ -828,6 +1251,22 @@ def init_db():
         )
     ''')
     
+    # Columnas agregadas después de crear la tabla (para bases de datos existentes)
+    _add_columns(conn, 'publicaciones', [
+        # Campos de traducción
+        ('titulo_en', 'TEXT'),
+        ('descripcion_en', 'TEXT'),
+        # Campos adicionales para publicaciones científicas
+        ('doi', 'TEXT'),
+        ('autores', 'TEXT'),
+        ('volumen', 'TEXT'),
+        ('numero', 'TEXT'),
+        ('paginas', 'TEXT'),
+        ('tipo_publicacion', 'TEXT'),
+        ('factor_impacto', 'TEXT'),
+        ('base_datos', 'TEXT'),
+    ])
+    
     # Tabla de preguntas frecuentes (FAQ)
     conn.execute('''
         CREATE TABLE IF NOT EXISTS faq (
@@ -860,17 +1299,11 @@ def init_db():
         )
     ''')
     
-    # Agregar campo pagina a galeria_imagenes si no existe
-    try:
-        conn.execute('ALTER TABLE galeria_imagenes ADD COLUMN pagina TEXT')
-    except:
-        pass
-    
-    # Agregar campo es_video a galeria_imagenes si no existe
-    try:
-        conn.execute('ALTER TABLE galeria_imagenes ADD COLUMN es_video INTEGER DEFAULT 0')
-    except:
-        pass
+    # Agregar campos pagina y es_video a galeria_imagenes si no existen
+    _add_columns(conn, 'galeria_imagenes', [
+        ('pagina', 'TEXT'),
+        ('es_video', 'INTEGER DEFAULT 0'),
+    ])
     
     # Tabla de certificados y reconocimientos
     conn.execute('''
@@ -922,15 +1355,10 @@ def init_db():
     ''')
     
     # Migración: agregar columnas de autorización si no existen
-    try:
-        conn.execute('ALTER TABLE metodologias ADD COLUMN autorizado_sag INTEGER DEFAULT 0')
-    except sqlite3.OperationalError:
-        pass  # La columna ya existe
-    
-    try:
-        conn.execute('ALTER TABLE metodologias ADD COLUMN autorizado_sernapesca INTEGER DEFAULT 0')
-    except sqlite3.OperationalError:
-        pass  # La columna ya existe
+    _add_columns(conn, 'metodologias', [
+        ('autorizado_sag', 'INTEGER DEFAULT 0'),
+        ('autorizado_sernapesca', 'INTEGER DEFAULT 0'),
+    ])
     
     # Crear usuario admin por defecto si no existe
     cursor = conn.execute('SELECT COUNT(*) as count FROM admins')
@@ -941,9 +1369,341 @@ def init_db():
                     ('admin', default_password))
         print("✅ Usuario admin creado: username='admin', password='admin123'")
         print("⚠️  IMPORTANTE: Cambia la contraseña después del primer login")
+
+
+def _migracion_002_columnas_traduccion(conn):
+    """Columnas de traducción de eventos, organigrama y equipo (antes migrar_columnas_traduccion.py)"""
+    _add_columns(conn, 'eventos', [
+        ('titulo_en', 'TEXT'),
+        ('descripcion_en', 'TEXT'),
+        ('meta_en', 'TEXT'),
+        ('texto_boton_en', 'TEXT'),
+    ])
+    _add_columns(conn, 'organigrama', [
+        ('subseccion_en', 'TEXT'),
+        ('cargo_en', 'TEXT'),
+        ('descripcion_en', 'TEXT'),
+    ])
+    _add_columns(conn, 'equipo', [
+        ('biografia_en', 'TEXT'),
+    ])
+
+def _migracion_003_indices_listados_publicos(conn):
+    """Índices parciales para los listados públicos (filtran por activo/activa y ordenan por orden, id o fecha)"""
+    indices = [
+        'CREATE INDEX IF NOT EXISTS idx_estadisticas_publicas ON estadisticas(orden, id) WHERE activo = 1',
+        'CREATE INDEX IF NOT EXISTS idx_noticias_destacadas ON noticias(fecha DESC, id DESC) WHERE activa = 1 AND destacada = 1',
+        'CREATE INDEX IF NOT EXISTS idx_noticias_slug ON noticias(slug)',
+        'CREATE INDEX IF NOT EXISTS idx_eventos_destacados ON eventos(orden, id) WHERE activo = 1 AND destacada = 1',
+        'CREATE INDEX IF NOT EXISTS idx_clientes_publicos ON clientes(orden, id) WHERE activo = 1',
+        'CREATE INDEX IF NOT EXISTS idx_tarjetas_pagina ON tarjetas_destacadas(pagina, orden, id) WHERE activo = 1',
+        'CREATE INDEX IF NOT EXISTS idx_galeria_publica ON galeria_imagenes(orden, id DESC) WHERE activo = 1',
+        'CREATE INDEX IF NOT EXISTS idx_programas_publicos ON programas(orden, id DESC) WHERE activo = 1',
+        'CREATE INDEX IF NOT EXISTS idx_testimonios_publicos ON testimonios(orden, id DESC) WHERE activo = 1',
+        'CREATE INDEX IF NOT EXISTS idx_convenios_publicos ON convenios(orden, id) WHERE activo = 1',
+        'CREATE INDEX IF NOT EXISTS idx_proyectos_publicos ON proyectos(orden, id) WHERE activo = 1',
+        'CREATE INDEX IF NOT EXISTS idx_publicaciones_publicas ON publicaciones(orden, id) WHERE activo = 1',
+        'CREATE INDEX IF NOT EXISTS idx_faq_publicas ON faq(categoria, orden, id) WHERE activo = 1',
+        'CREATE INDEX IF NOT EXISTS idx_certificados_publicos ON certificados(organismo, orden, id) WHERE activo = 1',
+        'CREATE INDEX IF NOT EXISTS idx_metodologias_publicas ON metodologias(categoria, orden, nombre) WHERE activo = 1',
+        'CREATE INDEX IF NOT EXISTS idx_organigrama_publico ON organigrama(seccion, orden, id) WHERE activo = 1',
+        'CREATE INDEX IF NOT EXISTS idx_equipo_cargo ON equipo(cargo_id, orden) WHERE activo = 1',
+        'CREATE INDEX IF NOT EXISTS idx_equipo_publico ON equipo(orden, id) WHERE activo = 1',
+    ]
+    for sql in indices:
+        conn.execute(sql)
+
+# Tablas de contenido público: cada escritura incrementa su contador en content_version
+CONTENT_TABLES = (
+    'programas', 'testimonios', 'noticias', 'organigrama', 'equipo', 'configuracion_redes',
+    'convenios', 'hero_media', 'tarjetas_destacadas', 'clientes', 'estadisticas', 'eventos',
+    'contenido', 'proyectos', 'publicaciones', 'faq', 'galeria_imagenes', 'certificados',
+    'metodologias',
+)
+
+def _crear_triggers_version(conn, tabla):
+    """Triggers que incrementan content_version en la misma transacción que cada escritura"""
+    conn.execute('INSERT OR IGNORE INTO content_version (tabla) VALUES (?)', (tabla,))
+    for evento in ('INSERT', 'UPDATE', 'DELETE'):
+        conn.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_{tabla}_version_{evento.lower()}
+            AFTER {evento} ON {tabla}
+            BEGIN
+                UPDATE content_version SET version = version + 1, updated_at = CURRENT_TIMESTAMP
+                WHERE tabla = '{tabla}';
+            END
+        ''')
+
+def _migracion_004_versiones_contenido(conn):
+    """Contador de cambios por tabla, para invalidar las cachés de todos los workers y nodos"""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS content_version (
+            tabla TEXT PRIMARY KEY,
+            version INTEGER NOT NULL DEFAULT 0,
+            updated_at TEXT DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    # Con triggers también se cubren las escrituras hechas fuera de la app
+    # (importar_metodologias_excel.py, create_admin.py, sqlite3 manual, etc.)
+    for tabla in CONTENT_TABLES:
+        _crear_triggers_version(conn, tabla)
+
+def _migracion_005_html_noticias(conn):
+    """HTML sanitizado de cada noticia por idioma, generado al guardar (ver _guardar_html_noticia)"""
+    _add_columns(conn, 'noticias', [
+        ('contenido_html', 'TEXT'),
+        ('contenido_html_en', 'TEXT'),
+        ('sanitizer_version', 'INTEGER'),  # NULL o distinta de SANITIZER_VERSION: se sanitiza al mostrarla
+    ])
+    _resanitizar_noticias(conn)
+
+def _migracion_006_slugs_noticias(conn):
+    """Slug único por noticia y registro de slugs anteriores (redirecciones 301 al slug vigente)"""
+    # Duplicados existentes: la noticia más antigua conserva el slug, las demás reciben -id
+    duplicados = conn.execute('''
+        SELECT id, slug FROM noticias
+        WHERE slug IN (SELECT slug FROM noticias WHERE slug != '' GROUP BY slug HAVING COUNT(*) > 1)
+        ORDER BY slug, id
+    ''').fetchall()
+    vistos = set()
+    for fila in duplicados:
+        if fila['slug'] in vistos:
+            conn.execute('UPDATE noticias SET slug = ? WHERE id = ?', (_slug_con_id(conn, fila['slug'], fila['id']), fila['id']))
+        vistos.add(fila['slug'])
+    conn.execute("UPDATE noticias SET slug = NULL WHERE slug = ''")
+    conn.execute('DROP INDEX IF EXISTS idx_noticias_slug')
+    conn.execute('CREATE UNIQUE INDEX IF NOT EXISTS idx_noticias_slug ON noticias(slug)')
     
-    conn.commit()
-    conn.close()
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS noticias_slugs (
+            slug TEXT PRIMARY KEY,  -- Slug anterior de una noticia
+            noticia_id INTEGER NOT NULL,
+            created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (noticia_id) REFERENCES noticias(id)
+        )
+    ''')
+    _crear_triggers_version(conn, 'noticias_slugs')
+
+def _migracion_007_navegacion_noticias(conn):
+    """Noticias relacionadas y anterior/siguiente precalculadas (ver _recalcular_navegacion_noticias)"""
+    _add_columns(conn, 'noticias', [
+        ('navegacion', 'TEXT'),  # JSON; NULL: se calcula en memoria al mostrar la noticia
+    ])
+    # Recorrido de todas las noticias activas en el orden del listado al recalcularla
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_noticias_activas ON noticias(fecha DESC, id DESC) WHERE activa = 1')
+    _recalcular_navegacion_noticias(conn)
+
+# Columnas de metodologias del índice de texto completo (y sus pesos en bm25, ver buscar_metodologias)
+_COLUMNAS_FTS_METODOLOGIAS = (
+    'nombre', 'nombre_en', 'analito', 'analito_en', 'matriz', 'matriz_en', 'tecnica', 'tecnica_en', 'categoria',
+)
+
+def _migracion_008_fts_metodologias(conn):
+    """
+    Índice FTS5 de metodologias (sin distinguir acentos ni mayúsculas), actualizado por triggers.
+    Si el SQLite instalado no incluye FTS5 no se crea y la búsqueda usa IndiceMetodologias.
+    """
+    columnas = ', '.join(_COLUMNAS_FTS_METODOLOGIAS)
+    try:
+        conn.execute(f'''
+            CREATE VIRTUAL TABLE IF NOT EXISTS metodologias_fts USING fts5(
+                {columnas},
+                content='metodologias', content_rowid='id',
+                tokenize='unicode61 remove_diacritics 2'
+            )
+        ''')
+    except sqlite3.OperationalError as e:
+        print(f"⚠️  FTS5 no disponible ({e}): la búsqueda de metodologías usará el índice en memoria")
+        return
+    nuevos = ', '.join(f'new.{columna}' for columna in _COLUMNAS_FTS_METODOLOGIAS)
+    anteriores = ', '.join(f'old.{columna}' for columna in _COLUMNAS_FTS_METODOLOGIAS)
+    insertar = f'INSERT INTO metodologias_fts (rowid, {columnas}) VALUES (new.id, {nuevos});'
+    borrar = f"INSERT INTO metodologias_fts (metodologias_fts, rowid, {columnas}) VALUES ('delete', old.id, {anteriores});"
+    for evento, cuerpo in (('INSERT', insertar), ('DELETE', borrar), ('UPDATE', borrar + ' ' + insertar)):
+        conn.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_metodologias_fts_{evento.lower()}
+            AFTER {evento} ON metodologias
+            BEGIN
+                {cuerpo}
+            END
+        ''')
+    conn.execute("INSERT INTO metodologias_fts (metodologias_fts) VALUES ('rebuild')")
+
+def _migracion_009_indices_api_metodologias(conn):
+    """Índices parciales para los filtros de /api/metodologias (ordenados por id para la paginación)"""
+    for columna in ('categoria', 'matriz', 'matriz_en', 'tecnica', 'tecnica_en', 'acreditada'):
+        conn.execute(f'CREATE INDEX IF NOT EXISTS idx_metodologias_api_{columna} ON metodologias({columna}, id) WHERE activo = 1')
+
+# Lista ordenada de migraciones: (versión, descripción, función)
+# Para cambiar el esquema, agregar una función nueva al final; nunca editar una ya publicada.
+MIGRATIONS = [
+    (1, 'Esquema inicial', _migracion_001_esquema_inicial),
+    (2, 'Columnas de traducción de eventos, organigrama y equipo', _migracion_002_columnas_traduccion),
+    (3, 'Índices para los listados públicos', _migracion_003_indices_listados_publicos),
+    (4, 'Versiones de contenido para invalidar cachés entre workers', _migracion_004_versiones_contenido),
+    (5, 'HTML sanitizado de las noticias', _migracion_005_html_noticias),
+    (6, 'Slug único de noticias y slugs anteriores', _migracion_006_slugs_noticias),
+    (7, 'Navegación precalculada de las noticias', _migracion_007_navegacion_noticias),
+    (8, 'Búsqueda de texto completo en metodologías', _migracion_008_fts_metodologias),
+    (9, 'Índices para los filtros de /api/metodologias', _migracion_009_indices_api_metodologias),
+]
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+# Aplicar migraciones pendientes al importar la app (desactivar con AUTO_MIGRATE=0
+# para ejecutarlas explícitamente con: flask --app app db-upgrade)
+app.config['AUTO_MIGRATE'] = os.environ.get('AUTO_MIGRATE', '1') != '0'
+
+def get_schema_version(conn):
+    """Versión actual del esquema (PRAGMA user_version)"""
+    return conn.execute('PRAGMA user_version').fetchone()[0]
+
+def run_migrations(verbose=True):
+    """Aplica en orden las migraciones pendientes. Devuelve la lista de versiones aplicadas."""
+    conn = _db_pool.connect()
+    aplicadas = []
+    try:
+        for version, descripcion, migracion in MIGRATIONS:
+            # Cada migración va en su propia transacción; BEGIN IMMEDIATE evita que
+            # dos procesos (p. ej. dos workers) apliquen la misma migración a la vez
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                if get_schema_version(conn) >= version:
+                    conn.rollback()
+                    continue
+                migracion(conn)
+                conn.execute(f'PRAGMA user_version = {version}')
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            aplicadas.append(version)
+            if verbose:
+                print(f"✅ Migración {version:03d} aplicada: {descripcion}")
+    finally:
+        conn.close()
+        if aplicadas:
+            schema_catalog.invalidate()
+    return aplicadas
+
+def init_db():
+    """Inicializa la base de datos aplicando las migraciones pendientes (compatibilidad)"""
+    return run_migrations()
+
+def ensure_schema():
+    """Al iniciar: una sola lectura de user_version; migra solo si el esquema está atrasado"""
+    conn = _db_pool.connect()
+    try:
+        version = get_schema_version(conn)
+    finally:
+        conn.close()
+    if version >= SCHEMA_VERSION:
+        return version
+    if not app.config['AUTO_MIGRATE']:
+        print(f"⚠️  ADVERTENCIA: esquema en versión {version}, se requiere {SCHEMA_VERSION}.")
+        print("   Ejecuta: flask --app app db-upgrade")
+        return version
+    run_migrations()
+    return SCHEMA_VERSION
+
+@app.cli.command('db-upgrade')
+def db_upgrade_command():
+    """Aplica las migraciones de esquema pendientes"""
+    aplicadas = run_migrations()
+    if not aplicadas:
+        print(f"✅ Esquema al día (versión {SCHEMA_VERSION})")
+
+@app.cli.command('db-version')
+def db_version_command():
+    """Muestra la versión del esquema de la base de datos"""
+    conn = _db_pool.connect()
+    try:
+        version = get_schema_version(conn)
+    finally:
+        conn.close()
+    print(f"Versión del esquema: {version} (última disponible: {SCHEMA_VERSION})")
+    for numero, descripcion, _migracion in MIGRATIONS:
+        estado = '✅' if numero <= version else '⏳'
+        print(f"  {estado} {numero:03d} {descripcion}")
+
+# Rutas públicas cuyas consultas deben usar índices (ver check-query-plans)
+PUBLIC_URLS = [
+    '/', '/equipo', '/servicios', '/docencia.html', '/noticias.html', '/casa-omsa.html',
+    '/investigacion.html', '/faq.html', '/quienes-somos.html', '/contacto.html',
+    '/sitemap.xml', '/api/metodologias', '/api/chatbot/context', '/api/noticias?fecha=9999&id=0',
+    '/api/metodologias/search?q=tetraciclina', '/api/metodologias/suggest?q=tetracilina',
+    '/api/metodologias?matriz=Leche&acreditada=1&fields=nombre,lod&lang=en', '/api/metodologias?categoria=residuos&cursor=1',
+    '/api/metodologias?matriz=Leche', '/api/metodologias?matriz=Milk&cursor=1',
+]
+
+def _public_urls():
+    """Rutas públicas fijas más una URL por cada noticia activa"""
+    conn = _db_pool.connect()
+    try:
+        noticias = conn.execute('SELECT id, slug FROM noticias WHERE activa = 1').fetchall()
+    finally:
+        conn.close()
+    return PUBLIC_URLS + [f'/noticia/{n["slug"] or n["id"]}' for n in noticias]
+
+def _plan_usa_scan_y_ordenamiento(detalles):
+    """True si el plan recorre una tabla completa (SCAN sin índice) y además ordena con un B-tree temporal"""
+    # Un MATCH de FTS5 aparece como SCAN de la tabla virtual, pero usa su propio índice
+    scan_completo = any(d.startswith('SCAN ') and ' USING ' not in d and ' VIRTUAL TABLE INDEX ' not in d for d in detalles)
+    ordenamiento = any(d.startswith('USE TEMP B-TREE') for d in detalles)
+    return scan_completo and ordenamiento
+
+@app.cli.command('check-query-plans')
+def check_query_plans_command():
+    """
+    Falla si alguna consulta de las rutas públicas hace un SCAN completo con ordenamiento temporal,
+    si alguna ruta no responde 2xx/304 o si no ejecutó ningún SELECT (la ruta no se analizó)
+    """
+    consultas = []
+    selects_de_url = []
+    def registrar(sql):
+        sql = sql.strip()
+        if sql.upper().startswith('SELECT'):
+            selects_de_url.append(sql)
+            if sql not in consultas:
+                consultas.append(sql)
+    
+    # Sin cachés: cada ruta debe ejecutar sus consultas aunque otra ruta ya las haya cargado
+    caches_anteriores = app.config['PAGE_DATA_CACHE'], app.config['PAGE_HTML_CACHE']
+    app.config['PAGE_DATA_CACHE'] = app.config['PAGE_HTML_CACHE'] = False
+    rutas_fallidas = []
+    _db_pool.trace_callback = registrar
+    try:
+        cliente = app.test_client()
+        for url in _public_urls():
+            selects_de_url.clear()
+            respuesta = cliente.get(url)
+            if not (200 <= respuesta.status_code < 300 or respuesta.status_code == 304):
+                rutas_fallidas.append((url, f'HTTP {respuesta.status_code}'))
+            elif not selects_de_url:
+                rutas_fallidas.append((url, 'no ejecutó ningún SELECT'))
+    finally:
+        _db_pool.trace_callback = None
+        app.config['PAGE_DATA_CACHE'], app.config['PAGE_HTML_CACHE'] = caches_anteriores
+    
+    conn = _db_pool.connect()
+    problemas = []
+    try:
+        for sql in consultas:
+            detalles = [fila[3] for fila in conn.execute(f'EXPLAIN QUERY PLAN {sql}').fetchall()]
+            if _plan_usa_scan_y_ordenamiento(detalles):
+                problemas.append((sql, detalles))
+    finally:
+        conn.close()
+    
+    print(f"Consultas analizadas: {len(consultas)}")
+    for url, motivo in rutas_fallidas:
+        print(f"❌ {url}: {motivo}")
+    for sql, detalles in problemas:
+        print("❌ " + ' '.join(sql.split()))
+        for detalle in detalles:
+            print(f"     {detalle}")
+    if problemas or rutas_fallidas:
+        raise SystemExit(1)
+    print("✅ Ninguna consulta pública recorre una tabla completa con ordenamiento temporal")
 
 # Funciones de seguridad
 def check_rate_limit(ip_address):
@@ -999,6 +1759,16 @@ def generate_csrf_token():
         session['csrf_token'] = secrets.token_urlsafe(32)
     return session['csrf_token']
 
+class _TokenCSRF:
+    """
+    Token CSRF para plantillas: solo se genera (y se guarda en la sesión) cuando la
+    plantilla lo imprime, así las páginas sin formularios no modifican la cookie de sesión.
+    """
+    def __str__(self):
+        g._csrf_en_pagina = True  # La página depende de la sesión (ver cached_page)
+        return generate_csrf_token()
+    __html__ = __str__
+
 def validate_csrf_token(token):
     """Valida un token CSRF"""
     if 'csrf_token' not in session:
@@ -1098,10 +1868,68 @@ def logos(filename):
     return f"Logo no encontrado: {decoded_filename}", 404
 
 # Sistema de idioma con Flask-Babel
+LANGUAGES = ('es', 'en')
+
+# Modo opcional de idioma en la URL (/es/servicios.html, /en/servicios.html). Las páginas
+# dejan de depender de la cookie de sesión y pueden cachearse en nginx o un CDN.
+app.config['LANG_URL_PREFIX'] = os.environ.get('LANG_URL_PREFIX', '0') == '1'
+
+class LanguagePrefixMiddleware:
+    """
+    Quita el prefijo /es o /en de PATH_INFO y lo agrega a SCRIPT_NAME: las rutas de Flask
+    no cambian y url_for() genera los enlaces con el mismo prefijo de idioma.
+    """
+    def __init__(self, wsgi_app):
+        self.wsgi_app = wsgi_app
+
+    def __call__(self, environ, start_response):
+        if app.config['LANG_URL_PREFIX']:
+            path = environ.get('PATH_INFO', '')
+            for lang in LANGUAGES:
+                prefijo = '/' + lang
+                if path == prefijo or path.startswith(prefijo + '/'):
+                    environ['farmavet.lang'] = lang
+                    environ['farmavet.script_root'] = environ.get('SCRIPT_NAME', '')
+                    environ['SCRIPT_NAME'] = environ['farmavet.script_root'] + prefijo
+                    environ['PATH_INFO'] = path[len(prefijo):] or '/'
+                    break
+        return self.wsgi_app(environ, start_response)
+
+app.wsgi_app = LanguagePrefixMiddleware(app.wsgi_app)
+
+# Archivos estáticos y subidos: se sirven igual en todos los idiomas, sin prefijo
+_ENDPOINTS_SIN_IDIOMA = {'static', 'assets', 'logos', 'uploaded_file'}
+
+def url_for_idioma(endpoint, **values):
+    """url_for() de las plantillas: no agrega el prefijo de idioma a los archivos estáticos"""
+    url = url_for(endpoint, **values)
+    lang = request.environ.get('farmavet.lang') if has_request_context() else None
+    if lang and (endpoint in _ENDPOINTS_SIN_IDIOMA or endpoint.startswith('serve_')):
+        url = url.replace('/' + lang + '/', '/', 1)
+    return url
+
+app.jinja_env.globals['url_for'] = url_for_idioma
+
+def _ruta_sin_idioma(path):
+    """Quita el prefijo de idioma de una ruta (/en/servicios.html -> /servicios.html)"""
+    for lang in LANGUAGES:
+        if path == '/' + lang or path.startswith('/' + lang + '/'):
+            return path[len(lang) + 1:] or '/'
+    return path
+
+def alternate_urls():
+    """URLs de la página actual en cada idioma (enlaces hreflang); vacío sin LANG_URL_PREFIX"""
+    if not app.config['LANG_URL_PREFIX'] or not has_request_context():
+        return {}
+    base = request.host_url.rstrip('/') + request.environ.get('farmavet.script_root', request.script_root)
+    urls = {lang: f'{base}/{lang}{request.path}' for lang in LANGUAGES}
+    urls['x-default'] = base + request.path
+    return urls
+
 # En Flask-Babel 4.0.0, se registra la función directamente
 def get_locale():
-    """Obtener idioma actual desde sesión, por defecto español"""
-    return session.get('language', 'es')
+    """Obtener idioma actual: prefijo de la URL (si existe) o sesión, por defecto español"""
+    return (has_request_context() and request.environ.get('farmavet.lang')) or session.get('language', 'es')
 
 # Registrar la función con Babel (Flask-Babel 4.0.0)
 babel.init_app(app, locale_selector=get_locale)
@@ -1109,7 +1937,9 @@ babel.init_app(app, locale_selector=get_locale)
 @app.route('/set_language/<lang>')
 def set_language(lang):
     """Cambiar idioma y redirigir a la página actual"""
-    if lang in ['es', 'en']:
+    prefijo = f'/{lang}' if app.config['LANG_URL_PREFIX'] and lang in LANGUAGES else ''
+    if lang in ['es', 'en'] and not prefijo:
+        # Con idioma en la URL no se usa la sesión (una sesión permanente agrega Vary: Cookie)
         session['language'] = lang
         session.permanent = True  # Hacer la sesión permanente
     # Obtener la página de referencia o usar index
@@ -1119,237 +1949,268 @@ def set_language(lang):
         from urllib.parse import urlparse
         parsed = urlparse(referrer)
         path = parsed.path
+        if prefijo:
+            # Con idioma en la URL, pasar a la misma página con el otro prefijo
+            path = _ruta_sin_idioma(path)
         if path and path != '/set_language/es' and path != '/set_language/en':
-            return redirect(path)
+            return redirect(prefijo + path)
+    if prefijo:
+        return redirect(prefijo + '/')
     return redirect(url_for('index'))
 
 def get_language():
-    """Obtener idioma actual desde sesión, por defecto español (compatibilidad)"""
-    return session.get('language', 'es')
+    """Obtener idioma actual (compatibilidad): igual que get_locale()"""
+    return get_locale()
+
+# Imágenes del hero slider: una sola lectura de la galería para todas las páginas
+HERO_MAX_IMAGENES = 10
+
+def _orden_galeria(fila):
+    """Clave equivalente a ORDER BY orden, id DESC (NULL primero, como en SQLite)"""
+    return (fila['orden'] is not None, fila['orden'] or 0, -fila['id'])
+
+def _cargar_hero_por_pagina():
+    """
+    Agrupa las imágenes activas por página. Las que no tienen página asignada se muestran
+    en todas, mezcladas con las propias de cada página según su orden.
+    Devuelve (dict pagina -> imágenes, imágenes para páginas sin asignaciones propias).
+    """
+    filas = get_db().execute(
+        'SELECT * FROM galeria_imagenes WHERE activo = 1 ORDER BY orden, id DESC'
+    ).fetchall()
+    por_pagina = {}
+    todas = []
+    for fila in filas:
+        if fila['pagina']:
+            por_pagina.setdefault(fila['pagina'], []).append(fila)
+        else:
+            todas.append(fila)
+    hero = {
+        pagina: list(islice(heapq.merge(propias, todas, key=_orden_galeria), HERO_MAX_IMAGENES))
+        for pagina, propias in por_pagina.items()
+    }
+    return hero, todas[:HERO_MAX_IMAGENES]
+
+def get_imagenes_hero(pagina):
+    """Imágenes del hero slider de una página (hasta HERO_MAX_IMAGENES)"""
+    hero, comunes = cached_value(('hero',), ('galeria_imagenes',), _cargar_hero_por_pagina)
+    return list(hero.get(pagina, comunes))
 
 # Rutas públicas (páginas del sitio)
 @app.route('/')
 @app.route('/index.html')
+@cached_page
 def index():
     # SIEMPRE usar template, Flask lo buscará automáticamente en templates/
-    conn = get_db()
-    estadisticas = conn.execute('''
+    estadisticas = cached_records('''
         SELECT * FROM estadisticas WHERE activo = 1 
         ORDER BY orden, id
-    ''').fetchall()
-    noticias = conn.execute('''
+    ''')
+    noticias = cached_records('''
         SELECT * FROM noticias WHERE activa = 1 AND destacada = 1 
         ORDER BY fecha DESC, id DESC LIMIT 3
-    ''').fetchall()
-    eventos = conn.execute('''
-        SELECT * FROM eventos WHERE activo = 1 AND destacada = 1 
+    ''')
+    eventos = cached_records(f'''
+        SELECT {_COLUMNAS_TARJETA_EVENTO} FROM eventos WHERE activo = 1 AND destacada = 1 
         ORDER BY orden, id
         LIMIT 3
-    ''').fetchall()
-    clientes = conn.execute('''
+    ''')
+    clientes = cached_records('''
         SELECT * FROM clientes WHERE activo = 1 AND mostrar_en_index = 1 
         ORDER BY orden, id
-    ''').fetchall()
-    tarjetas_destacadas = conn.execute('''
+    ''')
+    tarjetas_destacadas = cached_records('''
         SELECT * FROM tarjetas_destacadas WHERE pagina = 'index' AND activo = 1 
         ORDER BY orden, id
-    ''').fetchall()
+    ''')
     # Cargar imágenes de la galería para el hero slider
-    imagenes_hero = conn.execute('''
-        SELECT * FROM galeria_imagenes 
-        WHERE activo = 1 AND (pagina = 'index' OR pagina IS NULL OR pagina = '')
-        ORDER BY orden, id DESC
-        LIMIT 10
-    ''').fetchall()
-    conn.close()
+    imagenes_hero = get_imagenes_hero('index')
     lang = get_language()
     locale = get_locale()
     return render_template('index.html', estadisticas=estadisticas, noticias=noticias, eventos=eventos, clientes=clientes, tarjetas_destacadas=tarjetas_destacadas, imagenes_hero=imagenes_hero, lang=lang, locale=locale)
 
-@app.route('/equipo')
-@app.route('/equipo.html')
-def equipo_page():
-    """Ruta específica para página de equipo"""
-    lang = get_language()
-    locale = get_locale()
-    conn = get_db()
-    # Verificar qué columnas de traducción existen
-    cursor = conn.execute("PRAGMA table_info(organigrama)")
-    columns = [col[1] for col in cursor.fetchall()]
-    has_subseccion_en = 'subseccion_en' in columns
-    has_cargo_en = 'cargo_en' in columns
-    has_descripcion_en = 'descripcion_en' in columns
-    
-    # Construir SELECT dinámicamente según columnas disponibles
-    select_cols = ['o.*']
-    if has_subseccion_en:
-        select_cols.append('o.subseccion_en')
-    if has_cargo_en:
-        select_cols.append('o.cargo_en')
-    if has_descripcion_en:
-        select_cols.append('o.descripcion_en')
-    select_cols.extend([
-        'e.id as miembro_id',
-        'e.nombre as miembro_nombre',
-        'e.biografia as miembro_biografia',
-        'e.email as miembro_email',
-        'e.imagen as miembro_imagen',
-        'e.imagen_zoom as miembro_imagen_zoom',
-        'e.imagen_x as miembro_imagen_x',
-        'e.imagen_y as miembro_imagen_y',
-        'e.tags as miembro_tags',
-        'e.redes_sociales as miembro_redes',
-        'o.cargo as cargo_nombre'
-    ])
-    
-    # Obtener organigrama con sus miembros asignados
-    query = f'''
-        SELECT {', '.join(select_cols)}
+def _redes_sociales(valor):
+    """JSON de redes sociales de un miembro del equipo ({} si está vacío o es inválido)"""
+    if not valor:
+        return {}
+    try:
+        return json.loads(valor)
+    except (TypeError, ValueError):
+        return {}
+
+def _construir_organigrama(conn, lang):
+    """
+    Organigrama (sección -> subsección -> cargos con su miembro) y lista de dirección
+    en una sola pasada sobre organigrama LEFT JOIN equipo. La columna centinela
+    _equipo separa las columnas de cada tabla en el resultado.
+    """
+    cursor = conn.cursor()
+    cursor.row_factory = None
+    cursor.execute('''
+        SELECT o.*, NULL AS _equipo, e.*
         FROM organigrama o
         LEFT JOIN equipo e ON o.id = e.cargo_id AND e.activo = 1
         WHERE o.activo = 1
         ORDER BY o.seccion, o.orden, o.id, e.orden
-    '''
-    organigrama_raw = conn.execute(query).fetchall()
+    ''')
+    columnas = [descripcion[0] for descripcion in cursor.description]
+    corte = columnas.index('_equipo')
+    columnas_cargo, columnas_miembro = columnas[:corte], columnas[corte + 1:]
     
-    # Organizar organigrama por sección y subsección
     organigrama_organizado = {}
-    for row in organigrama_raw:
-        seccion = row['seccion']
-        subseccion = row['subseccion'] or 'Sin subsección'
-        
-        if seccion not in organigrama_organizado:
-            organigrama_organizado[seccion] = {}
+    direccion = []
+    for fila in cursor.fetchall():
+        cargo = dict(zip(columnas_cargo, fila[:corte]))
+        miembro = dict(zip(columnas_miembro, fila[corte + 1:]))
         
-        if subseccion not in organigrama_organizado[seccion]:
-            organigrama_organizado[seccion][subseccion] = []
+        subsecciones = organigrama_organizado.setdefault(cargo['seccion'], {})
+        cargos = subsecciones.setdefault(cargo['subseccion'] or 'Sin subsección', [])
         
-        # Agregar cargo con su miembro (si existe)
+        # Agregar cargo con su miembro (si existe); sin miembro se muestra el nombre del cargo
         cargo_data = {
-            'id': row['id'],
-            'cargo': row['cargo'],
-            'descripcion': row['descripcion'],
-            'subseccion': row['subseccion'],
-            'subseccion_en': row['subseccion_en'] if 'subseccion_en' in row.keys() else None,
-            'cargo_en': row['cargo_en'] if 'cargo_en' in row.keys() else None,
-            'descripcion_en': row['descripcion_en'] if 'descripcion_en' in row.keys() else None,
-            'orden': row['orden'],
-            'miembro': None
+            'id': cargo['id'],
+            'cargo': cargo['cargo'],
+            'descripcion': cargo['descripcion'],
+            'subseccion': cargo['subseccion'],
+            'subseccion_en': cargo.get('subseccion_en'),
+            'cargo_en': cargo.get('cargo_en'),
+            'descripcion_en': cargo.get('descripcion_en'),
+            'orden': cargo['orden'],
+            'miembro': None,
+            'cargo_nombre': cargo['cargo']
         }
-        
-        # Si hay miembro asignado
-        if row['miembro_id']:
-            # Parsear redes sociales si existen
-            redes_sociales = {}
-            if row['miembro_redes']:
-                try:
-                    redes_sociales = json.loads(row['miembro_redes'])
-                except:
-                    redes_sociales = {}
-            
-            cargo_data['miembro'] = {
-                'id': row['miembro_id'],
-                'nombre': row['miembro_nombre'],
-                'biografia': row['miembro_biografia'],
-                'email': row['miembro_email'],
-                'imagen': row['miembro_imagen'],
-                'imagen_zoom': row['miembro_imagen_zoom'],
-                'imagen_x': row['miembro_imagen_x'],
-                'imagen_y': row['miembro_imagen_y'],
-                'tags': row['miembro_tags'],
+        if miembro['id']:
+            redes_sociales = _redes_sociales(miembro['redes_sociales'])
+            cargo_data['miembro'] = proyectar({
+                'id': miembro['id'],
+                'nombre': miembro['nombre'],
+                'biografia': miembro['biografia'],
+                'email': miembro['email'],
+                'imagen': miembro['imagen'],
+                'imagen_zoom': miembro['imagen_zoom'],
+                'imagen_x': miembro['imagen_x'],
+                'imagen_y': miembro['imagen_y'],
+                'tags': miembro['tags'],
                 'redes_sociales': redes_sociales,
-                'cargo_nombre': row['cargo_nombre']
-            }
-            cargo_data['cargo_nombre'] = row['cargo_nombre']
-        else:
-            # Si no hay miembro, al menos mostrar el nombre del cargo
-            cargo_data['cargo_nombre'] = row['cargo']
+                'cargo_nombre': cargo['cargo']
+            }, lang)
+            
+            # Sección de dirección (miembros destacados)
+            if cargo['seccion'] == 'direccion':
+                miembro.update({
+                    'cargo_nombre': cargo['cargo'] or miembro.get('cargo'),
+                    'cargo_nombre_en': cargo.get('cargo_en'),
+                    'cargo_seccion': cargo['seccion'],
+                    'cargo_descripcion': cargo['descripcion'],
+                    'cargo_descripcion_en': cargo.get('descripcion_en'),
+                    'redes_sociales': redes_sociales
+                })
+                direccion.append(miembro)
         
-        organigrama_organizado[seccion][subseccion].append(cargo_data)
+        cargos.append(proyectar(cargo_data, lang))
     
-    # Obtener también la sección de dirección (miembros destacados)
-    select_direccion = ['e.*', 'o.cargo as cargo_nombre', 'o.seccion as cargo_seccion', 
-                       'o.descripcion as cargo_descripcion']
-    if has_cargo_en:
-        select_direccion.append('o.cargo_en as cargo_nombre_en')
-    if has_descripcion_en:
-        select_direccion.append('o.descripcion_en as cargo_descripcion_en')
-    
-    query_direccion = f'''
-        SELECT {', '.join(select_direccion)}
-        FROM equipo e
-        INNER JOIN organigrama o ON e.cargo_id = o.id
-        WHERE e.activo = 1 AND o.seccion = 'direccion' AND o.activo = 1
-        ORDER BY e.orden, e.id
-    '''
-    direccion_raw = conn.execute(query_direccion).fetchall()
-    
-    # Convertir Row objects a diccionarios y parsear redes sociales
-    direccion = []
-    for row in direccion_raw:
-        miembro = dict(row)
-        # Asegurar que cargo_nombre esté presente (debería venir de la query)
-        if not miembro.get('cargo_nombre'):
-            if miembro.get('cargo'):
-                miembro['cargo_nombre'] = miembro.get('cargo')
-            elif miembro.get('cargo_id'):
-                # Intentar obtenerlo del organigrama como último recurso
-                cargo_obj = conn.execute('SELECT cargo FROM organigrama WHERE id = ?', (miembro.get('cargo_id'),)).fetchone()
-                if cargo_obj:
-                    miembro['cargo_nombre'] = cargo_obj['cargo']
-        
-        # Parsear redes sociales
-        if miembro.get('redes_sociales'):
-            try:
-                miembro['redes_sociales'] = json.loads(miembro['redes_sociales'])
-            except:
-                miembro['redes_sociales'] = {}
-        else:
-            miembro['redes_sociales'] = {}
-        direccion.append(miembro)
+    # Dirección ordenada como en el sitio (e.orden, e.id; los NULL primero, igual que SQLite)
+    direccion.sort(key=lambda m: (m['orden'] is not None, m['orden'] or 0, m['id']))
+    return organigrama_organizado, [proyectar(miembro, lang) for miembro in direccion]
+
+def organigrama_equipo():
+    """
+    Organigrama y dirección de /equipo en el idioma actual, cacheados hasta que cambien
+    las tablas equipo u organigrama.
+    """
+    lang = get_language()
+    return cached_value(('organigrama', lang), ('organigrama', 'equipo'),
+                        lambda: _construir_organigrama(get_db(), lang))
+
+@app.route('/equipo')
+@app.route('/equipo.html')
+@cached_page
+def equipo_page():
+    """Ruta específica para página de equipo"""
+    lang = get_language()
+    locale = get_locale()
+    organigrama_organizado, direccion = organigrama_equipo()
     
-    tarjetas_destacadas = conn.execute('''
+    tarjetas_destacadas = cached_records('''
         SELECT * FROM tarjetas_destacadas WHERE pagina = 'equipo' AND activo = 1 
         ORDER BY orden, id
-    ''').fetchall()
+    ''')
     # Cargar imágenes de la galería para el hero slider
-    imagenes_hero = conn.execute('''
-        SELECT * FROM galeria_imagenes 
-        WHERE activo = 1 AND (pagina = 'equipo' OR pagina IS NULL OR pagina = '')
-        ORDER BY orden, id DESC
-        LIMIT 10
-    ''').fetchall()
-    conn.close()
+    imagenes_hero = get_imagenes_hero('equipo')
     return render_template('equipo.html', organigrama=organigrama_organizado, direccion=direccion, tarjetas_destacadas=tarjetas_destacadas, imagenes_hero=imagenes_hero, lang=lang, locale=locale)
 
+def _agrupar_metodologias(filas, lang):
+    """
+    Arma el catálogo de servicios.html en una sola pasada: categoría -> grupo (nombre + matriz +
+    técnica + acreditada, ya traducidos) -> LOD/LOQ. Cada combinación de LOD/LOQ es una fila
+    con su metodología representativa y los analitos del grupo sin repetir.
+    """
+    agrupadas = {}
+    for fila in filas:
+        metodologia = proyectar(fila, lang)
+        group_key = (metodologia.nombre or '', metodologia.matriz or '', metodologia.tecnica or '', fila['acreditada'])
+        lod_loq_key = (fila['limite_deteccion'] or '', fila['limite_cuantificacion'] or '')
+        grupos = agrupadas.setdefault(fila['categoria'] or 'otros', {})
+        grupos.setdefault(group_key, {}).setdefault(lod_loq_key, []).append((fila, metodologia.analito or ''))
+    
+    catalogo = {}
+    for categoria, grupos in agrupadas.items():
+        catalogo[categoria] = []
+        # Grupos ordenados por nombre, matriz y técnica (sort estable: respeta el orden de la consulta)
+        for group_key in sorted(grupos, key=lambda clave: clave[:3]):
+            nombre_comun, matriz_comun, tecnica_comun, acreditada_comun = group_key
+            for (lod_valor, loq_valor), items in grupos[group_key].items():
+                # Metodología representativa: primer item del grupo, con la información común asegurada
+                met_dict = dict(items[0][0])
+                if not met_dict.get('nombre'):
+                    met_dict['nombre'] = nombre_comun
+                if not met_dict.get('matriz'):
+                    met_dict['matriz'] = matriz_comun
+                if not met_dict.get('tecnica'):
+                    met_dict['tecnica'] = tecnica_comun
+                if met_dict.get('acreditada') is None:
+                    met_dict['acreditada'] = acreditada_comun
+                met_dict['limite_deteccion'] = lod_valor
+                met_dict['limite_cuantificacion'] = loq_valor
+                
+                catalogo[categoria].append({
+                    'agrupado': True,
+                    'metodologia_representativa': proyectar(met_dict, lang),
+                    'analitos': list(dict.fromkeys(analito for _, analito in items if analito))
+                })
+    return catalogo
+
+def catalogo_servicios():
+    """
+    Catálogo agrupado de metodologías activas en el idioma actual. Se construye una vez por
+    idioma y se reutiliza hasta que cambie la tabla metodologias (CRUD del admin o importación Excel).
+    """
+    lang = get_language()
+    def cargar():
+        filas = get_db().execute('''
+            SELECT * FROM metodologias WHERE activo = 1 
+            ORDER BY categoria, orden, nombre
+        ''').fetchall()
+        return _agrupar_metodologias(filas, lang)
+    
+    return cached_value(('catalogo_servicios', lang), ('metodologias',), cargar)
+
 @app.route('/servicios')
 @app.route('/servicios.html')
+@cached_page
 def servicios_page():
     """Ruta específica para página de servicios"""
     try:
         lang = get_language()
         locale = get_locale()
-        conn = get_db()
-        metodologias = conn.execute('''
-            SELECT * FROM metodologias WHERE activo = 1 
-            ORDER BY categoria, orden, nombre
-        ''').fetchall()
-        tarjetas_destacadas = conn.execute('''
+        tarjetas_destacadas = cached_records('''
             SELECT * FROM tarjetas_destacadas WHERE pagina = 'servicios' AND activo = 1 
             ORDER BY orden, id
-        ''').fetchall()
+        ''')
         # Cargar imágenes de la galería para el hero slider (solo las asignadas a esta página)
-        imagenes_hero = conn.execute('''
-            SELECT * FROM galeria_imagenes 
-            WHERE activo = 1 AND (pagina = 'servicios' OR pagina IS NULL OR pagina = '')
-            ORDER BY orden, id DESC
-            LIMIT 10
-        ''').fetchall()
-        conn.close()
+        imagenes_hero = get_imagenes_hero('servicios')
     except Exception as e:
         app.logger.error(f'Error en servicios_page al cargar datos: {str(e)}', exc_info=True)
-        if 'conn' in locals() and conn:
-            conn.close()
         # Devolver página con datos vacíos en caso de error
         return render_template('servicios.html', 
                              metodologias_por_categoria={}, 
@@ -1360,115 +2221,13 @@ def servicios_page():
                              locale=get_locale())
     
     try:
-        # Organizar metodologías por categoría y agrupar por similitudes
-        metodologias_por_categoria = {}
+        metodologias_por_categoria = catalogo_servicios()
         categorias_nombres = {
             'residuos': 'Residuos de Medicamentos Veterinarios',
             'contaminantes': 'Contaminantes Químicos',
             'microbiologia': 'Microbiología',
             'otros': 'Otros Análisis'
         }
-        
-        # Función para crear clave de agrupación (sin analito, sin LOD/LOQ)
-        # Agrupar por nombre + matriz + técnica + acreditada
-        # Los analitos y LOD/LOQ pueden variar dentro del mismo grupo
-        def get_group_key(metodologia):
-            nombre = get_translated_field(metodologia, 'nombre') or (metodologia['nombre'] if 'nombre' in metodologia.keys() else '') or ''
-            matriz = get_translated_field(metodologia, 'matriz') or (metodologia['matriz'] if 'matriz' in metodologia.keys() else '') or ''
-            tecnica = get_translated_field(metodologia, 'tecnica') or (metodologia['tecnica'] if 'tecnica' in metodologia.keys() else '') or ''
-            acreditada = metodologia['acreditada'] if 'acreditada' in metodologia.keys() else False
-            return (nombre, matriz, tecnica, acreditada)
-        
-        # Agrupar metodologías por nombre + matriz + técnica + acreditada
-        # Mantener orden original usando lista para orden
-        metodologias_agrupadas = {}
-        orden_grupos = []  # Lista para mantener el orden de aparición
-        
-        for metodologia in metodologias:
-            categoria = metodologia['categoria'] or 'otros'
-            if categoria not in metodologias_agrupadas:
-                metodologias_agrupadas[categoria] = {}
-                orden_grupos.append(categoria)
-            
-            # Crear clave de agrupación (sin LOD/LOQ, sin analito)
-            group_key = get_group_key(metodologia)
-            
-            if group_key not in metodologias_agrupadas[categoria]:
-                metodologias_agrupadas[categoria][group_key] = []
-                # Guardar orden de aparición del primer grupo
-                if categoria not in [g[0] for g in orden_grupos]:
-                    orden_grupos.append((categoria, group_key))
-            
-            metodologias_agrupadas[categoria][group_key].append(metodologia)
-        
-        # Convertir a lista para el template, agrupando analitos con mismo LOD/LOQ
-        # La metodología aparece una vez por cada combinación única de LOD/LOQ
-        metodologias_por_categoria = {}
-        for categoria, grupos in metodologias_agrupadas.items():
-            metodologias_por_categoria[categoria] = []
-            # Mantener orden de grupos dentro de cada categoría
-            grupos_ordenados = sorted(grupos.items(), key=lambda x: (
-                x[0][0],  # nombre
-                x[0][1],  # matriz
-                x[0][2]   # tecnica
-            ))
-            
-            for group_key, items in grupos_ordenados:
-                # Obtener información común del grupo (nombre, matriz, técnica, acreditada)
-                nombre_comun = group_key[0]
-                matriz_comun = group_key[1]
-                tecnica_comun = group_key[2]
-                acreditada_comun = group_key[3]
-                
-                # Agrupar items por LOD y LOQ
-                grupos_lod_loq = {}
-                for item in items:
-                    # Obtener LOD y LOQ
-                    lod = item['limite_deteccion'] if 'limite_deteccion' in item.keys() else ''
-                    loq = item['limite_cuantificacion'] if 'limite_cuantificacion' in item.keys() else ''
-                    
-                    # Crear clave de agrupación por LOD/LOQ
-                    lod_loq_key = (lod or '', loq or '')
-                    
-                    if lod_loq_key not in grupos_lod_loq:
-                        grupos_lod_loq[lod_loq_key] = []
-                    
-                    grupos_lod_loq[lod_loq_key].append(item)
-                
-                # Crear una fila por cada grupo de LOD/LOQ
-                for lod_loq_key, items_lod_loq in grupos_lod_loq.items():
-                    lod_valor, loq_valor = lod_loq_key
-                    
-                    # Obtener todos los analitos de este grupo LOD/LOQ
-                    analitos_agrupados = []
-                    for item in items_lod_loq:
-                        analito = get_translated_field(item, 'analito') or item['analito'] or ''
-                        if analito and analito not in analitos_agrupados:
-                            analitos_agrupados.append(analito)
-                    
-                    # Crear metodología representativa con el primer item del grupo
-                    met_dict = dict(items_lod_loq[0])
-                    
-                    # Asegurar información común
-                    if not met_dict.get('nombre'):
-                        met_dict['nombre'] = nombre_comun
-                    if not met_dict.get('matriz'):
-                        met_dict['matriz'] = matriz_comun
-                    if not met_dict.get('tecnica'):
-                        met_dict['tecnica'] = tecnica_comun
-                    if 'acreditada' not in met_dict or met_dict.get('acreditada') is None:
-                        met_dict['acreditada'] = acreditada_comun
-                    
-                    # Asegurar LOD y LOQ correctos
-                    met_dict['limite_deteccion'] = lod_valor
-                    met_dict['limite_cuantificacion'] = loq_valor
-                    
-                    # Agregar como metodología agrupada por LOD/LOQ
-                    metodologias_por_categoria[categoria].append({
-                        'agrupado': True,
-                        'metodologia_representativa': met_dict,
-                        'analitos': analitos_agrupados
-                    })
         return render_template('servicios.html', metodologias_por_categoria=metodologias_por_categoria, categorias_nombres=categorias_nombres, tarjetas_destacadas=tarjetas_destacadas, imagenes_hero=imagenes_hero, lang=lang, locale=locale)
     except Exception as e:
         app.logger.error(f'Error en servicios_page al procesar metodologías: {str(e)}', exc_info=True)
@@ -1482,6 +2241,7 @@ def servicios_page():
                              locale=locale if 'locale' in locals() else get_locale())
 
 @app.route('/<page>.html')
+@cached_page
 def page(page):
     """Rutas dinámicas para páginas HTML - SIEMPRE prioriza templates"""
     # Obtener idioma actual
@@ -1495,54 +2255,38 @@ def page(page):
     if os.path.exists(template_path):
         # Páginas que necesitan datos de la BD
         if page == 'docencia':
-            conn = get_db()
-            programas = conn.execute('''
+            programas = cached_records('''
                 SELECT * FROM programas WHERE activo = 1 
                 ORDER BY orden, id DESC
-            ''').fetchall()
-            testimonios = conn.execute('''
+            ''')
+            testimonios = cached_records('''
                 SELECT * FROM testimonios WHERE activo = 1 
                 ORDER BY orden, id DESC
-            ''').fetchall()
-            tarjetas_destacadas = conn.execute('''
+            ''')
+            tarjetas_destacadas = cached_records('''
                 SELECT * FROM tarjetas_destacadas WHERE pagina = 'docencia' AND activo = 1 
                 ORDER BY orden, id
-            ''').fetchall()
+            ''')
             # Cargar imágenes de la galería para el hero slider
-            imagenes_hero = conn.execute('''
-                SELECT * FROM galeria_imagenes 
-                WHERE activo = 1 AND (pagina = 'docencia' OR pagina IS NULL OR pagina = '')
-                ORDER BY orden, id DESC
-                LIMIT 10
-            ''').fetchall()
-            conn.close()
+            imagenes_hero = get_imagenes_hero('docencia')
             return render_template('docencia.html', programas=programas, testimonios=testimonios, tarjetas_destacadas=tarjetas_destacadas, imagenes_hero=imagenes_hero, lang=lang, locale=locale)
         
         elif page == 'noticias':
-            conn = get_db()
-            noticias = conn.execute('''
-                SELECT * FROM noticias WHERE activa = 1 AND destacada = 1 
-                ORDER BY fecha DESC, id DESC
-            ''').fetchall()
-            eventos = conn.execute('''
-                SELECT * FROM eventos WHERE activo = 1 AND destacada = 1 
+            noticias, siguiente = pagina_noticias()
+            eventos = cached_records(f'''
+                SELECT {_COLUMNAS_TARJETA_EVENTO} FROM eventos WHERE activo = 1 AND destacada = 1 
                 ORDER BY orden, id
-            ''').fetchall()
-            tarjetas_destacadas = conn.execute('''
+            ''')
+            tarjetas_destacadas = cached_records('''
                 SELECT * FROM tarjetas_destacadas WHERE pagina = 'noticias' AND activo = 1 
                 ORDER BY orden, id
-            ''').fetchall()
+            ''')
             # Cargar imágenes de la galería para el hero slider
-            imagenes_hero = conn.execute('''
-                SELECT * FROM galeria_imagenes 
-                WHERE activo = 1 AND (pagina = 'noticias' OR pagina IS NULL OR pagina = '')
-                ORDER BY orden, id DESC
-                LIMIT 10
-            ''').fetchall()
+            imagenes_hero = get_imagenes_hero('noticias')
             # Cargar configuración de redes sociales
-            config_redes = conn.execute('''
+            config_redes = cached_query('''
                 SELECT * FROM configuracion_redes WHERE activo = 1 LIMIT 1
-            ''').fetchone()
+            ''', one=True)
             instagram_username = None
             linkedin_company_id = None
             linkedin_page_url = None
@@ -1559,215 +2303,70 @@ def page(page):
                     linkedin_page_url = config_redes['linkedin_page_url'] if config_redes['linkedin_page_url'] else None
                 except (KeyError, IndexError):
                     linkedin_page_url = None
-            conn.close()
-            return render_template('noticias.html', noticias=noticias, eventos=eventos, tarjetas_destacadas=tarjetas_destacadas, imagenes_hero=imagenes_hero, instagram_username=instagram_username, linkedin_company_id=linkedin_company_id, linkedin_page_url=linkedin_page_url, lang=lang, locale=locale)
+            return render_template('noticias.html', noticias=noticias, siguiente=siguiente, eventos=eventos, tarjetas_destacadas=tarjetas_destacadas, imagenes_hero=imagenes_hero, instagram_username=instagram_username, linkedin_company_id=linkedin_company_id, linkedin_page_url=linkedin_page_url, lang=lang, locale=locale)
         
         elif page == 'equipo':
             # SIEMPRE usar template, nunca archivo estático
-            conn = get_db()
-            # Obtener organigrama con sus miembros asignados
-            organigrama_raw = conn.execute('''
-                SELECT o.*, 
-                       o.subseccion_en, o.cargo_en, o.descripcion_en,
-                       e.id as miembro_id,
-                       e.nombre as miembro_nombre,
-                       e.biografia as miembro_biografia,
-                       e.email as miembro_email,
-                       e.imagen as miembro_imagen,
-                       e.imagen_zoom as miembro_imagen_zoom,
-                       e.imagen_x as miembro_imagen_x,
-                       e.imagen_y as miembro_imagen_y,
-                       e.tags as miembro_tags,
-                       e.redes_sociales as miembro_redes,
-                       o.cargo as cargo_nombre
-                FROM organigrama o
-                LEFT JOIN equipo e ON o.id = e.cargo_id AND e.activo = 1
-                WHERE o.activo = 1
-                ORDER BY o.seccion, o.orden, o.id, e.orden
-            ''').fetchall()
-            
-            # Organizar organigrama por sección y subsección
-            organigrama_organizado = {}
-            for row in organigrama_raw:
-                seccion = row['seccion']
-                subseccion = row['subseccion'] or 'Sin subsección'
-                
-                if seccion not in organigrama_organizado:
-                    organigrama_organizado[seccion] = {}
-                
-                if subseccion not in organigrama_organizado[seccion]:
-                    organigrama_organizado[seccion][subseccion] = []
-                
-                # Agregar cargo con su miembro (si existe)
-                cargo_data = {
-                    'id': row['id'],
-                    'cargo': row['cargo'],
-                    'descripcion': row['descripcion'],
-                    'subseccion': row['subseccion'],
-                    'subseccion_en': row['subseccion_en'] if 'subseccion_en' in row.keys() else None,
-                    'cargo_en': row['cargo_en'] if 'cargo_en' in row.keys() else None,
-                    'descripcion_en': row['descripcion_en'] if 'descripcion_en' in row.keys() else None,
-                    'orden': row['orden'],
-                    'miembro': None
-                }
-                
-                # Si hay miembro asignado
-                if row['miembro_id']:
-                    # Parsear redes sociales si existen
-                    redes_sociales = {}
-                    if row['miembro_redes']:
-                        try:
-                            redes_sociales = json.loads(row['miembro_redes'])
-                        except:
-                            redes_sociales = {}
-                    
-                    cargo_data['miembro'] = {
-                        'id': row['miembro_id'],
-                        'nombre': row['miembro_nombre'],
-                        'biografia': row['miembro_biografia'],
-                        'email': row['miembro_email'],
-                        'imagen': row['miembro_imagen'],
-                        'imagen_zoom': row['miembro_imagen_zoom'],
-                        'imagen_x': row['miembro_imagen_x'],
-                        'imagen_y': row['miembro_imagen_y'],
-                        'tags': row['miembro_tags'],
-                        'redes_sociales': redes_sociales,
-                        'cargo_nombre': row['cargo_nombre']
-                    }
-                    cargo_data['cargo_nombre'] = row['cargo_nombre']
-                else:
-                    # Si no hay miembro, al menos mostrar el nombre del cargo
-                    cargo_data['cargo_nombre'] = row['cargo']
-                
-                organigrama_organizado[seccion][subseccion].append(cargo_data)
-            
-            # Obtener también la sección de dirección (miembros destacados)
-            # Obtener miembros que tienen cargo_id en sección dirección
-            direccion_raw = conn.execute('''
-                SELECT e.*, o.cargo as cargo_nombre, o.cargo_en as cargo_nombre_en, 
-                       o.seccion as cargo_seccion, o.descripcion as cargo_descripcion, o.descripcion_en as cargo_descripcion_en
-                FROM equipo e
-                INNER JOIN organigrama o ON e.cargo_id = o.id
-                WHERE e.activo = 1 AND o.seccion = 'direccion' AND o.activo = 1
-                ORDER BY e.orden, e.id
-            ''').fetchall()
-            
-            # Convertir Row objects a diccionarios y parsear redes sociales
-            direccion = []
-            for row in direccion_raw:
-                miembro = dict(row)
-                # Asegurar que cargo_nombre esté presente (debería venir de la query)
-                if not miembro.get('cargo_nombre'):
-                    if miembro.get('cargo'):
-                        miembro['cargo_nombre'] = miembro.get('cargo')
-                    elif miembro.get('cargo_id'):
-                        # Intentar obtenerlo del organigrama como último recurso
-                        cargo_obj = conn.execute('SELECT cargo FROM organigrama WHERE id = ?', (miembro.get('cargo_id'),)).fetchone()
-                        if cargo_obj:
-                            miembro['cargo_nombre'] = cargo_obj['cargo']
-                
-                # Parsear redes sociales
-                if miembro.get('redes_sociales'):
-                    try:
-                        miembro['redes_sociales'] = json.loads(miembro['redes_sociales'])
-                    except:
-                        miembro['redes_sociales'] = {}
-                else:
-                    miembro['redes_sociales'] = {}
-                direccion.append(miembro)
+            organigrama_organizado, direccion = organigrama_equipo()
             
-            tarjetas_destacadas = conn.execute('''
+            tarjetas_destacadas = cached_records('''
                 SELECT * FROM tarjetas_destacadas WHERE pagina = 'equipo' AND activo = 1 
                 ORDER BY orden, id
-            ''').fetchall()
+            ''')
             # Cargar imágenes de la galería para el hero slider
-            imagenes_hero = conn.execute('''
-                SELECT * FROM galeria_imagenes 
-                WHERE activo = 1 AND (pagina = 'equipo' OR pagina IS NULL OR pagina = '')
-                ORDER BY orden, id DESC
-                LIMIT 10
-            ''').fetchall()
-            conn.close()
+            imagenes_hero = get_imagenes_hero('equipo')
             return render_template('equipo.html', organigrama=organigrama_organizado, direccion=direccion, tarjetas_destacadas=tarjetas_destacadas, imagenes_hero=imagenes_hero, lang=lang, locale=locale)
         
         elif page == 'convenios':
-            conn = get_db()
-            convenios = conn.execute('''
+            convenios = cached_records('''
                 SELECT * FROM convenios WHERE activo = 1 
                 ORDER BY orden, id
-            ''').fetchall()
+            ''')
             # Cargar imágenes de la galería para el hero slider
-            imagenes_hero = conn.execute('''
-                SELECT * FROM galeria_imagenes 
-                WHERE activo = 1 AND (pagina = 'convenios' OR pagina IS NULL OR pagina = '')
-                ORDER BY orden, id DESC
-                LIMIT 10
-            ''').fetchall()
-            conn.close()
+            imagenes_hero = get_imagenes_hero('convenios')
             return render_template('convenios.html', convenios=convenios, imagenes_hero=imagenes_hero, lang=lang, locale=locale)
         
         elif page == 'casa-omsa':
-            conn = get_db()
-            aliados_casa_omsa = conn.execute('''
+            aliados_casa_omsa = cached_records('''
                 SELECT * FROM clientes WHERE activo = 1 AND mostrar_en_casa_omsa = 1 
                 ORDER BY orden, id
-            ''').fetchall()
-            tarjetas_destacadas = conn.execute('''
+            ''')
+            tarjetas_destacadas = cached_records('''
                 SELECT * FROM tarjetas_destacadas WHERE pagina = 'casa-omsa' AND activo = 1 
                 ORDER BY orden, id
-            ''').fetchall()
-            # Cargar imágenes de la galería para el hero slider
-            imagenes_hero = conn.execute('''
-                SELECT * FROM galeria_imagenes 
-                WHERE activo = 1 AND (pagina = 'casa-omsa' OR pagina IS NULL OR pagina = '')
-                ORDER BY orden, id DESC
-                LIMIT 10
-            ''').fetchall()
-            conn.close()
+            ''')
+            # Cargar imágenes de la galería para el hero slider
+            imagenes_hero = get_imagenes_hero('casa-omsa')
             return render_template('casa-omsa.html', aliados_casa_omsa=aliados_casa_omsa, tarjetas_destacadas=tarjetas_destacadas, imagenes_hero=imagenes_hero, lang=lang, locale=locale)
         
         elif page == 'investigacion':
-            conn = get_db()
-            proyectos = conn.execute('''
+            proyectos = cached_records('''
                 SELECT * FROM proyectos WHERE activo = 1 
                 ORDER BY orden, id
-            ''').fetchall()
-            publicaciones = conn.execute('''
+            ''')
+            publicaciones = cached_records('''
                 SELECT * FROM publicaciones WHERE activo = 1 
                 ORDER BY orden, id
-            ''').fetchall()
-            tarjetas_destacadas = conn.execute('''
+            ''')
+            tarjetas_destacadas = cached_records('''
                 SELECT * FROM tarjetas_destacadas WHERE pagina = 'investigacion' AND activo = 1 
                 ORDER BY orden, id
-            ''').fetchall()
+            ''')
             # Cargar imágenes de la galería para el hero slider
-            imagenes_hero = conn.execute('''
-                SELECT * FROM galeria_imagenes 
-                WHERE activo = 1 AND (pagina = 'investigacion' OR pagina IS NULL OR pagina = '')
-                ORDER BY orden, id DESC
-                LIMIT 10
-            ''').fetchall()
-            conn.close()
+            imagenes_hero = get_imagenes_hero('investigacion')
             return render_template('investigacion.html', proyectos=proyectos, publicaciones=publicaciones, tarjetas_destacadas=tarjetas_destacadas, imagenes_hero=imagenes_hero, lang=lang, locale=locale)
         
         elif page == 'faq':
-            conn = get_db()
-            faqs = conn.execute('''
+            faqs = cached_records('''
                 SELECT * FROM faq WHERE activo = 1 
                 ORDER BY categoria, orden, id
-            ''').fetchall()
-            tarjetas_destacadas = conn.execute('''
+            ''')
+            tarjetas_destacadas = cached_records('''
                 SELECT * FROM tarjetas_destacadas WHERE pagina = 'faq' AND activo = 1 
                 ORDER BY orden, id
-            ''').fetchall()
+            ''')
             # Cargar imágenes de la galería para el hero slider
-            imagenes_hero = conn.execute('''
-                SELECT * FROM galeria_imagenes 
-                WHERE activo = 1 AND (pagina = 'faq' OR pagina IS NULL OR pagina = '')
-                ORDER BY orden, id DESC
-                LIMIT 10
-            ''').fetchall()
-            conn.close()
+            imagenes_hero = get_imagenes_hero('faq')
             # Organizar FAQs por categoría
             faqs_por_categoria = {}
             categorias_nombres = {
@@ -1786,40 +2385,26 @@ def page(page):
             return render_template('faq.html', faqs_por_categoria=faqs_por_categoria, categorias_nombres=categorias_nombres, imagenes_hero=imagenes_hero, lang=lang, locale=locale)
         
         elif page == 'quienes-somos':
-            conn = get_db()
-            certificados = conn.execute('''
+            certificados = cached_records('''
                 SELECT * FROM certificados WHERE activo = 1 
                 ORDER BY organismo, orden, id
-            ''').fetchall()
-            tarjetas_destacadas = conn.execute('''
+            ''')
+            tarjetas_destacadas = cached_records('''
                 SELECT * FROM tarjetas_destacadas WHERE pagina = 'quienes-somos' AND activo = 1 
                 ORDER BY orden, id
-            ''').fetchall()
+            ''')
             # Cargar imágenes de la galería para el hero slider (solo las asignadas a esta página)
-            imagenes_hero = conn.execute('''
-                SELECT * FROM galeria_imagenes 
-                WHERE activo = 1 AND (pagina = 'quienes-somos' OR pagina IS NULL OR pagina = '')
-                ORDER BY orden, id DESC
-                LIMIT 10
-            ''').fetchall()
-            conn.close()
+            imagenes_hero = get_imagenes_hero('quienes-somos')
             return render_template('quienes-somos.html', certificados=certificados, tarjetas_destacadas=tarjetas_destacadas, imagenes_hero=imagenes_hero, lang=lang, locale=locale)
         
         # Si existe template pero no necesita datos especiales, renderizarlo con lang
         # Incluir tarjetas destacadas e imágenes hero para todas las páginas
-        conn = get_db()
-        tarjetas_destacadas = conn.execute('''
+        tarjetas_destacadas = cached_records('''
             SELECT * FROM tarjetas_destacadas WHERE pagina = ? AND activo = 1 
             ORDER BY orden, id
-        ''', (page,)).fetchall()
+        ''', (page,))
         # Cargar imágenes de la galería para el hero slider
-        imagenes_hero = conn.execute('''
-            SELECT * FROM galeria_imagenes 
-            WHERE activo = 1 AND (pagina = ? OR pagina IS NULL OR pagina = '')
-            ORDER BY orden, id DESC
-            LIMIT 10
-        ''', (page,)).fetchall()
-        conn.close()
+        imagenes_hero = get_imagenes_hero(page)
         return render_template(template_file, tarjetas_destacadas=tarjetas_destacadas, imagenes_hero=imagenes_hero, lang=lang, locale=locale)
     
     # Si NO existe template, servir archivo estático (solo si no tiene Jinja2)
@@ -1908,6 +2493,21 @@ def admin_dashboard():
     conn.close()
     return render_template('admin/dashboard.html', stats=stats)
 
+@app.route('/admin/cache-stats')
+@login_required
+def admin_cache_stats():
+    """Estado de las cachés de este worker (JSON): filtros de contenido y datos/páginas públicas"""
+    return jsonify({
+        'pid': os.getpid(),
+        'filtros': filter_cache_stats(),
+        'page_cache': {
+            'entradas': len(page_cache),
+            'entradas_parametros': page_cache.param_entries(),
+            'max_entries': page_cache.max_entries,
+            'max_param_entries': page_cache.max_param_entries,
+        }
+    })
+
 # Cambio de contraseña
 @app.route('/admin/cambiar-contrasena', methods=['GET', 'POST'])
 @login_required
@@ -2447,136 +3047,348 @@ def admin_certificado_eliminar(certificado_id):
     return redirect(url_for('admin_certificados'))
 
 # Gestión de Metodologías Analíticas
+# ============================================
+# LISTADO PAGINADO DE NOTICIAS
+# ============================================
+# noticias.html muestra una página de tarjetas y el resto se pide a /api/noticias ("Cargar más").
+# Paginación por cursor (fecha, id) sobre idx_noticias_destacadas: cada página es una búsqueda
+# en el índice, sin OFFSET, así que el costo no crece con el archivo de noticias.
+app.config['NOTICIAS_POR_PAGINA'] = int(os.environ.get('NOTICIAS_POR_PAGINA', '9'))
+# Noticias relacionadas que se muestran al final de cada noticia
+app.config['NOTICIAS_RELACIONADAS'] = int(os.environ.get('NOTICIAS_RELACIONADAS', '3'))
+
+# Columnas de las tarjetas: del cuerpo solo un extracto (texto de respaldo sin resumen y enlace a la noticia)
+_COLUMNAS_TARJETA_NOTICIA = '''
+    id, slug, titulo, titulo_en, resumen, resumen_en, categoria, categoria_en, fecha,
+    imagen, imagen_zoom, imagen_x, imagen_y, enlace_externo,
+    substr(contenido, 1, 300) AS contenido, substr(contenido_en, 1, 300) AS contenido_en
+'''
+
+# Columnas de las tarjetas de eventos (index.html y noticias.html)
+_COLUMNAS_TARJETA_EVENTO = '''
+    id, titulo, titulo_en, fecha, meta, meta_en, descripcion, descripcion_en,
+    enlace, texto_boton, texto_boton_en
+'''
+
+def pagina_noticias(fecha=None, despues_de=None):
+    """
+    Una página de noticias destacadas (ORDER BY fecha DESC, id DESC) que empieza después de la
+    noticia (fecha, despues_de); sin cursor, la primera. Devuelve (noticias, siguiente), donde
+    siguiente es el cursor {'fecha', 'id'} de la página que sigue o None si no hay más.
+    """
+    limite = app.config['NOTICIAS_POR_PAGINA']
+    base = f'SELECT {_COLUMNAS_TARJETA_NOTICIA} FROM noticias WHERE activa = 1 AND destacada = 1'
+    if despues_de is None:
+        noticias = cached_records(f'{base} AND fecha IS NOT NULL ORDER BY fecha DESC, id DESC LIMIT ?', (limite + 1,))
+    elif fecha is not None:
+        noticias = cached_records(f'{base} AND fecha IS NOT NULL AND (fecha, id) < (?, ?) ORDER BY fecha DESC, id DESC LIMIT ?',
+                                  (fecha, despues_de, limite + 1), parametros=True)
+    else:
+        noticias = []
+    # Las noticias sin fecha van al final (NULL es el menor valor en SQLite) y no entran en la
+    # comparación (fecha, id) < (?, ?): se piden aparte cuando la página no se completó
+    if len(noticias) <= limite:
+        sin_fecha, params = f'{base} AND fecha IS NULL', ()
+        if fecha is None and despues_de is not None:
+            sin_fecha, params = f'{sin_fecha} AND id < ?', (despues_de,)
+        noticias += cached_records(f'{sin_fecha} ORDER BY id DESC LIMIT ?', params + (limite + 1 - len(noticias),),
+                                   parametros=despues_de is not None)
+    siguiente = None
+    if len(noticias) > limite:
+        noticias = noticias[:limite]
+        siguiente = {'fecha': noticias[-1]['fecha'], 'id': noticias[-1]['id']}
+    return noticias, siguiente
+
+def _tarjeta_noticia(noticia):
+    """Datos de una tarjeta de noticias.html para el botón "Cargar más" (mismos enlaces que la plantilla)"""
+    if noticia.contenido:
+        enlace = {'href': url_for_idioma('noticia_completa', slug_or_id=noticia.slug or noticia.id), 'texto': _('Leer noticia completa'), 'externo': True}
+    elif noticia.enlace_externo:
+        enlace = {'href': noticia.enlace_externo, 'texto': _('Ver más'), 'externo': True}
+    elif noticia.categoria == 'docencia' or 'educacion' in (noticia.categoria or '').lower():
+        enlace = {'href': url_for_idioma('page', page='docencia') + '#educacion-continua', 'texto': _('Ver programas'), 'externo': False}
+    else:
+        enlace = {'href': url_for_idioma('page', page='noticias'), 'texto': _('Ver más'), 'externo': False}
+    titulo_filtro = app.jinja_env.filters['title']
+    return {
+        'id': noticia.id,
+        'titulo': noticia.titulo,
+        'resumen': noticia.resumen or noticia.contenido or '',
+        'fecha': noticia.fecha,
+        'categoria': titulo_filtro(noticia.categoria) if noticia.categoria else None,
+        'imagen': noticia.imagen,
+        'imagen_zoom': noticia.imagen_zoom,
+        'imagen_x': noticia.imagen_x,
+        'imagen_y': noticia.imagen_y,
+        'enlace': enlace,
+    }
+
+@app.route('/api/noticias')
+def api_noticias():
+    """Siguiente página de noticias destacadas: ?fecha=...&id=... (cursor devuelto por la página anterior)"""
+    despues_de = request.args.get('id', type=int)
+    if despues_de is None:
+        return jsonify({'error': 'Falta el parámetro id', 'noticias': [], 'siguiente': None}), 400
+    fecha = request.args.get('fecha')  # Ausente: la última noticia de la página anterior no tiene fecha
+    
+    sync_content_versions()
+    validadores = content_validators(('noticias',), request.full_path, get_language())
+    if validadores and not_modified(validadores):
+        return not_modified_response(validadores)
+    noticias, siguiente = pagina_noticias(fecha, despues_de)
+    return with_validators(jsonify({
+        'noticias': [_tarjeta_noticia(noticia) for noticia in noticias],
+        'siguiente': siguiente
+    }), validadores)
+
+# Columnas que expone /api/metodologias (las que no existan en la base de datos se omiten)
+_CAMPOS_API_METODOLOGIAS = (
+    'nombre', 'nombre_en', 'categoria', 'analito', 'analito_en', 'matriz', 'matriz_en',
+    'tecnica', 'tecnica_en', 'limite_deteccion', 'limite_cuantificacion', 'acreditada',
+)
+
+def _sql_api_metodologias():
+    """
+    SELECT de /api/metodologias con las columnas que existen según el catálogo de esquema
+    (sin consultar sqlite_master ni reintentar cuando falta una columna opcional).
+    None si la tabla no existe.
+    """
+    columnas = schema_catalog.columns('metodologias')
+    if not columnas:
+        return None
+    campos = [campo for campo in _CAMPOS_API_METODOLOGIAS if campo in columnas]
+    filtro = 'WHERE activo = 1' if 'activo' in columnas else ''
+    return f'SELECT {", ".join(campos)} FROM metodologias {filtro} ORDER BY id'
+
+def _fila_api_metodologia(met):
+    """Fila de /api/metodologias (las columnas omitidas quedan como '')"""
+    met = dict(met)
+    return {
+        'nombre': met.get('nombre', ''),
+        'nombre_en': met.get('nombre_en', ''),
+        'categoria': met.get('categoria', ''),
+        'analito': met.get('analito', ''),
+        'analito_en': met.get('analito_en', ''),
+        'matriz': met.get('matriz', ''),
+        'matriz_en': met.get('matriz_en', ''),
+        'tecnica': met.get('tecnica', ''),
+        'tecnica_en': met.get('tecnica_en', ''),
+        'lod': met.get('limite_deteccion', ''),
+        'loq': met.get('limite_cuantificacion', ''),
+        'acreditada': bool(met.get('acreditada', 0))
+    }
+
+# Columnas de /api/metodologias?format=compact que guardan posiciones en una tabla de textos
+# compartida (se repiten los mismos pocos valores en cientos de filas)
+_COLUMNAS_DICCIONARIO_METODOLOGIAS = ('categoria', 'matriz', 'matriz_en', 'tecnica', 'tecnica_en')
+
+# Vigencia en caché de /api/metodologias?v=<ETag>: esa URL nunca cambia de contenido
+app.config['API_METODOLOGIAS_MAX_AGE'] = int(os.environ.get('API_METODOLOGIAS_MAX_AGE', str(365 * 24 * 3600)))
+
+def _metodologias_compactas(filas, campos=None):
+    """
+    Las filas de /api/metodologias por columnas: {'total', 'campos', 'diccionario', 'textos', 'columnas'}.
+    Las columnas de _COLUMNAS_DICCIONARIO_METODOLOGIAS traen índices de 'textos'; fila i =
+    {campo: columnas[campo][i]} (o textos[columnas[campo][i]] si está en 'diccionario').
+    """
+    campos = list(campos or _fila_api_metodologia({}))
+    textos, posiciones = [], {}
+    columnas = {}
+    for campo in campos:
+        valores = [fila[campo] for fila in filas]
+        if campo in _COLUMNAS_DICCIONARIO_METODOLOGIAS:
+            for valor in valores:
+                if valor not in posiciones:
+                    posiciones[valor] = len(textos)
+                    textos.append(valor)
+            valores = [posiciones[valor] for valor in valores]
+        columnas[campo] = valores
+    return {
+        'total': len(filas),
+        'campos': campos,
+        'diccionario': [campo for campo in campos if campo in _COLUMNAS_DICCIONARIO_METODOLOGIAS],
+        'textos': textos,
+        'columnas': columnas,
+    }
+
+def payload_metodologias(formato):
+    """
+    Cuerpo JSON de /api/metodologias ('filas' o 'compact') ya serializado y comprimido con gzip:
+    (json, json_gzip, cantidad), calculado una vez por versión de la tabla metodologias.
+    None si la tabla no existe.
+    """
+    def cargar():
+        sql = _sql_api_metodologias()
+        if sql is None:
+            return None
+        filas = [_fila_api_metodologia(met) for met in get_db().execute(sql)]
+        cuerpo = _metodologias_compactas(filas) if formato == 'compact' else filas
+        datos = (app.json.dumps(cuerpo, separators=(',', ':')) + '\n').encode('utf-8')
+        return datos, gzip.compress(datos, compresslevel=9, mtime=0), len(filas)
+    return cached_value(('payload_metodologias', formato), ('metodologias',), cargar)
+
+# Campos de /api/metodologias cuyo nombre no es el de la columna
+_COLUMNAS_CAMPOS_API_METODOLOGIAS = {'lod': 'limite_deteccion', 'loq': 'limite_cuantificacion'}
+
+# Parámetros que convierten la respuesta en una consulta filtrada y paginada (ver _consulta_api_metodologias)
+_PARAMETROS_CONSULTA_METODOLOGIAS = ('fields', 'categoria', 'matriz', 'tecnica', 'acreditada', 'lang', 'cursor', 'limit')
+
+def _consulta_api_metodologias(args):
+    """
+    SELECT de /api/metodologias con los parámetros de la URL, resuelto con los índices de la
+    migración 9: categoria/matriz/tecnica (valor exacto, en español o inglés), acreditada (1/0),
+    fields (campos separados por coma), lang (campos ya traducidos, sin los _en) y cursor/limit
+    (id de la última fila de la página anterior). Devuelve (sql, params, campos, lang, limite);
+    ValueError con el mensaje para el cliente si algún parámetro no es válido.
+    """
+    columnas = schema_catalog.columns('metodologias')
+    lang = args.get('lang') or None
+    if lang is not None and lang not in LANGUAGES:
+        raise ValueError(f'lang debe ser uno de: {", ".join(LANGUAGES)}')
+    disponibles = [
+        campo for campo in _fila_api_metodologia({})
+        if _COLUMNAS_CAMPOS_API_METODOLOGIAS.get(campo, campo) in columnas and not (lang and campo.endswith('_en'))
+    ]
+    campos = disponibles
+    if args.get('fields'):
+        campos = list(dict.fromkeys(campo.strip() for campo in args['fields'].split(',') if campo.strip()))
+        desconocidos = [campo for campo in campos if campo not in disponibles]
+        if desconocidos:
+            raise ValueError(f'Campos no válidos: {", ".join(desconocidos)}')
+    
+    seleccion = ['id']
+    for campo in campos:
+        columna = _COLUMNAS_CAMPOS_API_METODOLOGIAS.get(campo, campo)
+        seleccion.append(columna)
+        if lang and f'{columna}_en' in columnas:
+            seleccion.append(f'{columna}_en')  # proyectar() elige el valor del idioma
+    
+    cursor = args.get('cursor')
+    if cursor and not cursor.isdigit():
+        raise ValueError('cursor debe ser el id devuelto en "siguiente"')
+    activo = ['activo = 1'] if 'activo' in columnas else []
+    condiciones, params = list(activo), []
+    for filtro in ('categoria', 'matriz', 'tecnica'):
+        valor = args.get(filtro)
+        if not valor:
+            continue
+        if f'{filtro}_en' not in columnas:
+            condiciones.append(f'{filtro} = ?')
+            params.append(valor)
+            continue
+        # Español o inglés: un SELECT por columna, cada uno por su índice parcial (un OR recorre la tabla)
+        ramas = []
+        for columna in (filtro, f'{filtro}_en'):
+            rama = activo + [f'{columna} = ?'] + (['id > ?'] if cursor else [])
+            ramas.append(f'SELECT id FROM metodologias WHERE {" AND ".join(rama)}')
+            params += [valor, int(cursor)] if cursor else [valor]
+        condiciones.append(f'id IN ({" UNION ".join(ramas)})')
+    if args.get('acreditada'):
+        valor = args['acreditada'].lower()
+        if valor not in ('1', '0', 'true', 'false'):
+            raise ValueError('acreditada debe ser 1 o 0')
+        condiciones.append('acreditada = ?')
+        params.append(1 if valor in ('1', 'true') else 0)
+    if cursor:
+        condiciones.append('id > ?')
+        params.append(int(cursor))
+    limite = args.get('limit', 100, type=int) or 100
+    limite = max(1, min(limite, 500))
+    
+    where = f'WHERE {" AND ".join(condiciones)}' if condiciones else ''
+    sql = f'SELECT {", ".join(dict.fromkeys(seleccion))} FROM metodologias {where} ORDER BY id LIMIT ?'
+    return sql, tuple(params) + (limite + 1,), campos, lang, limite
+
+def _api_metodologias_filtradas(formato):
+    """/api/metodologias con filtros: {'result': filas, 'siguiente': cursor o None} (o por columnas)"""
+    try:
+        sql, params, campos, lang, limite = _consulta_api_metodologias(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e), 'result': []}), 400
+    
+    try:
+        sync_content_versions()
+        validadores = content_validators(('metodologias',), request.full_path)
+        if validadores and not_modified(validadores):
+            return not_modified_response(validadores)
+        # Combinaciones de parámetros arbitrarias: zona acotada de la caché
+        filas = cached_query(sql, params, parametros=True)
+    except sqlite3.OperationalError as e:
+        app.logger.error(f'Error SQL en API metodologias (filtros): {str(e)}', exc_info=True)
+        return jsonify({
+            'error': 'Error en la base de datos',
+            'details': str(e) if app.debug else 'Error al acceder a la base de datos',
+            'result': [],
+        }), 500
+    siguiente = filas[limite - 1]['id'] if len(filas) > limite else None
+    resultado = []
+    for fila in filas[:limite]:
+        vista = proyectar(fila, lang) if lang else fila
+        valores = {}
+        for campo in campos:
+            columna = _COLUMNAS_CAMPOS_API_METODOLOGIAS.get(campo, campo)
+            valores[campo] = getattr(vista, columna) if lang else vista[columna]
+        if 'acreditada' in valores:
+            valores['acreditada'] = bool(valores['acreditada'])
+        resultado.append(valores)
+    
+    if formato == 'compact':
+        cuerpo = dict(_metodologias_compactas(resultado, campos), siguiente=siguiente)
+    else:
+        cuerpo = {'result': resultado, 'siguiente': siguiente}
+    return with_validators(jsonify(cuerpo), validadores)
+
 @app.route('/api/metodologias')
 def api_metodologias():
-    """API endpoint para obtener todas las metodologías activas (para el chatbot)"""
-    conn = None
+    """
+    Metodologías activas (para el chatbot): lista de filas o, con ?format=compact, por columnas
+    con una tabla de textos compartida. Con ?v=<ETag de la respuesta> se puede cachear sin revalidar.
+    Con filtros, campos o paginación (ver _consulta_api_metodologias) responde solo esa página.
+    """
+    formato = request.args.get('format', 'filas')
+    if formato not in ('filas', 'compact'):
+        return jsonify({'error': 'Formato no válido (filas o compact)', 'result': []}), 400
+    if any(parametro in request.args for parametro in _PARAMETROS_CONSULTA_METODOLOGIAS):
+        return _api_metodologias_filtradas(formato)
     try:
-        conn = get_db()
-        
-        # Verificar si la tabla existe
-        try:
-            table_check = conn.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='metodologias'").fetchone()
-            if not table_check:
-                app.logger.warning('API metodologias: La tabla metodologias no existe')
-                if conn:
-                    conn.close()
-                return jsonify({'error': 'La tabla de metodologías no existe', 'result': []}), 200
-        except Exception as e:
-            app.logger.error(f'API metodologias: Error al verificar tabla: {str(e)}', exc_info=True)
-            if conn:
-                conn.close()
-            return jsonify({'error': 'Error al verificar la base de datos', 'result': []}), 200
-        
-        # Intentar consulta simple primero
-        try:
-            # Consulta básica que debería funcionar siempre
-            metodologias = conn.execute('''
-                SELECT nombre, nombre_en, categoria, analito, analito_en, matriz, matriz_en, 
-                       tecnica, tecnica_en, limite_deteccion, limite_cuantificacion, acreditada
-                FROM metodologias
-            ''').fetchall()
-            
-            # Filtrar por activo si existe la columna
-            filtered_metodologias = []
-            for met in metodologias:
-                try:
-                    # Intentar acceder a 'activo' - si no existe, incluir todas
-                    if 'activo' in met.keys():
-                        if met['activo'] == 1:
-                            filtered_metodologias.append(met)
-                    else:
-                        # Si no existe columna activo, incluir todas
-                        filtered_metodologias.append(met)
-                except:
-                    # Si hay error, incluir de todas formas
-                    filtered_metodologias.append(met)
-            
-            metodologias = filtered_metodologias
-            app.logger.info(f'API metodologias: Encontradas {len(metodologias)} metodologías')
-            
-        except sqlite3.OperationalError as e:
-            error_msg = str(e)
-            app.logger.error(f'API metodologias: Error SQL: {error_msg}', exc_info=True)
-            
-            # Si falla por columna faltante, intentar consulta más simple
-            if 'no such column' in error_msg.lower():
-                try:
-                    app.logger.warning('API metodologias: Intentando consulta simplificada...')
-                    metodologias = conn.execute('''
-                        SELECT nombre, categoria, analito, matriz, tecnica, limite_deteccion, limite_cuantificacion, acreditada
-                        FROM metodologias
-                    ''').fetchall()
-                    app.logger.info(f'API metodologias: Consulta simplificada exitosa, {len(metodologias)} resultados')
-                except Exception as e2:
-                    app.logger.error(f'API metodologias: Error en consulta simplificada: {str(e2)}', exc_info=True)
-                    if conn:
-                        conn.close()
-                    return jsonify({
-                        'error': 'Error al consultar metodologías',
-                        'details': str(e2) if app.debug else 'Error en la base de datos',
-                        'result': []
-                    }), 500
-            else:
-                if conn:
-                    conn.close()
-                return jsonify({
-                    'error': 'Error en la consulta SQL',
-                    'details': error_msg if app.debug else 'Error al consultar metodologías',
-                    'result': []
-                }), 500
-        
-        # Convertir a lista de diccionarios
-        # sqlite3.Row no tiene método .get(), se accede con [] o con 'in'
-        result = []
-        for met in metodologias:
-            try:
-                # Acceder a campos de sqlite3.Row usando [] en lugar de .get()
-                result.append({
-                    'nombre': met['nombre'] if 'nombre' in met.keys() else '',
-                    'nombre_en': met['nombre_en'] if 'nombre_en' in met.keys() else '',
-                    'categoria': met['categoria'] if 'categoria' in met.keys() else '',
-                    'analito': met['analito'] if 'analito' in met.keys() else '',
-                    'analito_en': met['analito_en'] if 'analito_en' in met.keys() else '',
-                    'matriz': met['matriz'] if 'matriz' in met.keys() else '',
-                    'matriz_en': met['matriz_en'] if 'matriz_en' in met.keys() else '',
-                    'tecnica': met['tecnica'] if 'tecnica' in met.keys() else '',
-                    'tecnica_en': met['tecnica_en'] if 'tecnica_en' in met.keys() else '',
-                    'lod': met['limite_deteccion'] if 'limite_deteccion' in met.keys() else '',
-                    'loq': met['limite_cuantificacion'] if 'limite_cuantificacion' in met.keys() else '',
-                    'acreditada': bool(met['acreditada'] if 'acreditada' in met.keys() else 0)
-                })
-            except KeyError as e:
-                app.logger.warning(f'API metodologias: Columna faltante: {str(e)}')
-                continue
-            except Exception as e:
-                app.logger.warning(f'API metodologias: Error al procesar metodología: {str(e)}')
-                continue
-        
-        # Cerrar conexión antes de retornar
-        if conn:
-            conn.close()
-        
-        # Respuesta con headers para caché
-        response = jsonify(result)
-        response.headers['Cache-Control'] = 'no-cache, no-store, must-revalidate'
-        response.headers['Pragma'] = 'no-cache'
-        response.headers['Expires'] = '0'
-        app.logger.info(f'API metodologias: Devolviendo {len(result)} metodologías activas')
-        
-        # Si no hay metodologías, loguear una advertencia
-        if len(result) == 0:
+        # Revalidación del widget del chatbot: 304 sin consultar si metodologias no cambió
+        sync_content_versions()
+        # Cuerpo comprimido de antemano para los clientes que aceptan gzip (q > 0); cada
+        # codificación tiene su propio ETag para que un caché no sirva una por la otra
+        codificacion = 'gzip' if request.accept_encodings['gzip'] > 0 else 'identity'
+        validadores = content_validators(('metodologias',), request.path, formato, codificacion)
+        if validadores and not_modified(validadores):
+            response = not_modified_response(validadores)
+            response.vary.add('Accept-Encoding')
+            return response
+        
+        payload = payload_metodologias(formato)
+        if payload is None:
+            app.logger.warning('API metodologias: La tabla metodologias no existe')
+            return jsonify({'error': 'La tabla de metodologías no existe', 'result': []}), 200
+        datos, comprimido, cantidad = payload
+        if cantidad == 0:
             app.logger.warning('API metodologias: No hay metodologías activas en la base de datos')
         
+        if codificacion == 'gzip':
+            response = app.response_class(comprimido, mimetype='application/json')
+            response.headers['Content-Encoding'] = 'gzip'
+        else:
+            response = app.response_class(datos, mimetype='application/json')
+        response.vary.add('Accept-Encoding')
+        
+        # Respuesta con validadores: el navegador revalida y recibe 304 si no hubo cambios
+        with_validators(response, validadores)
+        if validadores and request.args.get('v') == validadores[0]:
+            # URL versionada: si cambian las metodologías cambia el ETag y con él la URL
+            response.cache_control.no_cache = None
+            response.cache_control.public = True
+            response.cache_control.max_age = app.config['API_METODOLOGIAS_MAX_AGE']
+            response.cache_control.immutable = True
         return response
     except sqlite3.OperationalError as e:
         error_msg = f'Error SQL en API metodologias: {str(e)}'
         app.logger.error(error_msg, exc_info=True)
-        if conn:
-            try:
-                conn.close()
-            except:
-                pass
         return jsonify({
             'error': 'Error en la base de datos',
             'details': str(e) if app.debug else 'Error al acceder a la base de datos'
@@ -2585,11 +3397,6 @@ def api_metodologias():
         error_msg = f'Error en API metodologias: {str(e)}'
         error_type = type(e).__name__
         app.logger.error(f'{error_msg} (Tipo: {error_type})', exc_info=True)
-        if conn:
-            try:
-                conn.close()
-            except:
-                pass
         # En desarrollo, devolver detalles del error; en producción, mensaje genérico
         error_details = str(e) if app.debug else 'Error interno del servidor'
         return jsonify({
@@ -2598,6 +3405,347 @@ def api_metodologias():
             'type': error_type if app.debug else None
         }), 500
 
+# ============================================
+# BÚSQUEDA DE METODOLOGÍAS (índice invertido)
+# ============================================
+
+def normalizar_busqueda(texto):
+    """Igual que normalizeText() de chatbot.js: minúsculas, sin acentos ni signos"""
+    if not texto:
+        return ''
+    texto = unicodedata.normalize('NFD', str(texto).lower())
+    texto = ''.join(c for c in texto if unicodedata.category(c) != 'Mn')
+    return ' '.join(re.sub(r'[^\w\s]', ' ', texto).split())
+
+# Palabras de las preguntas que no identifican una metodología (extractKeywords() de chatbot.js)
+_PALABRAS_VACIAS_BUSQUEDA = frozenset(normalizar_busqueda(' '.join((
+    'el la los las un una de en para con por que qué hacen hace busca buscar metodos metodologias',
+    'metodología metodologías analisis análisis del tienen tiene tener metodo uso usan usa',
+    'tecnica tecnicas tecnología tecnologías y o',
+))).split())
+
+# Sinónimos y términos relacionados (searchMetodologias() de chatbot.js); solo se usan los de una palabra
+_SINONIMOS_BUSQUEDA = {
+    'tetraciclina': ['tetraciclinas', 'oxitetraciclina', 'clortetraciclina', 'doxiciclina', 'minociclina'],
+    'tetraciclinas': ['tetraciclina', 'oxitetraciclina', 'clortetraciclina'],
+    'tetracilinas': ['tetraciclinas', 'tetraciclina'],
+    'tetracilina': ['tetraciclina', 'tetraciclinas'],
+    'macrolido': ['macrolidos', 'eritromicina', 'tilmicosina', 'tilosina', 'espiramicina', 'tulatromicina', 'azitromicina'],
+    'macrolidos': ['macrolido', 'eritromicina', 'tilmicosina', 'tilosina', 'espiramicina', 'tulatromicina', 'azitromicina'],
+    'aminoglucosido': ['aminoglucosidos', 'estreptomicina', 'neomicina', 'gentamicina', 'kanamicina', 'espectinomicina', 'apramicina'],
+    'aminoglucosidos': ['aminoglucosido', 'estreptomicina', 'neomicina', 'gentamicina', 'kanamicina', 'espectinomicina', 'apramicina'],
+    'betalactamico': ['betalactamicos', 'penicilina', 'ampicilina', 'amoxicilina', 'cefalosporina', 'ceftiofur'],
+    'betalactamicos': ['betalactamico', 'penicilina', 'ampicilina', 'amoxicilina', 'cefalosporina', 'ceftiofur'],
+    'antibiotico': ['antimicrobiano', 'antimicrobianos', 'fluoroquinolona', 'tetraciclina', 'sulfonamida', 'macrolido', 'aminoglucosido', 'betalactamico'],
+    'antibioticos': ['antimicrobiano', 'antimicrobianos', 'fluoroquinolona', 'tetraciclinas', 'sulfonamidas', 'macrolidos', 'aminoglucosidos', 'betalactamicos'],
+    'micotoxina': ['aflatoxina', 'ocratoxina', 'fumonisina', 'zearalenona', 'deoxinivalenol', 'patulina'],
+    'aflatoxina': ['aflatoxinas'],
+    'pesticida': ['plaguicida', 'organoclorado', 'organofosforado', 'diquat', 'paraquat', 'glifosato', 'herbicida', 'insecticida', 'fungicida'],
+    'organoclorado': ['organoclorados', 'hch', 'lindano', 'ddt', 'dieldrin', 'aldrin', 'endrin', 'heptacloro', 'clordano'],
+    'organoclorados': ['organoclorado', 'hch', 'lindano', 'ddt', 'dieldrin', 'aldrin', 'endrin', 'heptacloro', 'clordano'],
+    'salmon': ['salmones', 'salmonidos', 'salmonideos', 'trucha', 'truchas', 'pez', 'peces', 'hidrobiologico', 'hidrobiologicos'],
+    'carne': ['carnes', 'bovino', 'bovina', 'porcino', 'porcina', 'cerdo', 'cerdos', 'ave', 'aves', 'pollo', 'pollos', 'pecuarios'],
+    'leche': ['lacteo', 'lacteos', 'dairy'],
+    'lcmsms': ['lcms'],
+    'diquat': ['paraquat', 'herbicida', 'bipiridilo'],
+    'amprolio': ['amprolium', 'anticoccidiano', 'antiparasitario'],
+}
+
+def _tokens_busqueda(consulta):
+    """Palabras de la consulta que se buscan (normalizadas, sin repetir ni palabras vacías)"""
+    return [token for token in dict.fromkeys(normalizar_busqueda(consulta).split())
+            if len(token) >= 2 and token not in _PALABRAS_VACIAS_BUSQUEDA]
+
+class IndiceMetodologias:
+    """
+    Índice invertido en memoria de las filas de /api/metodologias: token normalizado -> {posición
+    de la fila: peso del campo donde aparece}. Se construye una vez por versión de la tabla
+    metodologias (ver indice_metodologias()); cada búsqueda solo recorre los tokens de la consulta.
+    """
+    PESOS = {
+        'nombre': 3, 'nombre_en': 3, 'analito': 3, 'analito_en': 3,
+        'matriz': 2, 'matriz_en': 2, 'tecnica': 1, 'tecnica_en': 1,
+    }
+    # Puntaje relativo de una coincidencia por prefijo (mientras se escribe) y por sinónimo
+    FACTOR_PREFIJO = 0.6
+    FACTOR_SINONIMO = 0.4
+    
+    def __init__(self, filas):
+        self.filas = filas
+        self._postings = {}
+        for posicion, fila in enumerate(filas):
+            for campo, peso in self.PESOS.items():
+                for token in set(normalizar_busqueda(fila.get(campo)).split()):
+                    postings = self._postings.setdefault(token, {})
+                    postings[posicion] = max(postings.get(posicion, 0), peso)
+        self._vocabulario = sorted(self._postings)
+    
+    def _prefijos(self, token):
+        """Tokens del índice que empiezan por token (búsqueda binaria en el vocabulario ordenado)"""
+        inicio = bisect_left(self._vocabulario, token)
+        for termino in islice(self._vocabulario, inicio, None):
+            if not termino.startswith(token):
+                break
+            yield termino
+    
+    def _coincidencias(self, token):
+        """{posición: puntaje} de un token de la consulta: exacto, por prefijo o por sinónimo"""
+        puntajes = {}
+        def sumar(termino, factor):
+            for posicion, peso in self._postings.get(termino, {}).items():
+                puntajes[posicion] = max(puntajes.get(posicion, 0), peso * factor)
+        
+        sumar(token, 1.0)
+        if len(token) >= 3:
+            for termino in self._prefijos(token):
+                if termino != token:
+                    sumar(termino, self.FACTOR_PREFIJO)
+        for sinonimo in _SINONIMOS_BUSQUEDA.get(token, ()):
+            sumar(sinonimo, self.FACTOR_SINONIMO)
+        return puntajes
+    
+    def buscar(self, consulta, limite=20):
+        """
+        (resultados, total): filas ordenadas por cantidad de palabras de la consulta que
+        coinciden y luego por puntaje, cada una como (fila, puntaje).
+        """
+        tokens = _tokens_busqueda(consulta)
+        acumulado = {}
+        for token in tokens:
+            for posicion, puntaje in self._coincidencias(token).items():
+                palabras, total = acumulado.get(posicion, (0, 0))
+                acumulado[posicion] = (palabras + 1, total + puntaje)
+        orden = heapq.nsmallest(limite, acumulado.items(), key=lambda item: (-item[1][0], -item[1][1], item[0]))
+        return [(self.filas[posicion], round(puntaje, 2)) for posicion, (_palabras, puntaje) in orden], len(acumulado)
+
+def indice_metodologias():
+    """Índice de búsqueda de las metodologías activas, reconstruido cuando cambia la tabla; None si no existe"""
+    def cargar():
+        sql = _sql_api_metodologias()
+        if sql is None:
+            return None
+        return IndiceMetodologias([_fila_api_metodologia(met) for met in get_db().execute(sql)])
+    return cached_value(('indice_metodologias',), ('metodologias',), cargar)
+
+def _consulta_fts(tokens, operador):
+    """
+    Expresión MATCH de FTS5: cada palabra (por prefijo desde 3 letras) o alguno de sus
+    sinónimos, unidas con AND u OR. Las palabras van entre comillas: sin sintaxis de FTS5.
+    """
+    terminos = []
+    for token in tokens:
+        variantes = [f'"{token}"*' if len(token) >= 3 else f'"{token}"']
+        variantes += [f'"{sinonimo}"' for sinonimo in _SINONIMOS_BUSQUEDA.get(token, ())]
+        terminos.append('(' + ' OR '.join(variantes) + ')')
+    return f' {operador} '.join(terminos)
+
+def _buscar_metodologias_fts(tokens, limite):
+    """(resultados, total) desde metodologias_fts ordenados por bm25: todas las palabras o, si no hay, alguna"""
+    columnas = schema_catalog.columns('metodologias')
+    campos = ', '.join(f'm.{campo}' for campo in _CAMPOS_API_METODOLOGIAS if campo in columnas)
+    pesos = ', '.join(str(IndiceMetodologias.PESOS.get(columna, 0.5)) for columna in _COLUMNAS_FTS_METODOLOGIAS)
+    desde = '''
+        FROM metodologias_fts
+        INNER JOIN metodologias m ON m.id = metodologias_fts.rowid
+        WHERE metodologias_fts MATCH ? AND m.activo = 1
+    '''
+    conn = get_db()
+    for operador in ('AND', 'OR'):
+        consulta = _consulta_fts(tokens, operador)
+        total = conn.execute(f'SELECT COUNT(*) {desde}', (consulta,)).fetchone()[0]
+        if total or len(tokens) == 1:
+            break
+    filas = conn.execute(
+        f'SELECT {campos}, bm25(metodologias_fts, {pesos}) AS rango {desde} ORDER BY rango LIMIT ?',
+        (consulta, limite)
+    ).fetchall()
+    return [(_fila_api_metodologia(fila), round(-fila['rango'], 2)) for fila in filas], total
+
+def buscar_metodologias(consulta, limite=20):
+    """
+    Metodologías activas que coinciden con la consulta: (resultados, total), cada resultado
+    como (fila de /api/metodologias, puntaje). Usa el índice FTS5 si existe (migración 8)
+    y si no el índice invertido en memoria.
+    """
+    tokens = _tokens_busqueda(consulta)
+    if not tokens:
+        return [], 0
+    if schema_catalog.columns('metodologias_fts'):
+        return _buscar_metodologias_fts(tokens, limite)
+    indice = indice_metodologias()
+    return indice.buscar(consulta, limite) if indice else ([], 0)
+
+def conteo_metodologias():
+    """
+    (metodologías, acreditadas) activas, donde una metodología es una combinación única de
+    nombre + matriz + técnica + categoría (acreditada según la primera fila de cada una).
+    """
+    fila = cached_query('''
+        SELECT COUNT(*) AS total, COALESCE(SUM(acreditada != 0), 0) AS acreditadas
+        FROM (
+            SELECT MIN(id), acreditada FROM metodologias
+            WHERE activo = 1
+            GROUP BY nombre, matriz, tecnica, categoria
+        )
+    ''', one=True)
+    return fila['total'], fila['acreditadas']
+
+@app.route('/api/metodologias/search')
+def api_metodologias_search():
+    """Metodologías que coinciden con ?q=... ordenadas por relevancia (&limit=, por defecto 20, máximo 100)"""
+    consulta = request.args.get('q', '').strip()
+    if not consulta:
+        return jsonify({'error': 'Falta el parámetro q', 'total': 0, 'result': []}), 400
+    limite = max(1, min(request.args.get('limit', 20, type=int) or 20, 100))
+    
+    sync_content_versions()
+    validadores = content_validators(('metodologias',), request.full_path)
+    if validadores and not_modified(validadores):
+        return not_modified_response(validadores)
+    resultados, total = buscar_metodologias(consulta, limite)
+    return with_validators(jsonify({
+        'query': consulta,
+        'total': total,
+        'result': [dict(fila, score=puntaje) for fila, puntaje in resultados],
+    }), validadores)
+
+def distancia_edicion(a, b, maximo):
+    """
+    Distancia de Levenshtein entre dos textos; deja de calcular en cuanto supera maximo
+    (devuelve maximo + 1), así descartar un candidato lejano cuesta unas pocas filas.
+    """
+    if abs(len(a) - len(b)) > maximo:
+        return maximo + 1
+    anterior = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        actual = [i]
+        for j, cb in enumerate(b, 1):
+            actual.append(min(anterior[j] + 1, actual[j - 1] + 1, anterior[j - 1] + (ca != cb)))
+        if min(actual) > maximo:
+            return maximo + 1
+        anterior = actual
+    return anterior[-1]
+
+def _trigramas(termino):
+    """Trigramas distintos del término, con relleno para que cuenten el inicio y el final"""
+    relleno = f'\x00\x00{termino}\x00'
+    return {relleno[i:i + 3] for i in range(len(relleno) - 2)}
+
+class SugerenciasMetodologias:
+    """
+    Vocabulario normalizado de analitos, matrices y técnicas (valores completos y cada palabra)
+    con un índice de trigramas. Cada edición cambia a lo más 3 trigramas de la consulta, así que
+    solo se calcula la distancia de edición de los términos que comparten al menos
+    len(trigramas) - 3 * distancia_maxima trigramas con ella (o, en consultas muy cortas, de los
+    de largo parecido). Se construye una vez por versión de la tabla metodologias
+    (ver sugerencias_metodologias()).
+    """
+    CAMPOS = {
+        'analito': 'analito', 'analito_en': 'analito',
+        'matriz': 'matriz', 'matriz_en': 'matriz',
+        'tecnica': 'tecnica', 'tecnica_en': 'tecnica',
+    }
+    
+    def __init__(self, filas):
+        # término normalizado -> {'texto': como se escribe, 'campos': {...}, 'metodologias': n}
+        self.terminos = {}
+        for fila in filas:
+            vistos = set()
+            for columna, campo in self.CAMPOS.items():
+                valor = str(fila.get(columna) or '').strip()
+                if not valor:
+                    continue
+                candidatos = [(normalizar_busqueda(valor), valor)]
+                candidatos += [(normalizar_busqueda(palabra), palabra) for palabra in re.findall(r'\w+', valor) if len(palabra) >= 4]
+                for termino, texto in candidatos:
+                    if not termino:
+                        continue
+                    entrada = self.terminos.setdefault(termino, {'texto': texto, 'campos': set(), 'metodologias': 0})
+                    entrada['campos'].add(campo)
+                    if termino not in vistos:
+                        entrada['metodologias'] += 1
+                        vistos.add(termino)
+        self._vocabulario = sorted(self.terminos)
+        self._por_trigrama = {}
+        self._por_largo = {}
+        for termino in self._vocabulario:
+            for trigrama in _trigramas(termino):
+                self._por_trigrama.setdefault(trigrama, []).append(termino)
+            self._por_largo.setdefault(len(termino), []).append(termino)
+    
+    def _candidatos(self, consulta, maximo):
+        """Términos que pueden estar a distancia <= maximo de la consulta"""
+        trigramas = _trigramas(consulta)
+        minimo = len(trigramas) - 3 * maximo
+        if minimo <= 0:
+            return [termino for largo in range(len(consulta) - maximo, len(consulta) + maximo + 1)
+                    for termino in self._por_largo.get(largo, ())]
+        comunes = {}
+        for trigrama in trigramas:
+            for termino in self._por_trigrama.get(trigrama, ()):
+                comunes[termino] = comunes.get(termino, 0) + 1
+        return [termino for termino, cantidad in comunes.items() if cantidad >= minimo]
+    
+    def sugerir(self, consulta, distancia_maxima=2, limite=10):
+        """
+        Términos que empiezan por la consulta (distancia 0, para autocompletar) y los que están
+        a lo más a distancia_maxima, ordenados por distancia y luego por cantidad de metodologías.
+        """
+        consulta = normalizar_busqueda(consulta)
+        if not consulta:
+            return []
+        encontrados = {}
+        for termino in self._candidatos(consulta, distancia_maxima):
+            distancia = distancia_edicion(consulta, termino, distancia_maxima)
+            if distancia <= distancia_maxima:
+                encontrados[termino] = distancia
+        inicio = bisect_left(self._vocabulario, consulta)
+        for termino in islice(self._vocabulario, inicio, None):
+            if not termino.startswith(consulta):
+                break
+            encontrados[termino] = 0
+        orden = heapq.nsmallest(limite, encontrados.items(),
+                                key=lambda item: (item[1], -self.terminos[item[0]]['metodologias'], item[0]))
+        return [{
+            'texto': self.terminos[termino]['texto'],
+            'campos': sorted(self.terminos[termino]['campos']),
+            'distancia': distancia,
+            'metodologias': self.terminos[termino]['metodologias'],
+        } for termino, distancia in orden]
+
+def sugerencias_metodologias():
+    """Índice de sugerencias de las metodologías activas, reconstruido cuando cambia la tabla; None si no existe"""
+    def cargar():
+        sql = _sql_api_metodologias()
+        if sql is None:
+            return None
+        return SugerenciasMetodologias([_fila_api_metodologia(met) for met in get_db().execute(sql)])
+    return cached_value(('sugerencias_metodologias',), ('metodologias',), cargar)
+
+@app.route('/api/metodologias/suggest')
+def api_metodologias_suggest():
+    """
+    Autocompletado tolerante a errores de tipeo: ?q=tetracilina&max_dist=2&limit=10
+    (max_dist entre 0 y 3; las consultas de menos de 4 letras solo admiten 1)
+    """
+    consulta = request.args.get('q', '').strip()
+    if not consulta:
+        return jsonify({'error': 'Falta el parámetro q', 'sugerencias': []}), 400
+    distancia_maxima = max(0, min(request.args.get('max_dist', 2, type=int), 3))
+    if len(consulta) < 4:
+        distancia_maxima = min(distancia_maxima, 1)
+    limite = max(1, min(request.args.get('limit', 10, type=int) or 10, 50))
+    
+    sync_content_versions()
+    validadores = content_validators(('metodologias',), request.full_path)
+    if validadores and not_modified(validadores):
+        return not_modified_response(validadores)
+    indice = sugerencias_metodologias()
+    return with_validators(jsonify({
+        'query': consulta,
+        'sugerencias': indice.sugerir(consulta, distancia_maxima, limite) if indice else [],
+    }), validadores)
+
 # API para obtener contexto general del sitio (contacto, FAQ, etc.)
 @app.route('/api/chatbot/context', methods=['GET'])
 def api_chatbot_context():
@@ -2644,6 +3792,7 @@ def api_chatbot_context():
             tarjetas = conn.execute('''
                 SELECT titulo, contenido FROM tarjetas_destacadas 
                 WHERE activo = 1 
+                ORDER BY id
                 LIMIT 10
             ''').fetchall()
             
@@ -2687,12 +3836,8 @@ def api_chatbot_search():
         conversation_context = ""
         if previous_query:
             # Extraer el tema principal de la pregunta anterior (ej: "organoclorados" de "hacen organoclorados?")
-            previous_tema = previous_query.lower()
-            # Limpiar palabras comunes para obtener el tema
-            palabras_comunes = ['hacen', 'tienen', 'analizan', 'metodo', 'metodos', 'metodologia', 'metodologias', 'para', 'en', 'de', 'del', 'la', 'el', 'los', 'las', 'un', 'una', 'que', 'que']
-            for palabra in palabras_comunes:
-                previous_tema = previous_tema.replace(f' {palabra} ', ' ').replace(f'{palabra} ', '').replace(f' {palabra}', '')
-            previous_tema = previous_tema.strip().rstrip('?').strip()
+            # (las palabras buscables, sin palabras vacías; ver _tokens_busqueda)
+            previous_tema = ' '.join(_tokens_busqueda(previous_query)) or previous_query.strip().rstrip('?').strip()
             
             # Detectar si la pregunta actual es con negación sobre matrices
             is_negative_about_matrix = any(word in query.lower() for word in ['no hacen', 'sin', 'no tienen', 'no analizan']) and \
@@ -2753,43 +3898,25 @@ def api_chatbot_search():
         
         # SIEMPRE obtener el conteo total de metodologías (independientemente de si hay local_results)
         # Esto es crítico para preguntas sobre cantidad
+        total_count = total_acreditadas_count = 0
         try:
-            conn = get_db()
-            metodologias_raw = conn.execute('''
-                SELECT nombre, matriz, tecnica, categoria, acreditada
-                FROM metodologias 
-                WHERE activo = 1
-            ''').fetchall()
-            
-            # Agrupar por nombre + matriz + técnica + categoría (igual que en admin)
-            metodologias_agrupadas = {}
-            for m in metodologias_raw:
-                # sqlite3.Row se accede como diccionario, no con .get()
-                nombre = m['nombre'] if 'nombre' in m.keys() else ''
-                matriz = m['matriz'] if 'matriz' in m.keys() else ''
-                tecnica = m['tecnica'] if 'tecnica' in m.keys() else ''
-                categoria = m['categoria'] if 'categoria' in m.keys() else 'otros'
-                acreditada = bool(m['acreditada']) if 'acreditada' in m.keys() else False
-                group_key = (nombre, matriz, tecnica, categoria)
-                if group_key not in metodologias_agrupadas:
-                    metodologias_agrupadas[group_key] = {
-                        'acreditada': acreditada
-                    }
-            
-            # Contar metodologías únicas totales
-            total_count = len(metodologias_agrupadas)
-            
-            # Contar metodologías acreditadas únicas
-            metodologias_acreditadas_unicas = [g for g in metodologias_agrupadas.values() if g.get('acreditada', False)]
-            total_acreditadas_count = len(metodologias_acreditadas_unicas)
+            total_count, total_acreditadas_count = conteo_metodologias()
             
             # Agregar información sobre el total de metodologías al contexto (SIEMPRE)
             local_context += f"\n\nINFORMACIÓN GENERAL SOBRE METODOLOGÍAS (ACTUALIZADA EN TIEMPO REAL):\n- Total de metodologías activas en FARMAVET: {total_count}\n- Total de metodologías acreditadas ISO 17025: {total_acreditadas_count}\n\nNOTA IMPORTANTE: Estos números se calculan dinámicamente cada vez que se consulta y siempre reflejan el estado actual de la base de datos. Una metodología se define por la combinación única de nombre + matriz + técnica + categoría."
-            
-            conn.close()
-        except Exception as e:
+        except sqlite3.Error as e:
             app.logger.warning(f'Error al obtener conteo de metodologías: {str(e)}')
         
+        # Metodologías que coinciden con la pregunta (índice FTS5, ver buscar_metodologias) cuando el
+        # widget no envía las suyas; en preguntas de seguimiento sin coincidencias, las del tema anterior
+        if include_local and not local_results:
+            try:
+                local_results = [fila for fila, _puntaje in buscar_metodologias(query, 50)[0]]
+                if not local_results and previous_query:
+                    local_results = [fila for fila, _puntaje in buscar_metodologias(previous_tema, 50)[0]]
+            except sqlite3.Error as e:
+                app.logger.warning(f'Error al buscar metodologías para el contexto: {str(e)}')
+        
         # Información de contacto (solo para consultas generales o cuando no hay resultados locales)
         if not local_results or is_general_query:
             local_context += "\n\nCONTACTO FARMAVET:\nDirección: Av. Santa Rosa 11735, La Pintana, Santiago, Chile\nEmail: farmavet@uchile.cl\nHorario: L-V 09:00-17:30 hrs"
@@ -2825,7 +3952,6 @@ def api_chatbot_search():
                 
                 if lod:
                     try:
-                        import re
                         lod_num = re.search(r'[\d.]+', str(lod))
                         if lod_num:
                             grupos[grupo_key]['lods'].append(float(lod_num.group()))
@@ -2834,7 +3960,6 @@ def api_chatbot_search():
                 
                 if loq:
                     try:
-                        import re
                         loq_num = re.search(r'[\d.]+', str(loq))
                         if loq_num:
                             grupos[grupo_key]['loqs'].append(float(loq_num.group()))
@@ -2882,8 +4007,7 @@ def api_chatbot_search():
             try:
                 conn = get_db()
                 
-                # Obtener TODAS las metodologías agrupadas por nombre (para incluir context completo)
-                # Esto permite que Perplexity busque inteligentemente incluso cuando la búsqueda local no encuentra resultados
+                # Ninguna coincide con la pregunta: muestra del catálogo para que la IA razone con él
                 metodologias = conn.execute('''
                     SELECT DISTINCT nombre, matriz, tecnica, categoria, acreditada
                     FROM metodologias 
@@ -2896,11 +4020,11 @@ def api_chatbot_search():
                     # Agrupar por nombre del método para mostrar de forma más natural
                     metodos_dict = {}
                     for m in metodologias:
-                        nombre = m['nombre'] if 'nombre' in m.keys() else ''
-                        matriz = m['matriz'] if 'matriz' in m.keys() else ''
-                        tecnica = m['tecnica'] if 'tecnica' in m.keys() and m['tecnica'] else ''
-                        categoria = m['categoria'] if 'categoria' in m.keys() else ''
-                        acreditada = m.get('acreditada', False) if 'acreditada' in m.keys() else False
+                        nombre = m['nombre'] or ''
+                        matriz = m['matriz'] or ''
+                        tecnica = m['tecnica'] or ''
+                        categoria = m['categoria'] or ''
+                        acreditada = bool(m['acreditada'])
                         
                         if nombre:
                             # Crear clave única por método y matriz
@@ -2941,7 +4065,7 @@ def api_chatbot_search():
                     if tarjetas:
                         servicios = []
                         for t in tarjetas:
-                            titulo = t['titulo'] if 'titulo' in t.keys() else ''
+                            titulo = t['titulo'] or ''
                             if titulo:
                                 servicios.append(titulo)
                         if servicios:
@@ -2962,10 +4086,9 @@ def api_chatbot_search():
                     if faqs:
                         local_context += "\n\nPREGUNTAS FRECUENTES (FAQ):"
                         for faq in faqs:
-                            pregunta = faq['pregunta'] if 'pregunta' in faq.keys() else ''
-                            respuesta = faq['respuesta'] if 'respuesta' in faq.keys() else ''
+                            pregunta = faq['pregunta'] or ''
+                            respuesta = faq['respuesta'] or ''
                             # Limpiar HTML de la respuesta (remover tags)
-                            import re
                             respuesta_limpia = re.sub(r'<[^>]+>', '', respuesta) if respuesta else ''
                             if pregunta and respuesta_limpia:
                                 local_context += f"\n- P: {pregunta}"
@@ -2982,7 +4105,6 @@ def api_chatbot_search():
         # Extraer el número de metodologías del contexto local para destacarlo
         metodologias_info = ""
         if "INFORMACIÓN GENERAL SOBRE METODOLOGÍAS" in local_context:
-            import re
             match = re.search(r'Total de metodologías activas en FARMAVET: (\d+)', local_context)
             if match:
                 num_metodologias = match.group(1)
@@ -3210,7 +4332,6 @@ Ahora, razona sobre el contexto completo y la siguiente pregunta, y responde de
             
             # Log del contexto enviado (solo para debugging, truncado)
             if "INFORMACIÓN GENERAL SOBRE METODOLOGÍAS" in system_message:
-                import re
                 match = re.search(r'Total de metodologías activas en FARMAVET: (\d+)', system_message)
                 if match:
                     app.logger.info(f'Chatbot DeepSeek: Contexto incluye {match.group(1)} metodologías activas')
@@ -3275,6 +4396,7 @@ Ahora, razona sobre el contexto completo y la siguiente pregunta, y responde de
         
         # CAPA 2: Si DeepSeek falló, intentar Ollama (local, gratis)
         if deepseek_failed and use_ollama:
+            app.logger.info('Chatbot: DeepSeek no disponible, intentando Ollama...')
             ollama_model = os.environ.get('OLLAMA_MODEL', 'llama3.2:3b')
             ollama_api_url = f"{ollama_url}/api/chat"
             
@@ -3357,8 +4479,6 @@ Ahora, razona sobre el contexto completo y la siguiente pregunta, y responde de
         else:
             ollama_failed = True
         
-            app.logger.info('Chatbot: DeepSeek no disponible, intentando Ollama...')
-        
         # CAPA 3 (OPCIONAL): Si Ollama y DeepSeek fallaron, usar Perplexity como último recurso (si está configurado)
         if deepseek_failed and ollama_failed and use_perplexity:
             app.logger.info('Chatbot: DeepSeek y Ollama no disponibles, usando Perplexity como último recurso...')
@@ -3374,76 +4494,76 @@ Ahora, razona sobre el contexto completo y la siguiente pregunta, y responde de
             if len(system_message) > 3000:
                 app.logger.warning(f'Chatbot Perplexity: Contexto demasiado largo ({len(system_message)} caracteres), truncando...')
                 system_message = system_message[:3000] + "..."
-        
-        # Modelos disponibles de Perplexity (ordenados por preferencia):
-        # - sonar-pro (más potente, mejor razonamiento)
-        # - sonar (más rápido)  
-        # - llama-3.1-sonar-large-128k-online (legacy, más contexto)
-        # - llama-3.1-sonar-small-128k-online (legacy, más rápido)
-        # Nota: Estos modelos pueden hacer búsqueda web, pero con el prompt restringimos su uso
-        # El payload base con el primer modelo que intentaremos
-        base_payload = {
-            "messages": [
-                {
-                    "role": "system",
-                    "content": system_message
-                },
-                {
-                    "role": "user",
-                    "content": query
-                }
-            ],
-            "temperature": 0.2,  # Reducido para respuestas más rápidas
-            "max_tokens": 120  # OPTIMIZACIÓN: Reducido de 200 a 120 tokens para respuestas más rápidas
-        }
-        
-        app.logger.info(f'Chatbot Perplexity: Buscando - {query[:100]}...')
-        app.logger.debug(f'Chatbot Perplexity: System message length: {len(system_message)} caracteres')
-        
-        # Intentar primero con sonar-pro (modelo más reciente y potente)
-        # Nota: sonar-pro y sonar son modelos online (buscadores web), pero podemos usarlos con contexto local
-        # Para evitar búsqueda web, usamos solo el contexto proporcionado
-        models_to_try = [
-            "sonar-pro",  # Modelo más reciente, mejor para razonamiento (preferido)
-            "sonar",      # Modelo rápido (alternativa)
-            "llama-3.1-sonar-small-128k-online"  # Modelo legacy (último recurso)
-        ]
-        
-        response = None
-        last_error = None
-        
-        for model_name in models_to_try:
-            try:
-                # Construir payload para este modelo
-                payload = base_payload.copy()
-                payload["model"] = model_name
-                app.logger.info(f'Chatbot Perplexity: Intentando con modelo {model_name}...')
-                response = requests.post(perplexity_url, headers=headers, json=payload, timeout=20)
+            
+            # Modelos disponibles de Perplexity (ordenados por preferencia):
+            # - sonar-pro (más potente, mejor razonamiento)
+            # - sonar (más rápido)  
+            # - llama-3.1-sonar-large-128k-online (legacy, más contexto)
+            # - llama-3.1-sonar-small-128k-online (legacy, más rápido)
+            # Nota: Estos modelos pueden hacer búsqueda web, pero con el prompt restringimos su uso
+            # El payload base con el primer modelo que intentaremos
+            base_payload = {
+                "messages": [
+                    {
+                        "role": "system",
+                        "content": system_message
+                    },
+                    {
+                        "role": "user",
+                        "content": query
+                    }
+                ],
+                "temperature": 0.2,  # Reducido para respuestas más rápidas
+                "max_tokens": 120  # OPTIMIZACIÓN: Reducido de 200 a 120 tokens para respuestas más rápidas
+            }
+            
+            app.logger.info(f'Chatbot Perplexity: Buscando - {query[:100]}...')
+            app.logger.debug(f'Chatbot Perplexity: System message length: {len(system_message)} caracteres')
+            
+            # Intentar primero con sonar-pro (modelo más reciente y potente)
+            # Nota: sonar-pro y sonar son modelos online (buscadores web), pero podemos usarlos con contexto local
+            # Para evitar búsqueda web, usamos solo el contexto proporcionado
+            models_to_try = [
+                "sonar-pro",  # Modelo más reciente, mejor para razonamiento (preferido)
+                "sonar",      # Modelo rápido (alternativa)
+                "llama-3.1-sonar-small-128k-online"  # Modelo legacy (último recurso)
+            ]
+            
+            response = None
+            last_error = None
+            
+            for model_name in models_to_try:
+                try:
+                    # Construir payload para este modelo
+                    payload = base_payload.copy()
+                    payload["model"] = model_name
+                    app.logger.info(f'Chatbot Perplexity: Intentando con modelo {model_name}...')
+                    response = requests.post(perplexity_url, headers=headers, json=payload, timeout=20)
                 
-                if response.status_code == 200:
-                    app.logger.info(f'Chatbot Perplexity: Éxito con modelo {model_name}')
-                    break
-                elif response.status_code == 400:
-                    error_data = {}
-                    try:
-                        error_data = response.json() if response.headers.get('content-type', '').startswith('application/json') else {}
-                    except:
-                        error_text = response.text[:500]
-                        app.logger.warning(f'Chatbot Perplexity: Error 400 con modelo {model_name}: {error_text}')
+                    if response.status_code == 200:
+                        app.logger.info(f'Chatbot Perplexity: Éxito con modelo {model_name}')
+                        break
+                    elif response.status_code == 400:
+                        error_data = {}
+                        try:
+                            error_data = response.json() if response.headers.get('content-type', '').startswith('application/json') else {}
+                        except:
+                            error_text = response.text[:500]
+                            app.logger.warning(f'Chatbot Perplexity: Error 400 con modelo {model_name}: {error_text}')
                     
-                    last_error = error_data.get('error', {}).get('message', f'Error 400 con modelo {model_name}')
-                    app.logger.warning(f'Chatbot Perplexity: Modelo {model_name} falló (400), intentando siguiente...')
-                    continue
-                else:
-                    app.logger.warning(f'Chatbot Perplexity: Error {response.status_code} con modelo {model_name}')
-                    last_error = f'Error {response.status_code}'
-                    continue
+                        last_error = error_data.get('error', {}).get('message', f'Error 400 con modelo {model_name}')
+                        app.logger.warning(f'Chatbot Perplexity: Modelo {model_name} falló (400), intentando siguiente...')
+                        continue
+                    else:
+                        app.logger.warning(f'Chatbot Perplexity: Error {response.status_code} con modelo {model_name}')
+                        last_error = f'Error {response.status_code}'
+                        continue
                     
-            except requests.exceptions.RequestException as e:
-                app.logger.error(f'Chatbot Perplexity: Error de conexión con modelo {model_name}: {str(e)}')
-                last_error = str(e)
-                continue
-        
+                except requests.exceptions.RequestException as e:
+                    app.logger.error(f'Chatbot Perplexity: Error de conexión con modelo {model_name}: {str(e)}')
+                    last_error = str(e)
+                    continue
+            
             # Verificar si todos los modelos de Perplexity fallaron
             if not response:
                 app.logger.error(f'Chatbot Perplexity: Todos los modelos fallaron. Último error: {last_error}')
@@ -3769,19 +4889,6 @@ def admin_metodologia_nuevo():
 def admin_metodologia_editar(metodologia_id):
     conn = get_db()
     
-    # Asegurar que las columnas existan antes de usarlas
-    try:
-        conn.execute('ALTER TABLE metodologias ADD COLUMN autorizado_sag INTEGER DEFAULT 0')
-        conn.commit()
-    except sqlite3.OperationalError:
-        pass  # La columna ya existe
-    
-    try:
-        conn.execute('ALTER TABLE metodologias ADD COLUMN autorizado_sernapesca INTEGER DEFAULT 0')
-        conn.commit()
-    except sqlite3.OperationalError:
-        pass  # La columna ya existe
-    
     if request.method == 'POST':
         try:
             # Obtener analitos del formulario (pueden venir como array o como campos simples)
@@ -4368,26 +5475,212 @@ def uploaded_file(filename):
 # NOTICIA COMPLETA (página pública)
 # ============================================
 
+def mapa_slugs_noticias():
+    """
+    (id -> slug, slug anterior -> slug vigente) de las noticias activas, cacheado hasta que
+    cambien noticias o noticias_slugs: las redirecciones 301 no consultan la base de datos.
+    """
+    def cargar():
+        conn = get_db()
+        slug_por_id = {
+            fila['id']: fila['slug']
+            for fila in conn.execute('SELECT id, slug FROM noticias WHERE activa = 1 AND slug IS NOT NULL')
+        }
+        slug_vigente = {
+            fila['slug']: fila['vigente']
+            for fila in conn.execute('''
+                SELECT s.slug, n.slug AS vigente
+                FROM noticias_slugs s
+                INNER JOIN noticias n ON n.id = s.noticia_id
+                WHERE n.activa = 1 AND n.slug IS NOT NULL AND n.slug != s.slug
+            ''')
+        }
+        return slug_por_id, slug_vigente
+    return cached_value(('slugs_noticias',), ('noticias', 'noticias_slugs'), cargar)
+
+def _slug_libre(conn, slug, noticia_id=None):
+    """True si ninguna otra noticia usa el slug (índice único idx_noticias_slug)"""
+    fila = conn.execute('SELECT id FROM noticias WHERE slug = ?', (slug,)).fetchone()
+    return fila is None or fila['id'] == noticia_id
+
+def _slug_con_id(conn, slug, noticia_id):
+    """<slug>-<id> para una noticia cuyo slug ya usa otra; si también está ocupado, <slug>-<id>-2, -3..."""
+    candidato, intento = f'{slug}-{noticia_id}', 1
+    while not _slug_libre(conn, candidato, noticia_id):
+        intento += 1
+        candidato = f'{slug}-{noticia_id}-{intento}'
+    return candidato
+
+def _sanitizar_html_noticia(noticia):
+    """
+    Cuerpo de la noticia (lo que muestra partials/noticia_articulo.html) sanitizado en cada
+    idioma con la política vigente. Solo calcula. Devuelve (html_es, html_en).
+    """
+    html = {}
+    for lang in ('es', 'en'):
+        vista = proyectar(noticia, lang)
+        html[lang] = str(rich_content_filter(vista.contenido or vista.resumen or ''))
+    return html['es'], html['en']
+
+def _guardar_html_noticia(conn, noticia_id):
+    """
+    Sanitiza una sola vez el cuerpo de la noticia y lo guarda junto al texto original con la
+    versión del sanitizador. No hace commit. Devuelve (html_es, html_en).
+    """
+    noticia = conn.execute('SELECT * FROM noticias WHERE id = ?', (noticia_id,)).fetchone()
+    if not noticia:
+        return '', ''
+    html_es, html_en = _sanitizar_html_noticia(noticia)
+    conn.execute(
+        'UPDATE noticias SET contenido_html = ?, contenido_html_en = ?, sanitizer_version = ? WHERE id = ?',
+        (html_es, html_en, SANITIZER_VERSION, noticia_id)
+    )
+    return html_es, html_en
+
+def _resanitizar_noticias(conn):
+    """
+    Vuelve a sanitizar y guarda el HTML de las noticias guardadas con otra versión del
+    sanitizador (o sin HTML). No hace commit. Devuelve la cantidad de noticias actualizadas.
+    """
+    pendientes = conn.execute(
+        'SELECT id FROM noticias WHERE sanitizer_version IS NULL OR sanitizer_version != ?', (SANITIZER_VERSION,)
+    ).fetchall()
+    for fila in pendientes:
+        _guardar_html_noticia(conn, fila['id'])
+    return len(pendientes)
+
+def contenido_noticia_html(noticia, lang):
+    """
+    HTML ya sanitizado del cuerpo de la noticia. Si se guardó con otra versión del sanitizador
+    se sanitiza en memoria, sin escribir en la base de datos (flask noticias-recalcular lo guarda).
+    """
+    if noticia['sanitizer_version'] == SANITIZER_VERSION:
+        html_es, html_en = noticia['contenido_html'], noticia['contenido_html_en']
+    else:
+        html_es, html_en = _sanitizar_html_noticia(noticia)
+    return Markup((html_en if lang == 'en' else html_es) or '')
+
+# Datos de cada noticia enlazada desde otra (relacionadas, anterior/siguiente)
+_CAMPOS_NAVEGACION_NOTICIA = ('id', 'slug', 'titulo', 'titulo_en', 'fecha', 'imagen', 'categoria', 'categoria_en')
+
+def _calcular_navegacion_noticias(conn):
+    """
+    Para cada noticia activa, la anterior y la siguiente (orden del listado: fecha DESC, id DESC)
+    y sus relacionadas: las de la misma categoría más cercanas en el listado y, si no alcanzan,
+    las más recientes. Solo lee. Devuelve {id: (navegacion JSON, navegacion guardada)}.
+    """
+    filas = conn.execute(f"""
+        SELECT {', '.join(_CAMPOS_NAVEGACION_NOTICIA)}, navegacion
+        FROM noticias WHERE activa = 1 ORDER BY fecha DESC, id DESC
+    """).fetchall()
+    enlaces = [{campo: fila[campo] for campo in _CAMPOS_NAVEGACION_NOTICIA} for fila in filas]
+    limite = app.config['NOTICIAS_RELACIONADAS']
+    por_categoria = {}
+    for posicion, fila in enumerate(filas):
+        categoria = (fila['categoria'] or '').strip().lower()
+        if categoria:
+            por_categoria.setdefault(categoria, []).append(posicion)
+    
+    resultado = {}
+    for posicion, fila in enumerate(filas):
+        misma_categoria = por_categoria.get((fila['categoria'] or '').strip().lower(), [])
+        relacionadas = sorted((p for p in misma_categoria if p != posicion), key=lambda p: abs(p - posicion))[:limite]
+        for p in range(len(filas)):
+            if len(relacionadas) >= limite:
+                break
+            if p != posicion and p not in relacionadas:
+                relacionadas.append(p)
+        navegacion = json.dumps({
+            'anterior': enlaces[posicion + 1] if posicion + 1 < len(filas) else None,
+            'siguiente': enlaces[posicion - 1] if posicion > 0 else None,
+            'relacionadas': [enlaces[p] for p in relacionadas],
+        }, ensure_ascii=False, sort_keys=True)
+        resultado[fila['id']] = (navegacion, fila['navegacion'])
+    return resultado
+
+def _recalcular_navegacion_noticias(conn):
+    """
+    Guarda en noticias.navegacion lo calculado por _calcular_navegacion_noticias(), solo en las
+    filas que cambiaron (al guardar o eliminar una noticia y en la migración 7). No hace commit.
+    Devuelve la cantidad de noticias actualizadas.
+    """
+    actualizadas = 0
+    for noticia_id, (navegacion, guardada) in _calcular_navegacion_noticias(conn).items():
+        if navegacion != guardada:
+            conn.execute('UPDATE noticias SET navegacion = ? WHERE id = ?', (navegacion, noticia_id))
+            actualizadas += 1
+    return actualizadas
+
+def navegacion_noticia(noticia, lang):
+    """
+    Relacionadas y anterior/siguiente de la noticia, traducidas a lang. Si no están guardadas
+    (noticia cargada fuera del panel) se calculan en memoria, sin escribir en la base de datos:
+    se guardan con flask noticias-recalcular o al editar cualquier noticia.
+    """
+    datos = noticia['navegacion']
+    if datos is None:
+        datos = _calcular_navegacion_noticias(get_db()).get(noticia['id'], ('{}', None))[0]
+    navegacion = json.loads(datos)
+    return {
+        'anterior': proyectar(navegacion['anterior'], lang) if navegacion.get('anterior') else None,
+        'siguiente': proyectar(navegacion['siguiente'], lang) if navegacion.get('siguiente') else None,
+        'relacionadas': [proyectar(enlace, lang) for enlace in navegacion.get('relacionadas', [])],
+    }
+
+@app.cli.command('noticias-recalcular')
+def noticias_recalcular_command():
+    """Guarda el HTML sanitizado y la navegación de las noticias (tras cargarlas con un script o cambiar SANITIZER_VERSION)"""
+    conn = _db_pool.connect()
+    try:
+        sanitizadas = _resanitizar_noticias(conn)
+        actualizadas = _recalcular_navegacion_noticias(conn)
+        conn.commit()
+    finally:
+        conn.close()
+    print(f"✅ HTML sanitizado de nuevo en {sanitizadas} noticias")
+    print(f"✅ Navegación actualizada en {actualizadas} noticias")
+
+def fragmento_noticia(noticia):
+    """
+    <article> de la noticia (cuerpo, relacionadas y anterior/siguiente) ya renderizado, cacheado
+    por noticia e idioma hasta que cambie la tabla noticias. Sirve también cuando no se puede
+    usar la caché de la página completa (con query string o con sesión de administrador).
+    """
+    lang = get_language()
+    # Los enlaces del fragmento dependen del prefijo de la aplicación y del idioma en la URL
+    clave = ('fragmento_noticia', noticia['id'], lang, request.script_root, request.environ.get('farmavet.lang'))
+    def renderizar():
+        return Markup(render_template(
+            'partials/noticia_articulo.html',
+            noticia=noticia,
+            contenido_html=contenido_noticia_html(noticia, lang),
+            navegacion=navegacion_noticia(noticia, lang),
+            lang=lang
+        ))
+    return cached_value(clave, ('noticias',), renderizar)
+
 @app.route('/noticia/<slug_or_id>')
 @app.route('/noticia/<slug_or_id>.html')
+@cached_page
 def noticia_completa(slug_or_id):
     """Muestra el contenido completo de una noticia. Acepta slug (ej: farmavet-mantiene-operaciones) o id numérico."""
     slug_or_id = slug_or_id.replace('.html', '') if isinstance(slug_or_id, str) else str(slug_or_id)
-    conn = get_db()
+    slug_por_id, slug_vigente = mapa_slugs_noticias()
     if slug_or_id.isdigit():
-        noticia = conn.execute('SELECT * FROM noticias WHERE id = ? AND activa = 1', (int(slug_or_id),)).fetchone()
         # Redirigir a URL con slug si existe (SEO)
-        if noticia and noticia.get('slug'):
-            conn.close()
-            return redirect(url_for('noticia_completa', slug_or_id=noticia['slug']), code=301)
+        if int(slug_or_id) in slug_por_id:
+            return redirect(url_for('noticia_completa', slug_or_id=slug_por_id[int(slug_or_id)]), code=301)
+        noticia = cached_records('SELECT * FROM noticias WHERE id = ? AND activa = 1', (int(slug_or_id),), one=True, parametros=True)
+    elif slug_or_id in slug_vigente:
+        # Slug anterior a una edición: redirigir al actual
+        return redirect(url_for('noticia_completa', slug_or_id=slug_vigente[slug_or_id]), code=301)
     else:
-        noticia = conn.execute('SELECT * FROM noticias WHERE slug = ? AND activa = 1', (slug_or_id,)).fetchone()
-    conn.close()
+        noticia = cached_records('SELECT * FROM noticias WHERE slug = ? AND activa = 1', (slug_or_id,), one=True, parametros=True)
     if not noticia:
         abort(404)
     lang = get_language()
     locale = get_locale()
-    return render_template('noticia_completa.html', noticia=noticia, lang=lang, locale=locale)
+    return render_template('noticia_completa.html', noticia=noticia, articulo=fragmento_noticia(noticia), lang=lang, locale=locale)
 
 # ============================================
 # GESTIÓN DE NOTICIAS
@@ -4419,7 +5712,11 @@ def admin_noticia_nuevo():
             titulo = request.form.get('titulo', '').strip()
             slug_raw = request.form.get('slug', '').strip()
             slug = _slugify(slug_raw) if slug_raw else _slugify(titulo)
-            conn.execute('''
+            # Slug ocupado por otra noticia: se completa con el id una vez insertada
+            slug_repetido = slug if slug and not _slug_libre(conn, slug) else None
+            if slug_repetido:
+                slug = None
+            cursor = conn.execute('''
                 INSERT INTO noticias (titulo, resumen, contenido, imagen, imagen_zoom, imagen_x, imagen_y, categoria, fecha, autor, enlace_externo, orden, destacada, activa, titulo_en, resumen_en, contenido_en, categoria_en, autor_en, slug)
                 VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
                 ''', (
@@ -4444,6 +5741,11 @@ def admin_noticia_nuevo():
                 request.form.get('autor_en', '').strip() or None,
                 slug or None
             ))
+            if slug_repetido:
+                conn.execute('UPDATE noticias SET slug = ? WHERE id = ?', (_slug_con_id(conn, slug_repetido, cursor.lastrowid), cursor.lastrowid))
+            conn.execute('DELETE FROM noticias_slugs WHERE slug = (SELECT slug FROM noticias WHERE id = ?)', (cursor.lastrowid,))
+            _guardar_html_noticia(conn, cursor.lastrowid)
+            _recalcular_navegacion_noticias(conn)
             conn.commit()
             conn.close()
             flash('Noticia creada correctamente', 'success')
@@ -4468,6 +5770,9 @@ def admin_noticia_editar(noticia_id):
         titulo = request.form.get('titulo', '')
         slug_raw = request.form.get('slug', '').strip()
         slug = _slugify(slug_raw) if slug_raw else _slugify(titulo)
+        if slug and not _slug_libre(conn, slug, noticia_id):
+            slug = _slug_con_id(conn, slug, noticia_id)
+        anterior = conn.execute('SELECT slug FROM noticias WHERE id = ?', (noticia_id,)).fetchone()
         conn.execute('''
             UPDATE noticias 
             SET titulo=?, resumen=?, contenido=?, imagen=?, imagen_zoom=?, imagen_x=?, imagen_y=?, categoria=?, 
@@ -4497,6 +5802,13 @@ def admin_noticia_editar(noticia_id):
             slug or None,
             noticia_id
         ))
+        # El slug anterior sigue funcionando (301 al nuevo); el nuevo deja de ser un slug anterior
+        if anterior and anterior['slug'] and anterior['slug'] != slug:
+            conn.execute('INSERT OR REPLACE INTO noticias_slugs (slug, noticia_id) VALUES (?, ?)', (anterior['slug'], noticia_id))
+        if slug:
+            conn.execute('DELETE FROM noticias_slugs WHERE slug = ?', (slug,))
+        _guardar_html_noticia(conn, noticia_id)
+        _recalcular_navegacion_noticias(conn)
         conn.commit()
         conn.close()
         flash('Noticia actualizada correctamente', 'success')
@@ -4517,6 +5829,8 @@ def admin_noticia_editar(noticia_id):
 def admin_noticia_eliminar(noticia_id):
     conn = get_db()
     conn.execute('DELETE FROM noticias WHERE id = ?', (noticia_id,))
+    conn.execute('DELETE FROM noticias_slugs WHERE noticia_id = ?', (noticia_id,))
+    _recalcular_navegacion_noticias(conn)
     conn.commit()
     conn.close()
     flash('Noticia eliminada', 'success')
@@ -5353,12 +6667,6 @@ def admin_evento_nuevo():
     if request.method == 'POST':
         try:
             conn = get_db()
-            # Asegurar que la columna destacada existe
-            try:
-                conn.execute('ALTER TABLE eventos ADD COLUMN destacada INTEGER DEFAULT 0')
-                conn.commit()
-            except sqlite3.OperationalError:
-                pass  # La columna ya existe
             
             activo = 1 if request.form.get('activo') == 'on' or request.form.get('activo') == '' else 0
             destacada = 1 if request.form.get('destacada') == 'on' else 0
@@ -5397,13 +6705,6 @@ def admin_evento_editar(evento_id):
     try:
         conn = get_db()
         
-        # Asegurar que la columna destacada existe
-        try:
-            conn.execute('ALTER TABLE eventos ADD COLUMN destacada INTEGER DEFAULT 0')
-            conn.commit()
-        except sqlite3.OperationalError:
-            pass  # La columna ya existe
-        
         if request.method == 'POST':
             destacada = 1 if request.form.get('destacada') == 'on' else 0
             conn.execute('''
@@ -5924,7 +7225,7 @@ def sitemap():
         ).fetchall()
         conn.close()
         for n in noticias_con_contenido:
-            loc = f'/noticia/{n["slug"]}' if n.get('slug') else f'/noticia/{n["id"]}'
+            loc = f'/noticia/{n["slug"]}' if n['slug'] else f'/noticia/{n["id"]}'
             pages.append({'loc': loc, 'changefreq': 'monthly', 'priority': '0.6'})
     except Exception:
         pass
@@ -5956,10 +7257,108 @@ Sitemap: https://www.laboratoriofarmavet.cl/sitemap.xml
 """
     return Response(robots_txt, mimetype='text/plain')
 
-# Ejecutar init_db() siempre para asegurar que todas las tablas existan
-# (usa CREATE TABLE IF NOT EXISTS, así que es seguro)
-init_db()
+# ============================================
+# EXPORTACIÓN ESTÁTICA
+# ============================================
+# Pre-renderiza las páginas públicas en ambos idiomas (un directorio por idioma, con la misma
+# estructura que el modo LANG_URL_PREFIX) para que nginx las sirva sin pasar por gunicorn.
+
+EXPORT_MANIFEST = '.export-manifest.json'
+# Plantillas que no se exportan: contacto lleva el token CSRF de la sesión, el resto no son páginas
+_EXPORT_EXCLUIDAS = {'contacto', 'public_login', 'noticia_completa'}
+
+def _export_urls():
+    """Rutas públicas a exportar en cada idioma: todas las plantillas de página y cada noticia activa"""
+    urls = []
+    for archivo in sorted(os.listdir(os.path.join(app.root_path, app.template_folder))):
+        nombre, extension = os.path.splitext(archivo)
+        if extension == '.html' and nombre not in _EXPORT_EXCLUIDAS:
+            urls.append(f'/{archivo}')
+    conn = _db_pool.connect()
+    try:
+        noticias = conn.execute('SELECT id, slug FROM noticias WHERE activa = 1 ORDER BY id').fetchall()
+    finally:
+        conn.close()
+    urls.extend(f'/noticia/{n["slug"] or n["id"]}.html' for n in noticias)
+    return urls
+
+def _export_firma_contenido():
+    """Versiones de contenido + fecha de despliegue: si no cambian, la exportación está al día"""
+    conn = _db_pool.connect()
+    try:
+        versiones = conn.execute('SELECT tabla, version FROM content_version ORDER BY tabla').fetchall()
+    except sqlite3.OperationalError:
+        versiones = []
+    finally:
+        conn.close()
+    return [DEPLOY_TIME.isoformat(), [list(v) for v in versiones]]
+
+@app.cli.command('export-static')
+@click.argument('destino', default='export')
+@click.option('--full', is_flag=True, help='Renderiza y escribe todo, aunque no haya cambios')
+@click.option('--base-url', default='https://www.laboratoriofarmavet.cl', help='Dominio público (enlaces hreflang)')
+def export_static_command(destino, full, base_url):
+    """Exporta las páginas públicas (es/ y en/), sitemap.xml y robots.txt a un directorio"""
+    os.makedirs(destino, exist_ok=True)
+    manifest_path = os.path.join(destino, EXPORT_MANIFEST)
+    anterior = {}
+    if not full and os.path.exists(manifest_path):
+        with open(manifest_path, encoding='utf-8') as f:
+            anterior = json.load(f)
+    firma = _export_firma_contenido()
+    if anterior.get('firma') == firma:
+        print(f"✅ Exportación al día en {destino} (sin cambios de contenido)")
+        return
+    
+    archivos_anteriores = anterior.get('archivos', {})
+    archivos = {}
+    escritos = 0
+    rutas = [(f'/{lang}{url}', os.path.join(lang, url.strip('/')))
+             for lang in LANGUAGES for url in _export_urls()]
+    rutas += [('/sitemap.xml', 'sitemap.xml'), ('/robots.txt', 'robots.txt')]
+    
+    modo_prefijo = app.config['LANG_URL_PREFIX']
+    app.config['LANG_URL_PREFIX'] = True  # Los enlaces exportados llevan el prefijo de idioma
+    try:
+        cliente = app.test_client()
+        for url, archivo in rutas:
+            response = cliente.get(url, base_url=base_url)
+            if response.status_code != 200 or 'Set-Cookie' in response.headers:
+                # Respuestas que dependen de la sesión o con error: las sigue sirviendo Flask
+                print(f"⚠️  {url} omitida (HTTP {response.status_code})")
+                continue
+            data = response.get_data()
+            hash_archivo = hashlib.sha1(data).hexdigest()
+            archivos[archivo] = hash_archivo
+            ruta = os.path.join(destino, archivo)
+            if archivos_anteriores.get(archivo) == hash_archivo and os.path.exists(ruta):
+                continue
+            os.makedirs(os.path.dirname(ruta) or destino, exist_ok=True)
+            # Escritura atómica: nginx nunca sirve un archivo a medio escribir
+            with open(ruta + '.tmp', 'wb') as f:
+                f.write(data)
+            os.replace(ruta + '.tmp', ruta)
+            escritos += 1
+    finally:
+        app.config['LANG_URL_PREFIX'] = modo_prefijo
+    
+    # Quitar lo que ya no existe (p. ej. noticias desactivadas o con slug nuevo)
+    eliminados = 0
+    for archivo in set(archivos_anteriores) - set(archivos):
+        ruta = os.path.join(destino, archivo)
+        if os.path.exists(ruta):
+            os.remove(ruta)
+            eliminados += 1
+    
+    with open(manifest_path, 'w', encoding='utf-8') as f:
+        json.dump({'firma': firma, 'archivos': archivos}, f, indent=2)
+    print(f"✅ Exportación en {destino}: {escritos} escritos, {len(archivos) - escritos} sin cambios, {eliminados} eliminados")
+
+# Verificar la versión del esquema (una sola lectura de PRAGMA user_version);
+# las migraciones pendientes se aplican solo si la base de datos está atrasada
+ensure_schema()
 print("✅ Base de datos verificada e inicializada")
+check_db_settings()
 
 if __name__ == '__main__':
     print("✅ Base de datos inicializada")
@@ -6,19 +6,16 @@
 class MetodologiasChatbot {
     constructor() {
         this.isOpen = false;
-        this.metodologias = [];
+        this.searchFailed = false; // La última búsqueda en el servidor no respondió
         this.lastResults = null; // Guardar último resultado para preguntas de seguimiento
         this.lastQuery = null;
         this.conversationHistory = [];
-        this.loadAttempts = 0;
-        this.maxLoadAttempts = 3;
         this.notificationDismissed = false;
         this.init();
     }
 
     init() {
         this.createChatbotUI();
-        this.loadMetodologias();
         this.setupEventListeners();
     }
 
@@ -107,104 +104,6 @@ class MetodologiasChatbot {
         document.body.appendChild(chatbotWindow);
     }
 
-    async loadMetodologias() {
-        // Incrementar contador de intentos
-        this.loadAttempts++;
-
-        try {
-            // Siempre cargar desde la API - esto funciona en todas las páginas
-            const apiUrl = '/api/metodologias';
-
-            const response = await fetch(apiUrl, {
-                method: 'GET',
-                headers: {
-                    'Content-Type': 'application/json',
-                    'Accept': 'application/json'
-                },
-                cache: 'no-cache'
-            });
-
-            if (response.ok) {
-                try {
-                    const data = await response.json();
-
-                    if (Array.isArray(data)) {
-                        if (data.length > 0) {
-                            this.metodologias = data;
-                            this.loadAttempts = 0; // Reset contador en caso de éxito
-                            return;
-                        } else {
-                            // Si no hay metodologías, intentar fallback solo en página de servicios
-                            if (document.querySelector('#tabla-metodologias')) {
-                                this.loadFromDOM();
-                                return;
-                            }
-                        }
-                    }
-                } catch (jsonError) {
-                    const text = await response.text();
-                }
-            } else {
-                // Intentar leer el mensaje de error
-                let errorText = '';
-                try {
-                    const errorData = await response.json();
-                    errorText = JSON.stringify(errorData);
-                } catch (e) {
-                    errorText = await response.text();
-                }
-            }
-        } catch (error) {
-            // Intentar de nuevo si no hemos alcanzado el límite
-            if (this.loadAttempts < this.maxLoadAttempts) {
-                const delay = this.loadAttempts * 1000; // Delay progresivo: 1s, 2s, 3s
-                setTimeout(() => {
-                    this.loadMetodologias();
-                }, delay);
-                return;
-            }
-        }
-
-        // Si llegamos aquí después de todos los intentos, usar fallback
-        if (this.loadAttempts >= this.maxLoadAttempts) {
-            // Intentar fallback solo en la página de servicios (donde existe la tabla)
-            if (document.querySelector('#tabla-metodologias')) {
-                this.loadFromDOM();
-            } else {
-                this.metodologias = [];
-                // Mostrar mensaje al usuario si intenta buscar
-                this.showErrorMessage = true;
-            }
-        }
-    }
-
-    loadFromDOM() {
-        // Fallback: cargar metodologías desde la tabla en el DOM (solo en página de servicios)
-        const rows = document.querySelectorAll('#tabla-metodologias tbody tr');
-        if (rows.length === 0) {
-            this.metodologias = [];
-            return;
-        }
-
-        this.metodologias = Array.from(rows).map(row => {
-            const cells = row.querySelectorAll('td');
-            return {
-                nombre: cells[0]?.textContent.trim() || '',
-                nombre_en: '',
-                analito: cells[1]?.textContent.trim() || '',
-                analito_en: '',
-                matriz: cells[2]?.textContent.trim() || '',
-                matriz_en: '',
-                tecnica: cells[3]?.textContent.trim() || '',
-                tecnica_en: '',
-                lod: cells[4]?.textContent.trim() || '',
-                loq: cells[5]?.textContent.trim() || '',
-                acreditada: cells[6]?.textContent.includes('Sí') || false,
-                categoria: row.dataset.categoria || ''
-            };
-        });
-    }
-
     setupEventListeners() {
         const toggle = document.getElementById('chatbot-toggle');
         const close = document.getElementById('chatbot-close');
@@ -515,37 +414,6 @@ class MetodologiasChatbot {
         return str.charAt(0).toUpperCase() + str.slice(1).toLowerCase();
     }
 
-    // Extraer nombre base de una metodología (sin matriz específica en el nombre)
-    // Ej: "ORGANOCLORADOS MUSCULO" -> "ORGANOCLORADOS"
-    // Ej: "ORGANOCLORADOS ACEITE" -> "ORGANOCLORADOS"
-    // Ej: "ESTEROIDES Y ESTILBENOS" -> "ESTEROIDES Y ESTILBENOS" (sin cambios)
-    extraerNombreBase(nombreCompleto) {
-        if (!nombreCompleto) return '';
-
-        const nombreNorm = this.normalizeText(nombreCompleto);
-        const palabrasMatriz = ['harina', 'salmon', 'aceite', 'musculo', 'carne', 'leche', 'huevo', 'pecuarios', 'hidrobiologicos'];
-
-        // Dividir el nombre en palabras
-        const palabras = nombreNorm.split(/\s+/);
-
-        // Filtrar palabras que son matrices conocidas
-        const palabrasBase = palabras.filter(palabra => !palabrasMatriz.includes(palabra.toLowerCase()));
-
-        // Si quedan palabras, reconstruir el nombre base
-        if (palabrasBase.length > 0) {
-            // Reconstruir con capitalización apropiada
-            return palabrasBase.map((palabra, index) => {
-                if (index === 0) {
-                    return palabra.charAt(0).toUpperCase() + palabra.slice(1);
-                }
-                return palabra;
-            }).join(' ').toUpperCase();
-        }
-
-        // Si todas las palabras eran matrices, devolver el nombre original
-        return nombreCompleto;
-    }
-
     // Formatear lista de analitos de forma natural con capitalización correcta
     formatAnalitos(analitos) {
         if (!analitos || analitos.length === 0) return 'varios analitos';
@@ -596,61 +464,6 @@ class MetodologiasChatbot {
         return `${min}-${max}`;
     }
 
-    // Función de distancia de Levenshtein simplificada (para typos)
-    levenshteinDistance(str1, str2) {
-        const len1 = str1.length;
-        const len2 = str2.length;
-
-        if (len1 === 0) return len2;
-        if (len2 === 0) return len1;
-
-        const matrix = [];
-        for (let i = 0; i <= len1; i++) {
-            matrix[i] = [i];
-        }
-        for (let j = 0; j <= len2; j++) {
-            matrix[0][j] = j;
-        }
-
-        for (let i = 1; i <= len1; i++) {
-            for (let j = 1; j <= len2; j++) {
-                const cost = str1[i - 1] === str2[j - 1] ? 0 : 1;
-                matrix[i][j] = Math.min(
-                    matrix[i - 1][j] + 1,     // Eliminación
-                    matrix[i][j - 1] + 1,     // Inserción
-                    matrix[i - 1][j - 1] + cost // Sustitución
-                );
-            }
-        }
-
-        return matrix[len1][len2];
-    }
-
-    // Verificar si dos strings son similares (considerando typos)
-    isSimilar(str1, str2, threshold = 2) {
-        const normalized1 = this.normalizeText(str1);
-        const normalized2 = this.normalizeText(str2);
-
-        // Si son iguales después de normalizar, son similares
-        if (normalized1 === normalized2) return true;
-
-        // Si uno contiene al otro, son similares
-        if (normalized1.includes(normalized2) || normalized2.includes(normalized1)) {
-            return true;
-        }
-
-        // Si la distancia de Levenshtein es pequeña (typo de 1-2 caracteres)
-        const distance = this.levenshteinDistance(normalized1, normalized2);
-        const maxLen = Math.max(normalized1.length, normalized2.length);
-
-        // Permitir hasta 2 errores o 15% de diferencia para strings largos
-        if (distance <= threshold || (maxLen > 6 && distance / maxLen <= 0.15)) {
-            return true;
-        }
-
-        return false;
-    }
-
     // Extraer el tema principal de una consulta (palabra más importante)
     extractMainTopic(query) {
         if (!query) return '';
@@ -671,631 +484,24 @@ class MetodologiasChatbot {
         return words.length > 0 ? words[0] : '';
     }
 
-    extractKeywords(query) {
-        // Extraer palabras clave de la consulta, eliminando palabras comunes
-        const stopWords = ['el', 'la', 'los', 'las', 'un', 'una', 'de', 'en', 'para', 'con', 'por',
-            'que', 'qué', 'hacen', 'hace', 'busca', 'buscar', 'metodos', 'metodologias',
-            'metodología', 'metodologías', 'analisis', 'análisis', 'en', 'de', 'del',
-            'tienen', 'tiene', 'tener', 'metodo', 'metodo', 'uso', 'usan', 'usa',
-            'tecnica', 'tecnicas', 'tecnología', 'tecnologías'];
-
-        // Palabras compuestas conocidas que NO deben dividirse
-        const compoundWords = ['betalactamicos', 'betalactamico', 'beta-lactamicos', 'beta-lactamico',
-            'organoclorados', 'organofosforados', 'tetraciclinas', 'aminoglucosidos',
-            'macrolidos', 'organoclorado', 'organofosforado', 'tetraciclina',
-            'aminoglucoside', 'macrolido'];
-
-        const normalized = this.normalizeText(query);
-
-        // Primero verificar si hay palabras compuestas conocidas
-        const foundCompounds = [];
-        for (const compound of compoundWords) {
-            if (normalized.includes(compound)) {
-                foundCompounds.push(compound);
-            }
-        }
-
-        // Si se encontraron palabras compuestas, usarlas como keywords
-        if (foundCompounds.length > 0) {
-            // Combinar con otras palabras significativas
-            const words = normalized.split(/\s+/).filter(w => w.length >= 3 && !stopWords.includes(w));
-            const allKeywords = [...foundCompounds, ...words.filter(w => !foundCompounds.some(c => w.includes(c)))];
-            return allKeywords;
-        }
-
-        // Extraer palabras de 3+ caracteres, incluyendo términos químicos
-        const words = normalized.split(/\s+/).filter(w => w.length >= 3);
-
-        // Filtrar stop words pero mantener términos químicos importantes
-        const keywords = words.filter(word => !stopWords.includes(word));
-
-        // Si no hay keywords pero hay palabras, tomar la primera palabra significativa
-        if (keywords.length === 0 && words.length > 0) {
-            // Tomar la última palabra (probablemente el término buscado)
-            return [words[words.length - 1]];
-        }
-
-        return keywords;
-    }
-
+    // Búsqueda en el servidor (/api/metodologias/search): índice de texto completo sin acentos,
+    // por prefijo y con sinónimos, sin descargar el catálogo completo
     async searchMetodologias(query) {
-        const normalizedQuery = this.normalizeText(query);
-        const keywords = this.extractKeywords(query);
-
-        // Diccionario de sinónimos y términos relacionados (sin acentos)
-        const synonyms = {
-            'tetraciclina': ['tetraciclinas', 'tetracilinas', 'tetraciclina', 'tetraciclinas', 'tetraciclina', 'tetraciclina', 'oxitetraciclina', 'clortetraciclina', 'doxiciclina', 'minociclina'],
-            'tetraciclinas': ['tetraciclina', 'tetracilinas', 'oxitetraciclina', 'epi-tetraciclina', 'clortetraciclina', 'epi-oxitetraciclina', 'epi-clortetraciclina'],
-            'tetracilinas': ['tetraciclinas', 'tetraciclina', 'oxitetraciclina', 'clortetraciclina'],
-            'macrolido': ['macrolidos', 'macrolido', 'eritromicina', 'tilmicosina', 'tilosina', 'espiramicina', 'tulatromicina', 'azitromicina'],
-            'macrolidos': ['macrolido', 'eritromicina', 'tilmicosina', 'tilosina', 'espiramicina', 'tulatromicina', 'azitromicina'],
-            'aminoglucosido': ['aminoglucosidos', 'aminoglucosido', 'estreptomicina', 'neomicina', 'gentamicina', 'kanamicina', 'espectinomicina', 'apramicina'],
-            'aminoglucosidos': ['aminoglucosido', 'estreptomicina', 'neomicina', 'gentamicina', 'kanamicina', 'espectinomicina', 'apramicina'],
-            'beta-lactamico': ['betalactamico', 'betalactamicos', 'beta-lactamicos', 'penicilina', 'ampicilina', 'amoxicilina', 'cefalosporina', 'ceftiofur'],
-            'betalactamico': ['beta-lactamico', 'betalactamicos', 'beta-lactamicos', 'penicilina', 'ampicilina', 'amoxicilina', 'cefalosporina', 'ceftiofur'],
-            'betalactamicos': ['betalactamico', 'beta-lactamico', 'beta-lactamicos', 'penicilina', 'ampicilina', 'amoxicilina', 'cefalosporina', 'ceftiofur'],
-            'antibiotico': ['antimicrobiano', 'antimicrobianos', 'fluoroquinolona', 'tetraciclina', 'sulfonamida', 'macrolido', 'aminoglucosido', 'betalactamico'],
-            'antibioticos': ['antimicrobiano', 'antimicrobianos', 'fluoroquinolona', 'tetraciclinas', 'sulfonamidas', 'macrolidos', 'aminoglucosidos', 'betalactamicos'],
-            'micotoxina': ['aflatoxina', 'ocratoxina', 'fumonisina', 'zearalenona', 'deoxinivalenol', 'toxina t-2', 'patulina'],
-            'aflatoxina': ['aflatoxinas', 'aflatoxina b1', 'aflatoxina b2', 'aflatoxina g1', 'aflatoxina g2', 'aflatoxinas'],
-            'pesticida': ['plaguicida', 'organoclorado', 'organofosforado', 'diquat', 'paraquat', 'glifosato', 'herbicida', 'insecticida', 'fungicida'],
-            'organoclorado': ['organoclorados', 'pesticida organoclorado', 'plaguicida organoclorado', 'hch', 'lindano', 'ddt', 'dieldrin', 'aldrin', 'endrin', 'heptacloro', 'clordano'],
-            'organoclorados': ['organoclorado', 'pesticida organoclorado', 'plaguicida organoclorado', 'hch', 'lindano', 'ddt', 'dieldrin', 'aldrin', 'endrin', 'heptacloro', 'clordano', 'alfa-hch', 'beta-hch', 'gamma-hch', 'gama-hch'],
-            'salmon': ['salmones', 'salmonidos', 'salmonideos', 'trucha', 'truchas', 'pez', 'peces', 'hidrobiologico', 'hidrobiológico', 'productos hidrobiologicos'],
-            'carne': ['carnes', 'bovino', 'bovina', 'porcino', 'porcina', 'cerdo', 'cerdos', 'ave', 'aves', 'pollo', 'pollos', 'productos pecuarios', 'pecuarios', 'producto animal'],
-            'leche': ['lacteo', 'lacteos', 'dairy', 'producto lacteo'],
-            'lcmsms': ['lc-ms/ms', 'lc-ms', 'lcms', 'cromatografia liquida', 'espectrometria de masas', 'liquid chromatography'],
-            'gcms': ['gc-ms', 'cromatografia de gases', 'gas chromatography'],
-            'hplc': ['cromatografia liquida', 'high performance liquid chromatography', 'hplc-dad', 'hplc-fl'],
-            'metodo': ['metodologia', 'metodologias', 'tecnica', 'tecnicas', 'analisis', 'ensayo', 'ensayos', 'metodos'],
-            'productos pecuarios': ['producto pecuario', 'pecuarios', 'carne', 'carnes', 'leche', 'huevos', 'huevo', 'productos de origen animal'],
-            'productos hidrobiologicos': ['producto hidrobiologico', 'hidrobiologicos', 'salmon', 'salmones', 'trucha', 'truchas', 'pez', 'peces'],
-            'diquat': ['diquat', 'paraquat', 'herbicida', 'bipiridilo'],
-            'amprolio': ['amprolio', 'amprolium', 'anticoccidiano', 'antiparasitario']
-        };
-
-        // Diccionario de correcciones de typos comunes
-        const typoCorrections = {
-            'tetracilinas': 'tetraciclinas',
-            'tetracilina': 'tetraciclina',
-            'tetraciclinas': 'tetraciclinas',
-            'macrolidos': 'macrolidos',
-            'macrolido': 'macrolidos',
-            'aminoglucosidos': 'aminoglucosidos',
-            'aminoglucosido': 'aminoglucosidos',
-            'betalactamicos': 'betalactamicos',
-            'betalactamico': 'betalactamicos'
-        };
-
-        // Expandir búsqueda con sinónimos
-        const expandedTerms = new Set();
-        expandedTerms.add(normalizedQuery);
-        keywords.forEach(kw => {
-            expandedTerms.add(kw);
-            // Corregir typos comunes
-            const corrected = typoCorrections[kw] || kw;
-            if (corrected !== kw) {
-                expandedTerms.add(corrected);
-            }
-        });
-
-        // Para cada keyword, buscar en sinónimos y expandir
-        for (const keyword of keywords) {
-            // Agregar el keyword original
-            expandedTerms.add(keyword);
-
-            // Buscar coincidencias exactas o parciales en las claves de sinónimos
-            for (const [key, values] of Object.entries(synonyms)) {
-                const normalizedKey = this.normalizeText(key);
-
-                // Si el keyword coincide con la clave o viceversa
-                if (keyword === normalizedKey || keyword.includes(normalizedKey) || normalizedKey.includes(keyword)) {
-                    // Agregar todos los sinónimos
-                    values.forEach(v => expandedTerms.add(this.normalizeText(v)));
-                    expandedTerms.add(normalizedKey);
-                }
-
-                // Si el keyword coincide con alguno de los valores de sinónimos
-                for (const value of values) {
-                    const normalizedValue = this.normalizeText(value);
-                    if (keyword === normalizedValue || keyword.includes(normalizedValue) || normalizedValue.includes(keyword)) {
-                        // Agregar la clave y todos sus sinónimos
-                        expandedTerms.add(normalizedKey);
-                        values.forEach(v => expandedTerms.add(this.normalizeText(v)));
-                    }
-                }
+        try {
+            const response = await fetch(`/api/metodologias/search?q=${encodeURIComponent(query)}&limit=50`, {
+                headers: { 'Accept': 'application/json' }
+            });
+            if (!response.ok) {
+                this.searchFailed = response.status >= 500;
+                return [];
             }
+            const data = await response.json();
+            this.searchFailed = false;
+            return data.result || [];
+        } catch (error) {
+            this.searchFailed = true;
+            return [];
         }
-
-        // Convertir Set a Array
-        const expandedTermsArray = Array.from(expandedTerms);
-
-        // Búsqueda con sistema de scoring/prioridad
-        const scoredResults = this.metodologias.map(met => {
-            let score = 0;
-            const maxScore = 1000;
-
-            // Normalizar campos individuales para búsqueda específica
-            const nombreNorm = this.normalizeText(met.nombre || '');
-            const nombreEnNorm = this.normalizeText(met.nombre_en || '');
-            const analitoNorm = this.normalizeText(met.analito || '');
-            const analitoEnNorm = this.normalizeText(met.analito_en || '');
-            const matrizNorm = this.normalizeText(met.matriz || '');
-            const tecnicaNorm = this.normalizeText(met.tecnica || '');
-
-            // Crear un texto de búsqueda combinando todos los campos
-            const searchFields = [
-                nombreNorm, nombreEnNorm, analitoNorm, analitoEnNorm,
-                matrizNorm, this.normalizeText(met.matriz_en || ''),
-                tecnicaNorm, this.normalizeText(met.tecnica_en || ''),
-                this.normalizeText(met.categoria || '')
-            ].join(' ');
-
-            // Normalizar también la query completa
-            const cleanQuery = normalizedQuery.replace(/[?¿!¡.,;:]/g, '').trim();
-
-            // PRIORIDAD 1: Coincidencia en NOMBRE DEL MÉTODO (máxima prioridad)
-            // Contador de keywords que coinciden para priorizar coincidencias múltiples
-            let keywordsMatched = 0;
-            let keywordsInAnalito = 0;
-            let keywordsInNombre = 0;
-            let keywordsInMatriz = 0;
-
-            if (keywords.length > 0) {
-                for (const keyword of keywords) {
-                    const cleanKeyword = keyword.replace(/[?¿!¡.,;:]/g, '').trim();
-                    if (cleanKeyword.length >= 3) {
-                        let keywordMatched = false;
-
-                        // PRIMERO: Buscar en NOMBRE DEL MÉTODO (máxima prioridad)
-                        // Coincidencia exacta en nombre del método
-                        if (nombreNorm === cleanKeyword || nombreEnNorm === cleanKeyword) {
-                            score += maxScore * 3; // Prioridad máxima: coincidencia exacta en nombre
-                            keywordsMatched++;
-                            keywordsInNombre++;
-                            keywordMatched = true;
-                            continue;
-                        }
-
-                        // Coincidencia como palabra completa en nombre
-                        const nombreRegex = new RegExp(`\\b${cleanKeyword.replace(/[.*+?^${}()|[\]\\]/g, '\\$&')}\\b`, 'i');
-                        if (nombreRegex.test(nombreNorm) || nombreRegex.test(nombreEnNorm)) {
-                            score += maxScore * 2.5; // Alta prioridad: palabra completa en nombre
-                            keywordsMatched++;
-                            keywordsInNombre++;
-                            keywordMatched = true;
-                            continue;
-                        }
-
-                        // Coincidencia en nombre con términos expandidos (importante para "ORGANOCLORADOS HARINA")
-                        for (const expandedTerm of expandedTermsArray) {
-                            const cleanExpanded = expandedTerm.replace(/[?¿!¡.,;:]/g, '').trim();
-                            if (cleanExpanded.length >= 3) {
-                                if (nombreNorm.includes(cleanExpanded) || nombreEnNorm.includes(cleanExpanded)) {
-                                    score += maxScore * 2.2; // Alta prioridad: término expandido en nombre
-                                    keywordsMatched++;
-                                    keywordsInNombre++;
-                                    keywordMatched = true;
-                                    break;
-                                }
-                            }
-                        }
-                        if (keywordMatched) continue;
-
-                        // Coincidencia flexible en nombre (substring)
-                        if (nombreNorm.includes(cleanKeyword) || nombreEnNorm.includes(cleanKeyword)) {
-                            score += maxScore * 2.0; // Alta prioridad: substring en nombre
-                            keywordsMatched++;
-                            keywordsInNombre++;
-                            keywordMatched = true;
-                            continue;
-                        }
-
-                        // SEGUNDO: Solo si NO se encontró en nombre, buscar en analito
-                        // Coincidencia exacta en analito
-                        if (analitoNorm === cleanKeyword || analitoEnNorm === cleanKeyword) {
-                            score += maxScore * 1.5; // Menor prioridad: coincidencia exacta en analito
-                            keywordsMatched++;
-                            keywordsInAnalito++;
-                            keywordMatched = true;
-                            continue;
-                        }
-
-                        // Coincidencia como palabra completa en analito
-                        const analitoRegex = new RegExp(`\\b${cleanKeyword.replace(/[.*+?^${}()|[\]\\]/g, '\\$&')}\\b`, 'i');
-                        if (analitoRegex.test(analitoNorm) || analitoRegex.test(analitoEnNorm)) {
-                            score += maxScore * 1.3;
-                            keywordsMatched++;
-                            keywordsInAnalito++;
-                            keywordMatched = true;
-                            continue;
-                        }
-
-                        // Coincidencia flexible con typos en analito
-                        const analitoWords = (analitoNorm + ' ' + analitoEnNorm).split(/\s+/).filter(w => w.length >= 3);
-                        for (const word of analitoWords) {
-                            if (this.isSimilar(cleanKeyword, word, 2)) {
-                                score += maxScore * 1.1;
-                                keywordsMatched++;
-                                keywordsInAnalito++;
-                                keywordMatched = true;
-                                break;
-                            }
-                        }
-                        if (keywordMatched) continue;
-
-
-                        // Coincidencia en matriz (solo si también hay coincidencia en analito/nombre)
-                        const matrizRegex = new RegExp(`\\b${cleanKeyword.replace(/[.*+?^${}()|[\]\\]/g, '\\$&')}\\b`, 'i');
-                        if (matrizRegex.test(matrizNorm)) {
-                            keywordsMatched++;
-                            keywordsInMatriz++;
-                            // Solo dar puntos si ya hay alguna coincidencia en analito/nombre
-                            if (keywordsInAnalito > 0 || keywordsInNombre > 0) {
-                                score += maxScore * 0.3; // Bonus por coincidencia múltiple
-                            }
-                            keywordMatched = true;
-                            continue;
-                        }
-                    }
-                }
-
-                // BONUS: Si TODOS los keywords coinciden (coincidencia múltiple), dar bonus extra
-                if (keywords.length > 1 && keywordsMatched === keywords.length) {
-                    score += maxScore * 0.5; // Bonus por coincidencia completa
-                }
-
-                // BONUS: Si hay coincidencias en múltiples campos (analito Y nombre Y matriz)
-                if (keywordsInAnalito > 0 && keywordsInNombre > 0) {
-                    score += maxScore * 0.4; // Bonus por coincidencia en múltiples campos
-                }
-            }
-
-            // PRIORIDAD 2: Términos expandidos (sinónimos) en analito o nombre
-            // IMPORTANTE: Solo si NO hay coincidencia directa en keywords, considerar sinónimos
-            // Pero solo si el sinónimo está específicamente relacionado con el término buscado
-            if (score === 0 && keywords.length > 0) {
-                for (const keyword of keywords) {
-                    const cleanKeyword = keyword.replace(/[?¿!¡.,;:]/g, '').trim();
-                    if (cleanKeyword.length >= 3) {
-                        // Buscar en términos expandidos si el keyword está relacionado con sinónimos
-                        for (const term of expandedTermsArray) {
-                            const cleanTerm = term.replace(/[?¿!¡.,;:]/g, '').trim();
-                            if (cleanTerm.length >= 3 && cleanTerm !== cleanKeyword) {
-                                // Solo considerar si está en analito o nombre, NO en matriz o técnica
-                                if (analitoNorm.includes(cleanTerm) || analitoEnNorm.includes(cleanTerm) ||
-                                    nombreNorm.includes(cleanTerm) || nombreEnNorm.includes(cleanTerm)) {
-                                    // Verificar que el término expandido sea realmente un sinónimo del keyword buscado
-                                    // Revisar si el término expandido está en la lista de sinónimos del keyword
-                                    let isRelated = false;
-                                    for (const [synKey, synValues] of Object.entries(synonyms)) {
-                                        const normalizedSynKey = this.normalizeText(synKey);
-                                        if ((normalizedSynKey === cleanKeyword || cleanKeyword.includes(normalizedSynKey) || normalizedSynKey.includes(cleanKeyword)) &&
-                                            synValues.some(v => this.normalizeText(v) === cleanTerm)) {
-                                            isRelated = true;
-                                            break;
-                                        }
-                                        if (synValues.some(v => this.normalizeText(v) === cleanKeyword) &&
-                                            (normalizedSynKey === cleanTerm || cleanTerm.includes(normalizedSynKey) || normalizedSynKey.includes(cleanTerm))) {
-                                            isRelated = true;
-                                            break;
-                                        }
-                                    }
-
-                                    if (isRelated) {
-                                        score += maxScore * 0.6; // Menor prioridad que coincidencia directa
-                                        break; // Solo contar una vez por keyword
-                                    }
-                                }
-                            }
-                        }
-                    }
-                }
-            }
-
-            // PRIORIDAD 3: Coincidencia en otros campos (matriz, técnica) - MUY BAJA prioridad
-            // SOLO como bonus adicional si ya hay coincidencia fuerte en analito/nombre
-            // NUNCA debe ser suficiente por sí sola para aparecer en resultados
-            if (score >= maxScore * 0.5 && keywords.length > 0) {
-                for (const keyword of keywords) {
-                    const cleanKeyword = keyword.replace(/[?¿!¡.,;:]/g, '').trim();
-                    if (cleanKeyword.length >= 4) {
-                        if (matrizNorm.includes(cleanKeyword) || tecnicaNorm.includes(cleanKeyword)) {
-                            score += maxScore * 0.05; // Muy pequeño bonus adicional
-                        }
-                    }
-                }
-            }
-
-            // FILTRO CRÍTICO: Solo mantener metodologías con coincidencia DIRECTA y RELEVANTE en analito o nombre
-            // Descarta completamente metodologías que solo coinciden en matriz o técnica
-            // También descarta coincidencias muy débiles o irrelevantes
-            let hasMatchInAnalitoOrNombre = false;
-
-            if (keywords.length > 0) {
-                for (const keyword of keywords) {
-                    const cleanKeyword = keyword.replace(/[?¿!¡.,;:]/g, '').trim();
-                    if (cleanKeyword.length >= 3) {
-                        const keywordLen = cleanKeyword.length;
-
-                        // PRIORIDAD 1: Coincidencia exacta o como palabra completa (máxima confianza)
-                        // Usar límites de palabra (\b) para evitar coincidencias parciales
-                        // Ej: "beta" no debe coincidir con "beta-hch" si se busca "betalactamicos"
-                        const escapedKeyword = cleanKeyword.replace(/[.*+?^${}()|[\]\\]/g, '\\$&');
-                        const analitoRegex = new RegExp(`\\b${escapedKeyword}\\b`, 'i');
-                        const nombreRegex = new RegExp(`\\b${escapedKeyword}\\b`, 'i');
-
-                        if (analitoRegex.test(analitoNorm) || analitoRegex.test(analitoEnNorm) ||
-                            nombreRegex.test(nombreNorm) || nombreRegex.test(nombreEnNorm)) {
-                            hasMatchInAnalitoOrNombre = true;
-                            break;
-                        }
-
-                        // Si la keyword es corta (< 4 caracteres), ser más estricto
-                        // Para evitar coincidencias falsas como "beta" en "beta-hch" cuando se busca "betalactamicos"
-                        if (keywordLen < 4) {
-                            // Solo aceptar si está en el nombre completo del método O si forma parte de una palabra más larga en el nombre
-                            // Ej: "beta" debe coincidir con "beta-lactamicos" pero NO con "beta-hch" si se busca "betalactamicos"
-                            // Verificar que esté en el nombre completo del método (no solo en analito corto)
-                            if (nombreNorm.includes(cleanKeyword)) {
-                                // Si está en el nombre, verificar que no sea parte de otra palabra no relacionada
-                                // Ej: "beta" en "betalactamicos" está bien, pero "beta" solo en "beta-hch" no si se busca "betalactamicos"
-                                const nombreWords = nombreNorm.split(/\s+/);
-                                const hasRelevantMatch = nombreWords.some(word => {
-                                    // Verificar si la palabra contiene la keyword al inicio
-                                    return word.startsWith(cleanKeyword) && word.length > cleanKeyword.length;
-                                });
-
-                                if (hasRelevantMatch || nombreNorm.includes(cleanKeyword + '-') || nombreNorm.includes(cleanKeyword + ' ')) {
-                                    hasMatchInAnalitoOrNombre = true;
-                                    break;
-                                }
-                            }
-                        }
-
-                        // PRIORIDAD 2: Coincidencia como substring pero SOLO si es realmente relevante
-                        // Esto evita coincidencias falsas como "tetraciclina" encontrando "betalactamico" por compartir "lact"
-                        if (keywordLen >= 5) { // Solo para keywords >= 5 caracteres (más específicas)
-                            // Verificar que la coincidencia sea al inicio de una palabra (no enmedio de otra)
-                            const startsWithKeyword = (str) => {
-                                const words = str.split(/\s+/);
-                                return words.some(word =>
-                                    word.toLowerCase().startsWith(cleanKeyword.toLowerCase())
-                                );
-                            };
-
-                            // Solo aceptar si comienza una palabra (evita "lact" en "betalactamico")
-                            if (startsWithKeyword(nombreNorm) || startsWithKeyword(nombreEnNorm) ||
-                                startsWithKeyword(analitoNorm) || startsWithKeyword(analitoEnNorm)) {
-                                hasMatchInAnalitoOrNombre = true;
-                                break;
-                            }
-
-                            // Fallback: substring directo solo si la keyword es >= 7 caracteres (muy específica)
-                            // Y solo si está en el nombre (no en analito para evitar falsos positivos)
-                            if (keywordLen >= 7) {
-                                if (nombreNorm.includes(cleanKeyword) || nombreEnNorm.includes(cleanKeyword)) {
-                                    hasMatchInAnalitoOrNombre = true;
-                                    break;
-                                }
-                            }
-                        }
-
-                        // Verificar coincidencia flexible (typos) en analito o nombre
-                        const analitoWords = (analitoNorm + ' ' + analitoEnNorm).split(/\s+/).filter(w => w.length >= 3);
-                        const nombreWords = (nombreNorm + ' ' + nombreEnNorm).split(/\s+/).filter(w => w.length >= 3);
-
-                        for (const word of [...analitoWords, ...nombreWords]) {
-                            if (this.isSimilar(cleanKeyword, word, 2)) {
-                                hasMatchInAnalitoOrNombre = true;
-                                break;
-                            }
-                        }
-
-                        if (hasMatchInAnalitoOrNombre) break;
-                    }
-                }
-
-                // Si hay términos expandidos, verificar también
-                if (!hasMatchInAnalitoOrNombre) {
-                    for (const term of expandedTermsArray) {
-                        const cleanTerm = term.replace(/[?¿!¡.,;:]/g, '').trim();
-                        if (cleanTerm.length >= 3) {
-                            // Solo considerar si está en analito o nombre
-                            if (analitoNorm.includes(cleanTerm) || analitoEnNorm.includes(cleanTerm) ||
-                                nombreNorm.includes(cleanTerm) || nombreEnNorm.includes(cleanTerm)) {
-                                // Verificar que el término expandido sea realmente relacionado con el keyword buscado
-                                let isRelated = false;
-                                for (const keyword of keywords) {
-                                    const cleanKeyword = keyword.replace(/[?¿!¡.,;:]/g, '').trim();
-                                    // Verificar si el término expandido está en los sinónimos del keyword
-                                    for (const [synKey, synValues] of Object.entries(synonyms)) {
-                                        const normalizedSynKey = this.normalizeText(synKey);
-                                        if ((normalizedSynKey === cleanKeyword || cleanKeyword.includes(normalizedSynKey) || normalizedSynKey.includes(cleanKeyword)) &&
-                                            synValues.some(v => this.normalizeText(v) === cleanTerm)) {
-                                            isRelated = true;
-                                            break;
-                                        }
-                                        if (synValues.some(v => this.normalizeText(v) === cleanKeyword) &&
-                                            (normalizedSynKey === cleanTerm || cleanTerm.includes(normalizedSynKey) || normalizedSynKey.includes(cleanTerm))) {
-                                            isRelated = true;
-                                            break;
-                                        }
-                                    }
-                                    if (isRelated) break;
-                                }
-
-                                if (isRelated) {
-                                    hasMatchInAnalitoOrNombre = true;
-                                    break;
-                                }
-                            }
-                        }
-                    }
-                }
-            }
-
-            // Si no hay coincidencia en analito o nombre, descartar completamente (score = 0)
-            if (!hasMatchInAnalitoOrNombre) {
-                score = 0;
-            }
-
-            // FILTRO ESTRICTO: Si hay múltiples keywords, requerir que TODAS las keywords principales coincidan
-            // y si hay keywords secundarias (como "harina"), deben coincidir TAMBIÉN
-            if (keywords.length > 1 && keywordsMatched > 0) {
-                // Extraer keywords principales (organoclorados, tetraciclinas, etc.) y secundarias (harina, salmon, etc.)
-                const palabrasMatriz = ['harina', 'salmon', 'aceite', 'musculo', 'carne', 'leche', 'huevo', 'pecuarios', 'hidrobiologicos'];
-                const keywordsPrincipales = keywords.filter(k => !palabrasMatriz.includes(k.toLowerCase()));
-                const keywordsSecundarias = keywords.filter(k => palabrasMatriz.includes(k.toLowerCase()));
-
-                // Si hay keywords secundarias (matriz), verificar que coincidan en el nombre o matriz
-                if (keywordsSecundarias.length > 0 && keywordsPrincipales.length > 0) {
-                    let keywordsSecundariasMatched = 0;
-                    let keywordsPrincipalesMatched = 0;
-
-                    // Verificar coincidencia de keywords principales (deben estar en nombre O analito)
-                    for (const keywordPrincipal of keywordsPrincipales) {
-                        const cleanPrincipal = keywordPrincipal.replace(/[?¿!¡.,;:]/g, '').trim().toLowerCase();
-                        // Verificar que coincida en nombre O analito (no solo en matriz o técnica)
-                        // Usar regex con límites de palabra para evitar coincidencias parciales
-                        const principalLen = cleanPrincipal.length;
-                        if (principalLen >= 4) {
-                            // Para keywords largas, usar búsqueda normal
-                            if (nombreNorm.includes(cleanPrincipal) || analitoNorm.includes(cleanPrincipal)) {
-                                keywordsPrincipalesMatched++;
-                            }
-                        } else {
-                            // Para keywords cortas (< 4 caracteres), ser más estricto
-                            // Evitar coincidencias falsas como "beta" en "beta-hch" cuando se busca "betalactamicos"
-                            const escapedPrincipal = cleanPrincipal.replace(/[.*+?^${}()|[\]\\]/g, '\\$&');
-                            const strictRegex = new RegExp(`(^|\\s|-)${escapedPrincipal}(-|\\s|$|[a-z])`, 'i');
-                            // Solo aceptar si es palabra completa al inicio de una palabra compuesta
-                            // Ej: "beta" debe coincidir con "beta-lactamicos" pero NO solo con "beta-hch"
-                            if (strictRegex.test(nombreNorm) || strictRegex.test(analitoNorm)) {
-                                // Verificar adicionalmente que la coincidencia tenga sentido
-                                // Si la keyword es muy corta, verificar que esté en el nombre completo del método
-                                if (nombreNorm.includes(cleanPrincipal) || analitoNorm.includes(cleanPrincipal)) {
-                                    keywordsPrincipalesMatched++;
-                                }
-                            }
-                        }
-                    }
-
-                    // Verificar coincidencia de keywords secundarias (pueden estar en nombre O matriz)
-                    for (const keywordSec of keywordsSecundarias) {
-                        const cleanSec = keywordSec.replace(/[?¿!¡.,;:]/g, '').trim().toLowerCase();
-                        if (nombreNorm.includes(cleanSec) || matrizNorm.includes(cleanSec)) {
-                            keywordsSecundariasMatched++;
-                        }
-                    }
-
-                    // FILTRO CRÍTICO: Si hay keywords principales Y secundarias, TODAS deben coincidir
-                    // Esto evita mostrar "plomo harina" cuando se busca "organoclorados harina"
-                    if (keywordsPrincipalesMatched < keywordsPrincipales.length) {
-                        // Si NO coinciden TODAS las keywords principales, DESCARTAR completamente
-                        score = 0;
-                        hasMatchInAnalitoOrNombre = false;
-                    } else if (keywordsSecundariasMatched === 0) {
-                        // Si hay keywords secundarias pero ninguna coincidió, penalizar fuerte
-                        // Esto evita mostrar "organoclorados musculo" cuando se busca "organoclorados en harina"
-                        score = score * 0.1; // Penalizar fuertemente pero no descartar completamente
-                    } else {
-                        // Bonus si coinciden TODAS las keywords (principal + secundarias)
-                        score = score * 1.5;
-                    }
-                } else if (keywordsPrincipales.length > 1) {
-                    // Si hay múltiples keywords principales sin secundarias, requerir que TODAS coincidan
-                    let todasCoinciden = true;
-                    for (const keywordPrincipal of keywordsPrincipales) {
-                        const cleanPrincipal = keywordPrincipal.replace(/[?¿!¡.,;:]/g, '').trim().toLowerCase();
-                        if (!nombreNorm.includes(cleanPrincipal) && !analitoNorm.includes(cleanPrincipal)) {
-                            todasCoinciden = false;
-                            break;
-                        }
-                    }
-
-                    if (!todasCoinciden) {
-                        // Si NO coinciden TODAS las keywords principales, DESCARTAR completamente
-                        score = 0;
-                        hasMatchInAnalitoOrNombre = false;
-                    }
-                }
-            }
-
-            // FILTRO ADICIONAL: Si hay keyword principal (ej: "organoclorados") y keyword secundaria (ej: "harina"),
-            // el resultado DEBE tener la keyword principal en el nombre O analito
-            // Esto previene que aparezcan resultados como "plomo harina" cuando se busca "organoclorados harina"
-            if (keywords.length > 1) {
-                const palabrasMatriz = ['harina', 'salmon', 'aceite', 'musculo', 'carne', 'leche', 'huevo', 'pecuarios', 'hidrobiologicos'];
-                const keywordsPrincipales = keywords.filter(k => !palabrasMatriz.includes(k.toLowerCase()));
-                const keywordsSecundarias = keywords.filter(k => palabrasMatriz.includes(k.toLowerCase()));
-
-                if (keywordsPrincipales.length > 0 && keywordsSecundarias.length > 0) {
-                    // Verificar que al menos una keyword principal esté en nombre o analito
-                    let tieneKeywordPrincipal = false;
-                    for (const keywordPrincipal of keywordsPrincipales) {
-                        const cleanPrincipal = keywordPrincipal.replace(/[?¿!¡.,;:]/g, '').trim().toLowerCase();
-                        if (nombreNorm.includes(cleanPrincipal) || analitoNorm.includes(cleanPrincipal)) {
-                            tieneKeywordPrincipal = true;
-                            break;
-                        }
-                    }
-
-                    // Si NO tiene ninguna keyword principal en nombre/analito, DESCARTAR
-                    // Esto evita "plomo harina" cuando se busca "organoclorados harina"
-                    if (!tieneKeywordPrincipal) {
-                        score = 0;
-                        hasMatchInAnalitoOrNombre = false;
-                    }
-                }
-            }
-
-            // BONUS ESPECIAL: Si el nombre del método contiene una de las keywords principales,
-            // y hay múltiples variantes del mismo método (ej: ORGANOCLORADOS MUSCULO, ORGANOCLORADOS ACEITE, ORGANOCLORADOS HARINA),
-            // dar un bonus adicional para asegurar que todas las variantes se incluyan
-            if (keywordsMatched > 0 && nombreNorm) {
-                // Extraer la "raíz" del método (ej: "organoclorados" de "organoclorados musculo")
-                const nombreWords = nombreNorm.split(/\s+/).filter(w => w.length >= 4);
-                for (const keyword of keywords) {
-                    const cleanKeyword = keyword.replace(/[?¿!¡.,;:]/g, '').trim();
-                    if (cleanKeyword.length >= 4 && nombreWords.some(word => word.includes(cleanKeyword) || cleanKeyword.includes(word))) {
-                        // Si la keyword principal está en el nombre, asegurar que se incluya
-                        // Esto ayuda con casos como "ORGANOCLORADOS HARINA" cuando se busca "organoclorados"
-                        if (score === 0) {
-                            score = maxScore * 0.3; // Score mínimo para no descartar
-                            keywordsMatched = 1;
-                            hasMatchInAnalitoOrNombre = true;
-                        }
-                        break;
-                    }
-                }
-            }
-
-            return { metodologia: met, score: score, keywordsMatched: keywordsMatched || 0, nombre: nombreNorm };
-        })
-            .filter(item => item.score > 0) // Solo mantener resultados con score > 0
-            .sort((a, b) => {
-                // Extraer nombre base (sin matriz específica) para agrupar variantes
-                const nombreA = a.nombre ? this.extraerNombreBase(a.nombre).toLowerCase() : '';
-                const nombreB = b.nombre ? this.extraerNombreBase(b.nombre).toLowerCase() : '';
-
-                // Si tienen el mismo nombre base, mantener juntos (todas las variantes)
-                if (nombreA && nombreB && nombreA === nombreB) {
-                    // Dentro del mismo grupo, ordenar por score
-                    return b.score - a.score;
-                }
-
-                // Ordenar primero por número de keywords que coinciden (descendente)
-                if (b.keywordsMatched !== a.keywordsMatched) {
-                    return b.keywordsMatched - a.keywordsMatched;
-                }
-                // Si tienen el mismo número de keywords, ordenar por score descendente
-                return b.score - a.score;
-            })
-            .slice(0, 50) // Aumentar límite a 50 para incluir TODAS las variantes del mismo método (ej: organoclorados en músculo, aceite, harina)
-            .map(item => item.metodologia); // Devolver solo las metodologías
-
-        return scoredResults;
     }
 
     showGeneralInfo(query, isContactQuery, isLocationQuery, isScheduleQuery) {
@@ -1336,10 +542,10 @@ class MetodologiasChatbot {
     }
 
     async showResults(query, results) {
-        // Verificar si hay metodologías cargadas
-        if (this.metodologias.length === 0) {
+        // Verificar si el servidor respondió la búsqueda
+        if (this.searchFailed) {
             let message = `
-                <p>⚠️ No se pudieron cargar las metodologías en este momento.</p>
+                <p>⚠️ No se pudieron consultar las metodologías en este momento.</p>
                 <p>Por favor, intenta recargar la página o contacta al administrador.</p>
             `;
 
@@ -1372,7 +578,6 @@ class MetodologiasChatbot {
             if (isMethodologyQuery) {
                 this.addMessage(`
                     <p>No encontré metodologías que coincidan con "<strong>${this.escapeHtml(query)}</strong>" en nuestra base de datos.</p>
-                    <p><small>Búsqueda en <strong>${this.metodologias.length}</strong> metodologías disponibles</small></p>
                 `);
             }
 
@@ -1755,13 +960,13 @@ class MetodologiasChatbot {
         return formatted;
     }
 
-    showSuggestions(query) {
+    async showSuggestions(query) {
         if (!query || query.length < 2) {
             this.hideSuggestions();
             return;
         }
 
-        const suggestions = this.generateSuggestions(query);
+        const suggestions = await this.generateSuggestions(query);
         const container = document.getElementById('chatbot-suggestions');
         if (!container) return;
 
@@ -1776,35 +981,26 @@ class MetodologiasChatbot {
         container.style.display = 'flex';
     }
 
-    generateSuggestions(query) {
+    async generateSuggestions(query) {
         const normalizedQuery = this.normalizeText(query);
-        const keywords = this.extractKeywords(query);
         const suggestions = new Set();
 
-        // Buscar términos relacionados en metodologías (normalizados)
-        this.metodologias.forEach(met => {
-            const fields = [
-                met.nombre, met.nombre_en,
-                met.analito, met.analito_en,
-                met.matriz, met.matriz_en,
-                met.tecnica, met.tecnica_en
-            ].filter(f => f);
-
-            fields.forEach(field => {
-                const normalizedField = this.normalizeText(field);
-                // Si el campo contiene alguna palabra clave, agregarlo
-                if (keywords.length > 0) {
-                    for (const keyword of keywords) {
-                        if (normalizedField.includes(keyword) || keyword.includes(normalizedField.substring(0, keyword.length))) {
-                            suggestions.add(field);
-                            break;
-                        }
-                    }
-                } else if (normalizedField.includes(normalizedQuery) || normalizedQuery.includes(normalizedField.substring(0, normalizedQuery.length))) {
-                    suggestions.add(field);
+        // Analitos, matrices y técnicas para la última palabra escrita (/api/metodologias/suggest,
+        // tolera errores de tipeo)
+        const lastWord = normalizedQuery.split(' ').pop();
+        if (lastWord && lastWord.length >= 2) {
+            try {
+                const response = await fetch(`/api/metodologias/suggest?q=${encodeURIComponent(lastWord)}&limit=5`, {
+                    headers: { 'Accept': 'application/json' }
+                });
+                if (response.ok) {
+                    const data = await response.json();
+                    (data.sugerencias || []).forEach(sug => suggestions.add(sug.texto));
                 }
-            });
-        });
+            } catch (error) {
+                // Sin sugerencias del servidor: solo las consultas comunes
+            }
+        }
 
         // Sugerencias comunes basadas en la consulta
         const commonQueries = [
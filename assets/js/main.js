@@ -2236,3 +2236,80 @@ if (window.MutationObserver) {
 
 
 
+
+// "Cargar más noticias": pide la página siguiente a /api/noticias y agrega las tarjetas al carrusel
+document.addEventListener("DOMContentLoaded", () => {
+  const moreBtn = document.querySelector("[data-news-more]");
+  if (!moreBtn) return;
+  const track = document.querySelector("#noticias-recientes [data-carousel-track]");
+  if (!track) return;
+
+  const buildCard = (noticia) => {
+    const article = document.createElement("article");
+    article.className = "news-card";
+
+    const img = document.createElement("img");
+    img.alt = noticia.titulo || "";
+    if (noticia.imagen) {
+      const frame = document.createElement("div");
+      frame.style.cssText = "height: 200px; overflow: hidden; position: relative; background: #f0f0f0; display: flex; align-items: center; justify-content: center;";
+      img.src = noticia.imagen;
+      img.style.cssText = "width: 100%; height: 100%; object-fit: contain;";
+      if (noticia.imagen_zoom || noticia.imagen_x || noticia.imagen_y) {
+        img.style.transform = `scale(${noticia.imagen_zoom || 1.0}) translate(${noticia.imagen_x || 0.0}px, ${noticia.imagen_y || 0.0}px)`;
+        img.style.transformOrigin = "center center";
+      }
+      frame.appendChild(img);
+      article.appendChild(frame);
+    } else {
+      img.src = moreBtn.dataset.newsPlaceholder;
+      article.appendChild(img);
+    }
+
+    const body = document.createElement("div");
+    body.className = "news-body";
+    const meta = document.createElement("span");
+    meta.className = "news-meta";
+    meta.textContent = [noticia.fecha, noticia.categoria].filter(Boolean).join(" · ");
+    const title = document.createElement("h3");
+    title.className = "news-title";
+    title.textContent = noticia.titulo || "";
+    const text = document.createElement("p");
+    text.textContent = noticia.resumen || "";
+    const link = document.createElement("a");
+    link.className = "news-link";
+    link.href = noticia.enlace.href;
+    link.textContent = noticia.enlace.texto;
+    if (noticia.enlace.externo) {
+      link.target = "_blank";
+      link.rel = "noopener noreferrer";
+    }
+    body.append(meta, title, text, link);
+    article.appendChild(body);
+    return article;
+  };
+
+  moreBtn.addEventListener("click", async () => {
+    const params = new URLSearchParams({ id: moreBtn.dataset.cursorId });
+    if (moreBtn.dataset.cursorFecha !== undefined) params.set("fecha", moreBtn.dataset.cursorFecha);
+    moreBtn.disabled = true;
+    try {
+      const response = await fetch(`${moreBtn.dataset.newsMore}?${params}`, { headers: { Accept: "application/json" } });
+      if (!response.ok) throw new Error(`HTTP ${response.status}`);
+      const data = await response.json();
+      data.noticias.forEach((noticia) => track.appendChild(buildCard(noticia)));
+      track.dispatchEvent(new Event("scroll"));  // Actualiza los botones del carrusel
+      if (data.siguiente) {
+        moreBtn.dataset.cursorId = data.siguiente.id;
+        if (data.siguiente.fecha === null) delete moreBtn.dataset.cursorFecha;
+        else moreBtn.dataset.cursorFecha = data.siguiente.fecha;
+        moreBtn.disabled = false;
+      } else {
+        moreBtn.parentElement.remove();
+      }
+    } catch (error) {
+      console.error("Error cargando noticias:", error);
+      moreBtn.disabled = false;
+    }
+  });
+});